@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Departement, Poste, Employe, TypeContrat, Contrat, Conge, Absence, 
     Presence, FichePaie, Prime, Evaluation, Objectif, Formation, 
-    InscriptionFormation, OffreEmploi, Candidature, DocumentRH
+    InscriptionFormation, OffreEmploi, Candidature, DocumentRH, HoraireTravail,
+    SoldeConge, Notification
 )
 
 @admin.register(Departement)
@@ -19,7 +20,7 @@ class PosteAdmin(admin.ModelAdmin):
 @admin.register(Employe)
 class EmployeAdmin(admin.ModelAdmin):
     list_display = ('matricule', 'nom', 'prenom', 'email', 'poste', 'date_embauche')
-    list_filter = ('poste__departement', 'poste', 'date_embauche')
+    list_filter = ('departement', 'poste', 'date_embauche')
     search_fields = ('nom', 'prenom', 'email', 'matricule')
 
 @admin.register(TypeContrat)
@@ -36,6 +37,18 @@ class CongeAdmin(admin.ModelAdmin):
     list_display = ('employe', 'type_conge', 'date_debut', 'date_fin', 'statut')
     list_filter = ('type_conge', 'statut')
 
+@admin.register(SoldeConge)
+class SoldeCongeAdmin(admin.ModelAdmin):
+    list_display = ('employe', 'type_conge', 'annee', 'acquis', 'pris', 'mois_acquis')
+    list_filter = ('type_conge', 'annee')
+    search_fields = ('employe__nom', 'employe__matricule')
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('sujet', 'destinataire', 'statut', 'tentatives', 'prochain_essai', 'date_envoi')
+    list_filter = ('statut',)
+    search_fields = ('destinataire', 'sujet')
+
 @admin.register(Absence)
 class AbsenceAdmin(admin.ModelAdmin):
     list_display = ('employe', 'date', 'justifie')
@@ -43,9 +56,13 @@ class AbsenceAdmin(admin.ModelAdmin):
 
 @admin.register(Presence)
 class PresenceAdmin(admin.ModelAdmin):
-    list_display = ('employe', 'date', 'heure_arrivee', 'heure_depart')
+    list_display = ('employe', 'date', 'heure_arrivee', 'heure_depart', 'heures_travaillees', 'heures_sup')
     list_filter = ('date',)
 
+@admin.register(HoraireTravail)
+class HoraireTravailAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'departement', 'heures_par_jour', 'pause_minutes', 'arrondi_minutes', 'majoration')
+
 @admin.register(FichePaie)
 class FichePaieAdmin(admin.ModelAdmin):
     list_display = ('employe', 'mois', 'annee', 'net_a_payer')
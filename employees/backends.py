@@ -1,27 +1,59 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.core.cache import cache
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+# Index sur LOWER(email) de la table des utilisateurs, créé par la migration 0021
+EMAIL_LOWER_INDEX = 'auth_user_email_lower_idx'
+
+
+def _cle_inconnu(identifiant):
+    return 'auth:inconnu:' + hashlib.sha256(identifiant.encode()).hexdigest()
+
+
+def oublier_identifiants(*identifiants):
+    """Retire du cache négatif des identifiants devenus valides (création / modification d'un compte)."""
+    cles = [_cle_inconnu(i) for i in identifiants if i]
+    if cles:
+        cache.delete_many(cles)
+
 
 class EmailOrUsernameBackend(ModelBackend):
+    """
+    Connexion par nom d'utilisateur, email (insensible à la casse) ou matricule,
+    résolus en une seule requête. L'email est comparé via LOWER(email) pour
+    utiliser l'index fonctionnel installé par la migration (email__iexact ne le
+    peut pas). Avec AUTH_NEGATIVE_CACHE_TIMEOUT > 0, un identifiant inconnu est
+    mémorisé quelques secondes : une rafale de tentatives ne touche plus la base.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if not username or password is None:
+            return None
         UserModel = get_user_model()
-        from .models import Employe
-        
-        # 1. Essayer par username ou email (insensible à la casse pour l'email)
-        user = None
-        try:
-            user = UserModel.objects.get(Q(username=username) | Q(email__iexact=username))
-        except UserModel.DoesNotExist:
-            # 2. Essayer par matricule via le profil Employe
-            try:
-                employe = Employe.objects.get(matricule=username)
-                user = employe.user
-            except (Employe.DoesNotExist, AttributeError):
-                return None
-        except UserModel.MultipleObjectsReturned:
-            # Si plusieurs utilisateurs ont le même email, on prend le premier (peu probable avec unique=True)
-            user = UserModel.objects.filter(email__iexact=username).first()
-
-        if user and user.check_password(password) and self.user_can_authenticate(user):
+        delai = getattr(settings, 'AUTH_NEGATIVE_CACHE_TIMEOUT', 0)
+        if delai and cache.get(_cle_inconnu(username)):
+            return None
+
+        # Trois recherches indexées réunies en une requête (un OR à travers la jointure
+        # sur employe empêcherait l'usage des index) ; priorité : username, email, matricule
+        requete = UserModel.objects.filter(username=username).annotate(priorite=Value(0)).union(
+            UserModel.objects.alias(email_lower=Lower('email')).filter(email_lower=username.lower())
+            .annotate(priorite=Value(1)),
+            UserModel.objects.filter(profil__matricule=username).annotate(priorite=Value(2)),
+            all=True,
+        )
+        user = requete.order_by('priorite', 'pk').first()
+        if user is None:
+            if delai:
+                cache.set(_cle_inconnu(username), True, delai)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
+
@@ -0,0 +1,147 @@
+import datetime
+from collections import defaultdict
+
+from django.db import connection
+
+from .models import Conge, Departement
+
+# Statuts qui occupent le calendrier (une demande rejetée libère ses dates)
+STATUTS_ACTIFS = ('EN_ATTENTE', 'APPROUVE')
+
+# Index GiST (employé, période) sous PostgreSQL, créé par la migration 0018
+GIST_INDEX = 'conge_periode_gist_idx'
+
+
+def chevauchant(conges, debut, fin):
+    """
+    Congés de `conges` qui recouvrent [debut, fin] (bornes incluses). Sous
+    PostgreSQL, le test porte sur daterange(date_debut, date_fin, '[]') pour
+    utiliser l'index GiST ; ailleurs, comparaison des bornes (index B-tree).
+    """
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.fields import DateRangeField
+        from django.db.models import F, Func, Value
+        from django.db.backends.postgresql.psycopg_any import DateRange
+
+        periode = Func(F('date_debut'), F('date_fin'), Value('[]'), function='daterange', output_field=DateRangeField())
+        return conges.alias(periode=periode).filter(periode__overlap=DateRange(debut, fin, '[]'))
+    return conges.filter(date_debut__lte=fin, date_fin__gte=debut)
+
+
+def conges_de(employe_id, debut, fin, exclure=None):
+    """Demandes actives de l'employé recouvrant la période (hors demande `exclure`)."""
+    conges = chevauchant(Conge.objects.filter(employe_id=employe_id, statut__in=STATUTS_ACTIFS), debut, fin)
+    if exclure:
+        conges = conges.exclude(pk=exclure)
+    return conges
+
+
+def conges_du_departement(departement_id, debut, fin, statuts=('APPROUVE',)):
+    return chevauchant(Conge.objects.in_departement(departement_id).filter(statut__in=statuts), debut, fin)
+
+
+def absents(departement_id, debut, fin, statuts=('APPROUVE',)):
+    """Qui est absent dans le département sur la période : congés triés par date de début."""
+    return (
+        conges_du_departement(departement_id, debut, fin, statuts)
+        .select_related('employe')
+        .order_by('date_debut', 'id')
+    )
+
+
+def pic_absences(periodes, debut, fin):
+    """
+    Nombre maximal d'absents le même jour sur [debut, fin] et premier jour où il est
+    atteint, par balayage des débuts / fins des périodes (O(n log n)).
+    """
+    evenements = []
+    for date_debut, date_fin in periodes:
+        evenements.append((max(date_debut, debut), 1))
+        evenements.append((min(date_fin, fin) + datetime.timedelta(days=1), -1))
+    # À date égale, les fins (-1) passent avant les débuts
+    evenements.sort()
+    pic, jour_pic, courant = 0, None, 0
+    for jour, delta in evenements:
+        courant += delta
+        if courant > pic:
+            pic, jour_pic = courant, jour
+    return pic, jour_pic
+
+
+def verifier_demande(employe_id, departement_id, debut, fin, exclure=None):
+    """
+    Contrôles d'une demande de congé : chevauchement avec une autre demande de
+    l'employé, puis effectif du département (Departement.absents_max) compte tenu
+    des congés déjà approuvés. Renvoie la liste des erreurs.
+    """
+    erreurs = []
+    if fin < debut:
+        return ["La date de fin précède la date de début."]
+    autre = conges_de(employe_id, debut, fin, exclure).order_by('date_debut').first()
+    if autre:
+        erreurs.append(
+            f"Cette période chevauche une autre demande ({autre.date_debut:%d/%m/%Y} au {autre.date_fin:%d/%m/%Y})."
+        )
+    if departement_id:
+        absents_max = Departement.objects.filter(pk=departement_id).values_list('absents_max', flat=True).first()
+        if absents_max is not None:
+            deja = conges_du_departement(departement_id, debut, fin).exclude(employe_id=employe_id)
+            pic, jour = pic_absences(deja.values_list('date_debut', 'date_fin'), debut, fin)
+            if pic + 1 > absents_max:
+                erreurs.append(
+                    f"Effectif insuffisant le {jour:%d/%m/%Y} : {pic} absent(s) déjà approuvé(s) "
+                    f"pour {absents_max} autorisé(s) dans le département."
+                )
+    return erreurs
+
+
+def filtrer_approuvables(conges):
+    """
+    Version groupée de verifier_demande pour une approbation en masse : trois
+    requêtes pour tout le lot, puis contrôle en mémoire dans l'ordre des dates,
+    chaque congé accepté comptant pour les suivants. `conges` doivent avoir leur
+    employé chargé. Renvoie (acceptés, [(congé, raison)]).
+    """
+    if not conges:
+        return [], []
+    debut = min(conge.date_debut for conge in conges)
+    fin = max(conge.date_fin for conge in conges)
+
+    autres = defaultdict(list)
+    demandes = Conge.objects.filter(
+        employe_id__in={conge.employe_id for conge in conges}, statut__in=STATUTS_ACTIFS,
+    ).exclude(pk__in=[conge.pk for conge in conges])
+    for employe_id, date_debut, date_fin in chevauchant(demandes, debut, fin).values_list(
+        'employe_id', 'date_debut', 'date_fin',
+    ):
+        autres[employe_id].append((date_debut, date_fin))
+
+    maxima = dict(
+        Departement.objects.filter(
+            pk__in={conge.employe.departement_id for conge in conges}, absents_max__isnull=False,
+        ).values_list('pk', 'absents_max')
+    )
+    approuves = defaultdict(list)
+    if maxima:
+        deja = Conge.objects.filter(statut='APPROUVE', employe__departement_id__in=maxima)
+        for departement_id, employe_id, date_debut, date_fin in chevauchant(deja, debut, fin).values_list(
+            'employe__departement_id', 'employe_id', 'date_debut', 'date_fin',
+        ):
+            approuves[departement_id].append((employe_id, date_debut, date_fin))
+
+    acceptes, refus = [], []
+    for conge in sorted(conges, key=lambda c: (c.date_debut, c.pk)):
+        if any(d <= conge.date_fin and f >= conge.date_debut for d, f in autres[conge.employe_id]):
+            refus.append((conge, "chevauche une autre demande de l'employé"))
+            continue
+        departement_id = conge.employe.departement_id
+        if departement_id in maxima:
+            periodes = [(d, f) for e, d, f in approuves[departement_id] if e != conge.employe_id]
+            pic, jour = pic_absences(periodes, conge.date_debut, conge.date_fin)
+            if pic + 1 > maxima[departement_id]:
+                refus.append((conge, f"effectif insuffisant le {jour:%d/%m/%Y}"))
+                continue
+            approuves[departement_id].append((conge.employe_id, conge.date_debut, conge.date_fin))
+        autres[conge.employe_id].append((conge.date_debut, conge.date_fin))
+        acceptes.append(conge)
+    return acceptes, refus
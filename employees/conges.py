@@ -0,0 +1,234 @@
+import calendar
+import datetime
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+
+from .calendrier import filtrer_approuvables
+from .dashboard import invalidate_dashboard_cache
+from .models import Conge, Employe, SoldeConge
+from .notifications import notifier_en_masse
+
+LIBELLES_DECISION = {'APPROUVE': 'APPROUVÉE', 'REJETE': 'REJETÉE'}
+
+
+def acquisition_mensuelle():
+    """{type de congé: jours acquis par mois travaillé}, réglé par CONGES_ACQUISITION_MENSUELLE."""
+    reglage = getattr(settings, 'CONGES_ACQUISITION_MENSUELLE', {'ANNUEL': '2.08'})
+    return {type_conge: Decimal(str(jours)) for type_conge, jours in reglage.items()}
+
+
+def fin_de_mois(annee, mois):
+    return datetime.date(annee, mois, calendar.monthrange(annee, mois)[1])
+
+
+def jours_ouvres(debut, fin):
+    """Jours ouvrés (lundi - vendredi) de la période, répartis par année civile."""
+    par_annee = Counter()
+    jour = debut
+    while jour <= fin:
+        if jour.weekday() < 5:
+            par_annee[jour.year] += 1
+        jour += datetime.timedelta(days=1)
+    return par_annee
+
+
+def _mouvement(employe_id, type_conge, annee, acquis=0, pris=0):
+    cle = {'employe_id': employe_id, 'type_conge': type_conge, 'annee': annee}
+    champs = {'acquis': F('acquis') + acquis, 'pris': F('pris') + pris}
+    if SoldeConge.objects.filter(**cle).update(**champs):
+        return
+    try:
+        with transaction.atomic():
+            SoldeConge.objects.create(**cle, acquis=acquis, pris=pris)
+    except IntegrityError:
+        # Ligne créée entre-temps par une autre requête
+        SoldeConge.objects.filter(**cle).update(**champs)
+
+
+def decompter(conges, signe=1):
+    """Ajoute (signe=1) ou retire (signe=-1) les jours des congés aux soldes, un UPDATE par compteur touché."""
+    deltas = Counter()
+    for conge in conges:
+        for annee, jours in jours_ouvres(conge.date_debut, conge.date_fin).items():
+            deltas[(conge.employe_id, conge.type_conge, annee)] += signe * jours
+    for (employe_id, type_conge, annee), jours in deltas.items():
+        if jours:
+            _mouvement(employe_id, type_conge, annee, pris=jours)
+
+
+def changer_statut(conge, statut):
+    """
+    Passe la demande au statut donné et répercute le changement sur les soldes dans
+    la même transaction, ainsi que la notification à l'employé. La ligne est
+    verrouillée : deux validations simultanées (double clic) ne décomptent qu'une
+    fois. Renvoie False si rien n'a changé.
+    """
+    with transaction.atomic():
+        ancien = Conge.objects.select_for_update().values_list('statut', flat=True).get(pk=conge.pk)
+        conge.statut = statut
+        if ancien == statut:
+            return False
+        Conge.objects.filter(pk=conge.pk).update(statut=statut)
+        # UPDATE direct : pas de post_save, le tableau de bord est invalidé ici
+        transaction.on_commit(invalidate_dashboard_cache)
+        if statut == 'APPROUVE':
+            decompter([conge], 1)
+        elif ancien == 'APPROUVE':
+            decompter([conge], -1)
+        notifier_decisions([conge], statut)
+    return True
+
+
+def peut_decider(scope, conge):
+    """Même règle que conge_approve / conge_reject ; conge.employe doit être chargé."""
+    if scope.is_superuser or scope.is_rh:
+        return True
+    if not scope.is_manager or not conge.employe.departement_id:
+        return False
+    # Un manager ne valide pas la demande d'un autre manager
+    return conge.employe.departement_id == scope.departement_id and conge.employe.role != 'MANAGER'
+
+
+def message_decision(conge, statut):
+    """(sujet, corps) du courriel annonçant la décision à l'employé."""
+    sujet = f"Votre demande de congé a été {LIBELLES_DECISION[statut]}"
+    verbe = "approuvée" if statut == 'APPROUVE' else "rejetée"
+    corps = (
+        f"Bonjour {conge.employe.prenom},\n\nVotre demande de congé du {conge.date_debut} "
+        f"au {conge.date_fin} a été {verbe}."
+    )
+    return sujet, corps
+
+
+def notifier_decisions(conges, statut):
+    notifier_en_masse([(conge.employe.email, *message_decision(conge, statut)) for conge in conges])
+
+
+@dataclass
+class BilanDecision:
+    traites: list = field(default_factory=list)
+    refus: list = field(default_factory=list)
+
+
+def decider(scope, conge_ids, statut, commentaire=''):
+    """
+    Approuve ou rejette un lot de demandes : une requête charge et verrouille les
+    demandes avec leur employé (droits vérifiés en mémoire), un seul UPDATE ...
+    WHERE id IN applique la décision ; soldes et notifications suivent dans la
+    même transaction. Renvoie un BilanDecision dont
+    `refus` liste (id, raison).
+    """
+    bilan = BilanDecision()
+    ids = set()
+    for conge_id in conge_ids:
+        try:
+            ids.add(int(conge_id))
+        except (TypeError, ValueError):
+            bilan.refus.append((conge_id, "identifiant invalide"))
+
+    with transaction.atomic():
+        conges = list(
+            Conge.objects.select_for_update(of=('self',)).select_related('employe').filter(pk__in=ids).order_by('pk')
+        )
+        bilan.refus += [(conge_id, "introuvable") for conge_id in sorted(ids - {c.pk for c in conges})]
+        candidats = []
+        for conge in conges:
+            if not peut_decider(scope, conge):
+                bilan.refus.append((conge.pk, "hors de votre périmètre"))
+            elif conge.statut == statut:
+                bilan.refus.append((conge.pk, "déjà traitée"))
+            else:
+                candidats.append(conge)
+        if statut == 'APPROUVE':
+            candidats, refus = filtrer_approuvables(candidats)
+            bilan.refus += [(conge.pk, raison) for conge, raison in refus]
+        if not candidats:
+            return bilan
+
+        champs = {'statut': statut}
+        if commentaire:
+            champs['commentaire_manager'] = commentaire
+        Conge.objects.filter(pk__in=[conge.pk for conge in candidats]).update(**champs)
+        transaction.on_commit(invalidate_dashboard_cache)
+        if statut == 'APPROUVE':
+            decompter(candidats, 1)
+        else:
+            decompter([conge for conge in candidats if conge.statut == 'APPROUVE'], -1)
+        for conge in candidats:
+            conge.statut = statut
+        notifier_decisions(candidats, statut)
+    bilan.traites = candidats
+    return bilan
+
+
+def solde(employe_id, type_conge='ANNUEL', annee=None):
+    """Solde courant : une lecture par clé unique, None si aucun compteur."""
+    annee = annee or datetime.date.today().year
+    return SoldeConge.objects.filter(employe_id=employe_id, type_conge=type_conge, annee=annee).first()
+
+
+def acquerir_mois(annee, mois):
+    """
+    Crédite le mois aux employés présents à la fin du mois : création groupée des
+    compteurs manquants puis un UPDATE par type de congé. Les mois sautés depuis
+    mois_acquis sont rattrapés au passage (un UPDATE de plus par mois sauté), aux
+    mêmes conditions que soldes_attendus. Idempotent grâce à mois_acquis. Renvoie
+    le nombre de compteurs crédités.
+    """
+    fin = fin_de_mois(annee, mois)
+    employes = Employe.objects.filter(date_embauche__lte=fin).values_list('id', flat=True)
+    total = 0
+    with transaction.atomic():
+        for type_conge, jours in acquisition_mensuelle().items():
+            SoldeConge.objects.bulk_create(
+                [SoldeConge(employe_id=employe_id, type_conge=type_conge, annee=annee) for employe_id in employes],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            compteurs = SoldeConge.objects.filter(type_conge=type_conge, annee=annee, mois_acquis__lt=mois)
+            premier = compteurs.aggregate(m=Min('mois_acquis'))['m']
+            if premier is None:
+                continue
+            # Mois sautés : crédités aux compteurs qui ne les ont pas encore, si l'employé
+            # était embauché à leur fin ; mois_acquis n'avance qu'avec le mois demandé
+            for m in range(premier + 1, mois):
+                compteurs.filter(mois_acquis__lt=m, employe__date_embauche__lte=fin_de_mois(annee, m)).update(
+                    acquis=F('acquis') + jours,
+                )
+            total += compteurs.filter(employe__date_embauche__lte=fin).update(
+                acquis=F('acquis') + jours, mois_acquis=mois,
+            )
+    return total
+
+
+def soldes_attendus(annee):
+    """
+    Soldes recalculés depuis l'historique : {(employe_id, type, annee): (acquis, pris)}.
+    Les jours acquis sont ceux des mois déjà crédités, au taux actuel.
+    """
+    attendus = {}
+    taux = acquisition_mensuelle()
+    debut, fin = datetime.date(annee, 1, 1), datetime.date(annee, 12, 31)
+    approuves = Conge.objects.filter(statut='APPROUVE', date_debut__lte=fin, date_fin__gte=debut)
+    pris = Counter()
+    for conge in approuves.only('employe_id', 'type_conge', 'date_debut', 'date_fin').iterator(chunk_size=2000):
+        pris[(conge.employe_id, conge.type_conge, annee)] += jours_ouvres(conge.date_debut, conge.date_fin)[annee]
+
+    soldes = SoldeConge.objects.filter(annee=annee).select_related('employe').only(
+        'employe_id', 'employe__date_embauche', 'type_conge', 'annee', 'mois_acquis',
+    )
+    for compteur in soldes.iterator(chunk_size=2000):
+        cle = (compteur.employe_id, compteur.type_conge, annee)
+        # Mêmes règles que acquerir_mois : un mois n'est acquis que si l'employé était embauché à sa fin
+        mois = sum(
+            1 for m in range(1, compteur.mois_acquis + 1) if compteur.employe.date_embauche <= fin_de_mois(annee, m)
+        )
+        attendus[cle] = (taux.get(compteur.type_conge, Decimal('0')) * mois, Decimal(pris.pop(cle, 0)))
+    for cle, jours in pris.items():
+        attendus[cle] = (Decimal('0'), Decimal(jours))
+    return attendus
@@ -0,0 +1,5 @@
+from .scope import get_access_scope
+
+
+def access_scope(request):
+    return {'access_scope': get_access_scope(request)}
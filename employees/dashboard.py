@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Employe, Departement, Conge, Formation
+
+# Niveaux de visibilité du tableau de bord
+GLOBAL = 'GLOBAL'
+RH = 'RH'
+DEPARTEMENT = 'DEPARTEMENT'
+AUCUN = 'AUCUN'
+
+# Clés du cache des indicateurs
+CACHE_VERSION_KEY = 'dashboard:version'
+CACHE_HITS_KEY = 'dashboard:hits'
+CACHE_MISSES_KEY = 'dashboard:misses'
+
+
+@dataclass(frozen=True)
+class DashboardScope:
+    niveau: str
+    departement_id: int = None
+    # Renseigné pour un simple employé : il ne suit que ses propres congés
+    employe_id: int = None
+
+
+@dataclass
+class DashboardStats:
+    total_employees: int = 0
+    total_pending_conges: int = 0
+    total_formations: int = 0
+    departements: list = field(default_factory=list)
+    recent_conges: list = field(default_factory=list)
+    anniversaires: list = field(default_factory=list)
+    arrivals_per_day: list = field(default_factory=list)
+
+
+def dashboard_scope_for(access_scope):
+    """Détermine le périmètre du tableau de bord à partir du périmètre d'accès."""
+    if access_scope.is_superadmin:
+        return DashboardScope(GLOBAL)
+    if access_scope.is_rh:
+        return DashboardScope(RH)
+    # Sans profil employé ni département : rien à montrer, comme partout ailleurs
+    if not access_scope.departement_id:
+        return DashboardScope(AUCUN)
+    if access_scope.is_dept_admin:
+        return DashboardScope(DEPARTEMENT, departement_id=access_scope.departement_id)
+    return DashboardScope(DEPARTEMENT, departement_id=access_scope.departement_id, employe_id=access_scope.employe_id)
+
+
+def compute_dashboard_stats(scope, today=None):
+    """
+    Calcule tous les indicateurs du tableau de bord pour un périmètre donné.
+
+    Six requêtes, quelle que soit la taille de l'entreprise : l'effectif et les
+    arrivées des 7 derniers jours en une agrégation conditionnelle, un COUNT pour
+    les congés en attente (index partiel conge_en_attente_idx), un pour les
+    formations, puis les trois listes (départements, congés récents,
+    anniversaires). Les listes ne se fondent pas dans un agrégat : la cible
+    d'une ou deux requêtes n'est tenue que pour les compteurs, et le cache
+    (get_dashboard_stats) évite ces requêtes à la plupart des connexions.
+    """
+    today = today or timezone.now().date()
+    last_7_days = [today - datetime.timedelta(days=i) for i in range(6, -1, -1)]
+
+    if scope.niveau == AUCUN:
+        stats = DashboardStats(
+            total_formations=Formation.objects.filter(departement__isnull=True).count(),
+        )
+        stats.arrivals_per_day = [{'day': day.strftime('%a'), 'count': 0} for day in last_7_days]
+        return stats
+
+    employees = Employe.objects.all()
+    conges = Conge.objects.all()
+    formations = Formation.objects.all()
+    departements = Departement.objects.all()
+
+    if scope.niveau == DEPARTEMENT:
+        employees = employees.in_departement(scope.departement_id)
+        departements = departements.filter(id=scope.departement_id)
+        formations = formations.in_departement(scope.departement_id)
+        if scope.employe_id:
+            conges = conges.filter(employe_id=scope.employe_id)
+        else:
+            conges = conges.in_departement(scope.departement_id)
+
+    # Effectif et arrivées par jour : un seul passage sur la table des employés
+    buckets = {f'jour_{i}': Count('id', filter=Q(date_embauche=day)) for i, day in enumerate(last_7_days)}
+    totaux = employees.aggregate(total=Count('id'), **buckets)
+
+    stats = DashboardStats(
+        total_employees=totaux['total'],
+        # Filtre plutôt qu'agrégat conditionnel : seul un WHERE statut = 'EN_ATTENTE' profite de l'index partiel
+        total_pending_conges=conges.filter(statut='EN_ATTENTE').count(),
+        total_formations=formations.count(),
+        arrivals_per_day=[
+            {'day': day.strftime('%a'), 'count': totaux[f'jour_{i}']}
+            for i, day in enumerate(last_7_days)
+        ],
+    )
+
+    stats.departements = list(departements.annotate(num_employees=Count('employes')).order_by('nom'))
+
+    recent_conges = conges.select_related('employe')
+    if not scope.employe_id:
+        # Un simple employé voit ses demandes récentes quel que soit leur statut
+        recent_conges = recent_conges.filter(statut='EN_ATTENTE')
+    stats.recent_conges = list(recent_conges.order_by('-date_debut')[:5])
+
+    stats.anniversaires = list(
+        employees.filter(date_naissance__month=today.month).order_by('date_naissance__day')
+    )
+    return stats
+
+
+def _cache_version():
+    # Valeur initiale horodatée : si la clé est évincée, les anciennes entrées
+    # ne peuvent pas redevenir valides.
+    cache.add(CACHE_VERSION_KEY, int(time.time()), None)
+    return cache.get(CACHE_VERSION_KEY)
+
+
+def _incr_counter(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def dashboard_cache_key(scope, today):
+    return 'dashboard:stats:{}:{}:{}:{}:{}'.format(
+        _cache_version(), scope.niveau, scope.departement_id or 0, scope.employe_id or 0, today.isoformat()
+    )
+
+
+def get_dashboard_stats(scope, today=None):
+    """Indicateurs du tableau de bord, servis depuis le cache quand c'est possible."""
+    today = today or timezone.now().date()
+    key = dashboard_cache_key(scope, today)
+    stats = cache.get(key)
+    if stats is not None:
+        _incr_counter(CACHE_HITS_KEY)
+        return stats
+
+    _incr_counter(CACHE_MISSES_KEY)
+    stats = compute_dashboard_stats(scope, today=today)
+    cache.set(key, stats, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return stats
+
+
+def invalidate_dashboard_cache():
+    """Invalide tous les instantanés en changeant de version."""
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, int(time.time()), None)
+
+
+def dashboard_cache_counters():
+    valeurs = cache.get_many([CACHE_HITS_KEY, CACHE_MISSES_KEY])
+    return {
+        'hits': valeurs.get(CACHE_HITS_KEY, 0),
+        'misses': valeurs.get(CACHE_MISSES_KEY, 0),
+    }
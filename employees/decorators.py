@@ -1,10 +1,12 @@
 from django.core.exceptions import PermissionDenied
 from functools import wraps
 
+from .scope import get_access_scope
+
 def superadmin_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if request.user.is_superuser or (hasattr(request.user, 'profil') and request.user.profil.is_superadmin):
+        if get_access_scope(request).is_superadmin:
             return view_func(request, *args, **kwargs)
         raise PermissionDenied
     return _wrapped_view
@@ -12,7 +14,8 @@ def superadmin_required(view_func):
 def dept_admin_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if request.user.is_superuser or (hasattr(request.user, 'profil') and request.user.profil.is_dept_admin):
+        scope = get_access_scope(request)
+        if scope.is_superuser or scope.is_dept_admin:
             return view_func(request, *args, **kwargs)
         raise PermissionDenied
     return _wrapped_view
@@ -20,7 +23,8 @@ def dept_admin_required(view_func):
 def rh_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if request.user.is_superuser or (hasattr(request.user, 'profil') and request.user.profil.is_rh):
+        scope = get_access_scope(request)
+        if scope.is_superuser or scope.is_rh:
             return view_func(request, *args, **kwargs)
         raise PermissionDenied
     return _wrapped_view
@@ -28,7 +32,8 @@ def rh_required(view_func):
 def manager_required(view_func):
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        if request.user.is_superuser or (hasattr(request.user, 'profil') and (request.user.profil.is_manager or request.user.profil.is_superadmin or request.user.profil.is_rh)):
+        scope = get_access_scope(request)
+        if scope.is_superuser or scope.is_manager or scope.is_superadmin or scope.is_rh:
             return view_func(request, *args, **kwargs)
         raise PermissionDenied
     return _wrapped_view
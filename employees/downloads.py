@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_etags
+
+from .storage import est_blob
+
+# Taille des blocs lus pour une réponse partielle (Range) servie par Django
+RANGE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(fieldfile, taille):
+    # Un blob adressé par son contenu porte déjà son empreinte dans son nom
+    nom = os.path.basename(fieldfile.name)
+    if est_blob(fieldfile.name):
+        return f'"{os.path.splitext(nom)[0]}"'
+    mtime = int(os.path.getmtime(fieldfile.path))
+    return f'"{taille:x}-{mtime:x}"'
+
+
+def parse_range(header, taille):
+    """
+    (début, fin) inclusifs pour un en-tête `Range: bytes=...` à plage unique,
+    None pour l'ignorer (absent, multiple ou mal formé), ou 'invalide' si la
+    plage ne peut pas être satisfaite.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    debut, fin = match.groups()
+    if debut == '':
+        # Suffixe : les n derniers octets
+        n = int(fin)
+        if n == 0:
+            return 'invalide'
+        return max(taille - n, 0), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or fin < debut:
+        return 'invalide'
+    return debut, fin
+
+
+def _lire_plage(fichier, debut, longueur):
+    try:
+        fichier.seek(debut)
+        while longueur > 0:
+            bloc = fichier.read(min(RANGE_CHUNK_SIZE, longueur))
+            if not bloc:
+                break
+            longueur -= len(bloc)
+            yield bloc
+    finally:
+        fichier.close()
+
+
+def serve_file(request, fieldfile, filename):
+    """
+    Sert un fichier déjà autorisé. Déchargé vers le serveur web si DOWNLOAD_OFFLOAD
+    est configuré ('x-accel-redirect' pour nginx, 'x-sendfile' pour Apache / lighttpd),
+    sinon lu par blocs (FileResponse utilise wsgi.file_wrapper / sendfile quand le
+    serveur WSGI le propose). Gère ETag / If-None-Match et les requêtes Range.
+    """
+    taille = fieldfile.size
+    etag = file_etag(fieldfile, taille)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')) or request.headers.get('If-None-Match') == '*':
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    offload = getattr(settings, 'DOWNLOAD_OFFLOAD', None)
+    if offload:
+        # Le serveur web lit le fichier et gère lui-même Range : aucun octet ne passe par Python
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix + quote(fieldfile.name)
+        else:
+            response['X-Sendfile'] = fieldfile.path
+    else:
+        plage = parse_range(request.headers.get('Range'), taille)
+        if plage is not None and request.headers.get('If-Range', etag) != etag:
+            # Le fichier a changé depuis la première partie : on renvoie tout
+            plage = None
+        if plage == 'invalide':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{taille}'
+            return response
+        if plage:
+            debut, fin = plage
+            response = StreamingHttpResponse(
+                _lire_plage(fieldfile.open('rb'), debut, fin - debut + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+            response['Content-Length'] = str(fin - debut + 1)
+        else:
+            response = FileResponse(fieldfile.open('rb'), content_type=content_type)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment=False, filename=filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
@@ -0,0 +1,387 @@
+import csv
+import datetime
+import tempfile
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import (
+    Employe, Contrat, Conge, Absence, Presence, FichePaie, Prime, Evaluation,
+    Objectif, Formation, InscriptionFormation, OffreEmploi, Candidature, DocumentRH
+)
+
+# Nombre de lignes lues par aller-retour avec la base pendant un export
+EXPORT_CHUNK_SIZE = 2000
+
+EMPLOYEE_CSV_COLUMNS = [
+    ('Matricule', 'matricule'),
+    ('Nom', 'nom'),
+    ('Prénom', 'prenom'),
+    ('Email', 'email'),
+    ('Poste', 'poste__titre'),
+    ('Département', 'departement__nom'),
+    ('Date Embauche', 'date_embauche'),
+    ('Salaire', 'salaire'),
+]
+
+EMPLOYE_COLUMNS = ('employe__matricule', 'employe__nom', 'employe__prenom')
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    model: type
+    # Colonnes exportées quand l'appelant n'en choisit pas ; seules jointures autorisées
+    fields: tuple
+    # Champ filtré par la période du / au
+    date_field: str = None
+    # Données de paie ou de recrutement : RH et superadmin uniquement, quel que soit le périmètre
+    rh_only: bool = False
+    # Colonnes de paie d'un modèle par ailleurs ouvert aux managers : réservées de la même façon
+    rh_only_fields: tuple = ()
+
+
+EXPORTS = {
+    'employes': ExportSpec(Employe, (
+        'id', 'matricule', 'nom', 'prenom', 'email', 'telephone', 'poste__titre', 'departement__nom',
+        'role', 'date_embauche', 'salaire',
+    ), 'date_embauche', rh_only_fields=('salaire',)),
+    'contrats': ExportSpec(Contrat, EMPLOYE_COLUMNS + (
+        'type_contrat__nom', 'date_debut', 'date_fin', 'actif',
+    ), 'date_debut'),
+    'conges': ExportSpec(Conge, EMPLOYE_COLUMNS + (
+        'type_conge', 'date_debut', 'date_fin', 'statut', 'validateur__matricule',
+    ), 'date_debut'),
+    'absences': ExportSpec(Absence, EMPLOYE_COLUMNS + ('date', 'motif', 'justifie'), 'date'),
+    'presences': ExportSpec(Presence, EMPLOYE_COLUMNS + (
+        'date', 'heure_arrivee', 'heure_depart', 'heures_travaillees', 'heures_sup',
+    ), 'date'),
+    'fiches-paie': ExportSpec(FichePaie, EMPLOYE_COLUMNS + (
+        'annee', 'mois', 'salaire_base', 'primes', 'deductions', 'net_a_payer', 'date_paiement',
+    ), 'date_paiement', rh_only=True),
+    'primes': ExportSpec(Prime, EMPLOYE_COLUMNS + ('montant', 'motif', 'date'), 'date', rh_only=True),
+    'evaluations': ExportSpec(Evaluation, EMPLOYE_COLUMNS + (
+        'evaluateur__matricule', 'date', 'score',
+    ), 'date'),
+    'objectifs': ExportSpec(Objectif, EMPLOYE_COLUMNS + ('description', 'date_limite', 'realise'), 'date_limite'),
+    'formations': ExportSpec(Formation, (
+        'id', 'titre', 'departement__nom', 'date_debut', 'date_fin', 'budget',
+    ), 'date_debut'),
+    'inscriptions-formation': ExportSpec(InscriptionFormation, EMPLOYE_COLUMNS + (
+        'formation__titre', 'formation__date_debut', 'statut',
+    ), 'formation__date_debut'),
+    'offres-emploi': ExportSpec(OffreEmploi, (
+        'id', 'titre', 'departement__nom', 'date_publication', 'cloturee',
+    ), 'date_publication'),
+    'candidatures': ExportSpec(Candidature, (
+        'offre__titre', 'nom', 'prenom', 'email', 'statut',
+    ), rh_only=True),
+    'documents-rh': ExportSpec(DocumentRH, EMPLOYE_COLUMNS + ('titre', 'type_doc', 'date_ajout'), 'date_ajout'),
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(ValueError):
+    """Paramètres d'export invalides (modèle, format, colonne ou période)."""
+
+
+def parse_export_date(valeur):
+    if not valeur:
+        return None
+    try:
+        return datetime.date.fromisoformat(valeur)
+    except ValueError:
+        raise ExportError(f"Date invalide : {valeur} (format attendu AAAA-MM-JJ)")
+
+
+def resolve_field(model, lookup):
+    """Champ Django désigné par `lookup` ('employe__matricule'), ou ExportError."""
+    field = None
+    for name in lookup.split('__'):
+        if field is not None:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                raise ExportError(f"Colonne inconnue : {lookup}")
+            model = field.related_model
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ExportError(f"Colonne inconnue : {lookup}")
+        if not field.concrete or field.many_to_many:
+            raise ExportError(f"Colonne inconnue : {lookup}")
+    if field.is_relation:
+        # Une clé étrangère s'exporte sous forme d'identifiant
+        field = field.target_field
+    return field
+
+
+def allowed_fields(spec):
+    """
+    Colonnes propres au modèle et jointures listées dans la spec : pas de
+    parcours arbitraire des relations (employe__user__password...).
+    """
+    propres = {f.attname for f in spec.model._meta.concrete_fields} | {
+        f.name for f in spec.model._meta.concrete_fields
+    }
+    return propres | set(spec.fields)
+
+
+def scoped_queryset(model, scope):
+    """Lignes de `model` visibles dans le périmètre d'accès `scope`."""
+    queryset = model._default_manager.all()
+    if hasattr(queryset, 'visible_to'):
+        return queryset.visible_to(scope)
+    if scope.sees_all:
+        return queryset
+    field_names = {f.name for f in model._meta.get_fields()}
+    if 'employe' in field_names:
+        # Même règle que les présences : le manager voit son département, l'employé ses lignes
+        if scope.is_manager:
+            if not scope.departement_id:
+                return queryset.none()
+            return queryset.filter(employe__departement_id=scope.departement_id)
+        return queryset.filter(employe_id=scope.employe_id)
+    if 'offre' in field_names and scope.is_manager and scope.departement_id:
+        return queryset.filter(offre__departement_id=scope.departement_id)
+    return queryset.none()
+
+
+def sees_pay(scope):
+    """Vrai si `scope` peut exporter des données de paie (salaires, primes, fiches)."""
+    return scope.is_superadmin or scope.is_rh
+
+
+def employee_csv_columns(scope):
+    """Colonnes de l'export CSV des employés : sans le salaire hors RH."""
+    if sees_pay(scope):
+        return EMPLOYEE_CSV_COLUMNS
+    return [(entete, champ) for entete, champ in EMPLOYEE_CSV_COLUMNS if champ != 'salaire']
+
+
+def build_export_queryset(spec, scope, fields=None, du=None, au=None):
+    if spec.rh_only and not sees_pay(scope):
+        raise PermissionDenied
+    if fields:
+        fields = tuple(fields)
+        if not sees_pay(scope) and set(fields) & set(spec.rh_only_fields):
+            raise PermissionDenied
+    elif sees_pay(scope):
+        fields = spec.fields
+    else:
+        fields = tuple(f for f in spec.fields if f not in spec.rh_only_fields)
+    for lookup in fields:
+        if lookup not in allowed_fields(spec):
+            raise ExportError(f"Colonne inconnue : {lookup}")
+
+    queryset = scoped_queryset(spec.model, scope)
+    if du or au:
+        if not spec.date_field:
+            raise ExportError("Ce modèle ne peut pas être filtré par période.")
+        lookup = spec.date_field
+        if isinstance(resolve_field(spec.model, lookup), models.DateTimeField):
+            lookup += '__date'
+        periode = Q()
+        if du:
+            periode &= Q(**{f'{lookup}__gte': du})
+        if au:
+            periode &= Q(**{f'{lookup}__lte': au})
+        queryset = queryset.filter(periode)
+    # Ordre stable sur la clé primaire : deux extraits identiques sont comparables
+    return queryset.order_by('pk').values_list(*fields), fields
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Lignes lues par paquets depuis un curseur serveur."""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _chunks(rows, size=EXPORT_CHUNK_SIZE):
+    paquet = []
+    for row in rows:
+        paquet.append(row)
+        if len(paquet) >= size:
+            yield paquet
+            paquet = []
+    if paquet:
+        yield paquet
+
+
+class _Echo:
+    """Pseudo-fichier : csv.writer écrit une ligne, on la renvoie telle quelle."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère le CSV ligne par ligne à partir d'un curseur serveur : la mémoire
+    consommée ne dépend pas du nombre de lignes exportées.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow([entete for entete, _ in columns])
+    rows = queryset.values_list(*[champ for _, champ in columns]).iterator(chunk_size=chunk_size)
+    for row in rows:
+        # Les jointures absentes (employé sans poste) donnent None : cellule vide
+        yield writer.writerow(row)
+
+
+def encode_csv(rows, fields, model):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode('utf-8')
+    for paquet in _chunks(rows):
+        yield ''.join(writer.writerow(row) for row in paquet).encode('utf-8')
+
+
+def encode_jsonl(rows, fields, model):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for paquet in _chunks(rows):
+        yield ''.join(encoder.encode(dict(zip(fields, row))) + '\n' for row in paquet).encode('utf-8')
+
+
+class _Collecteur:
+    """Pseudo-fichier binaire dont on vide le contenu après chaque paquet encodé."""
+
+    def __init__(self):
+        self.morceaux = []
+        self.closed = False
+
+    def write(self, data):
+        self.morceaux.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        data = b''.join(self.morceaux)
+        self.morceaux = []
+        return data
+
+
+def _arrow_type(pa, field):
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64('us')
+    return pa.string()
+
+
+def encode_parquet(rows, fields, model):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("L'export Parquet nécessite la dépendance 'pyarrow'.") from exc
+
+    # Schéma déduit des champs et non des valeurs : un paquet entièrement vide
+    # (NULL) ne doit pas changer le type d'une colonne
+    schema = pa.schema([(f, _arrow_type(pa, resolve_field(model, f))) for f in fields])
+    return _iter_parquet(pa, pq, schema, rows)
+
+
+def _iter_parquet(pa, pq, schema, rows):
+    # Un groupe de lignes Parquet par paquet, transmis dès qu'il est écrit
+    sink = _Collecteur()
+    writer = pq.ParquetWriter(sink, schema)
+    for paquet in _chunks(rows):
+        colonnes = list(zip(*paquet))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(colonne, type=schema.field(i).type) for i, colonne in enumerate(colonnes)],
+            schema=schema,
+        ))
+        yield sink.vider()
+    writer.close()
+    yield sink.vider()
+
+
+def encode_xlsx(rows, fields, model):
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise RuntimeError("L'export XLSX nécessite la dépendance 'openpyxl'.") from exc
+
+    # Le format zip ne se termine qu'à la fermeture : les lignes sont écrites au fil
+    # de l'eau (mode write_only), le classeur est assemblé dans un fichier temporaire
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(model._meta.verbose_name_plural[:31])
+    sheet.append(list(fields))
+    for row in rows:
+        sheet.append([
+            value.replace(tzinfo=None) if getattr(value, 'tzinfo', None) else value
+            for value in row
+        ])
+    fichier = tempfile.TemporaryFile()
+    workbook.save(fichier)
+    fichier.seek(0)
+    return fichier
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+    'parquet': encode_parquet,
+    'xlsx': encode_xlsx,
+}
+
+
+def write_export(out, slug, scope, format='csv', fields=None, du=None, au=None):
+    """Écrit l'export dans le fichier binaire `out` (commande de gestion)."""
+    spec, queryset, fields = _prepare(slug, format, scope, fields, du, au)
+    contenu = ENCODERS[format](iter_rows(queryset), fields, spec.model)
+    if format == 'xlsx':
+        with contenu:
+            while morceau := contenu.read(64 * 1024):
+                out.write(morceau)
+        return
+    for morceau in contenu:
+        out.write(morceau)
+
+
+def export_response(slug, scope, format='csv', fields=None, du=None, au=None):
+    spec, queryset, fields = _prepare(slug, format, scope, fields, du, au)
+    content_type, extension = FORMATS[format]
+    filename = f'{slug}.{extension}'
+    contenu = ENCODERS[format](iter_rows(queryset), fields, spec.model)
+    if format == 'xlsx':
+        return FileResponse(contenu, as_attachment=True, filename=filename, content_type=content_type)
+    response = StreamingHttpResponse(contenu, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _prepare(slug, format, scope, fields, du, au):
+    if slug not in EXPORTS:
+        raise ExportError(f"Export inconnu : {slug}")
+    if format not in FORMATS:
+        raise ExportError(f"Format inconnu : {format}")
+    spec = EXPORTS[slug]
+    queryset, fields = build_export_queryset(spec, scope, fields, du, au)
+    return spec, queryset, fields
+
+
+def streaming_csv_response(queryset, columns, filename):
+    response = StreamingHttpResponse(iter_csv_rows(queryset, columns), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,9 +1,11 @@
 from django import forms
 from .models import (
     Employe, Departement, Poste, Conge, Absence, Presence, 
-    FichePaie, Prime, Evaluation, Objectif, Formation, 
+    FichePaie, CyclePaie, Prime, Evaluation, Objectif, Formation, 
     InscriptionFormation, OffreEmploi, Candidature, DocumentRH
 )
+from .calendrier import verifier_demande
+from .conges import solde
 
 class EmployeForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput(), required=False, label="Mot de passe (laisser vide pour ne pas changer)")
@@ -18,7 +20,7 @@ class EmployeForm(forms.ModelForm):
         }
 
     def __init__(self, *args, **kwargs):
-        self.user = kwargs.pop('user', None)
+        self.scope = kwargs.pop('scope', None)
         super().__init__(*args, **kwargs)
         
         if not self.instance.pk:
@@ -26,18 +28,16 @@ class EmployeForm(forms.ModelForm):
             self.fields['password'].help_text = "Laisser vide pour utiliser le mot de passe par défaut (departement123 pour les chefs, password123 pour les employés)"
         
         # Filtre pour les managers (Chefs de Département)
-        if self.user and not self.user.is_superuser:
-            if hasattr(self.user, 'profil'):
-                profil = self.user.profil
-                if not profil.is_rh and profil.is_manager:
-                    # Restreindre les postes au département du manager
-                    if profil.poste:
-                        self.fields['poste'].queryset = Poste.objects.filter(departement=profil.poste.departement)
-                        self.fields['leads_departement'].queryset = Departement.objects.filter(id=profil.poste.departement.id)
-                    
-                    # Un manager ne peut créer que des simples employés par défaut
-                    self.fields['role'].choices = [('EMPLOYE', 'Employé')]
-                    self.fields['role'].initial = 'EMPLOYE'
+        scope = self.scope
+        if scope and not scope.is_superuser and scope.is_manager:
+            # Restreindre les postes au département du manager
+            if scope.departement_id:
+                self.fields['poste'].queryset = Poste.objects.filter(departement_id=scope.departement_id)
+                self.fields['leads_departement'].queryset = Departement.objects.filter(id=scope.departement_id)
+            
+            # Un manager ne peut créer que des simples employés par défaut
+            self.fields['role'].choices = [('EMPLOYE', 'Employé')]
+            self.fields['role'].initial = 'EMPLOYE'
 
         if self.instance and self.instance.pk:
             try:
@@ -116,16 +116,33 @@ class CongeForm(forms.ModelForm):
         }
 
     def __init__(self, *args, **kwargs):
-        user = kwargs.pop('user', None)
+        scope = kwargs.pop('scope', None)
+        self.scope = scope
         super().__init__(*args, **kwargs)
-        if user and hasattr(user, 'profil'):
-            profil = user.profil
-            if profil.role == 'MANAGER':
+        if scope and scope.has_profil:
+            if scope.role == 'MANAGER':
                 # Si c'est un manager, il ne peut choisir que des RH comme validateurs
                 self.fields['validateur'].queryset = Employe.objects.filter(role='RH')
-            elif profil.role == 'EMPLOYE':
+            elif scope.role == 'EMPLOYE':
                 # Si c'est un employé, il peut choisir des Managers ou RH
                 self.fields['validateur'].queryset = Employe.objects.filter(role__in=['MANAGER', 'RH'])
+            compteur = solde(scope.employe_id)
+            if compteur:
+                self.fields['type_conge'].help_text = (
+                    f"Congé annuel {compteur.annee} : {compteur.restant} jour(s) restant(s) "
+                    f"sur {compteur.acquis} acquis."
+                )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        debut, fin = cleaned_data.get('date_debut'), cleaned_data.get('date_fin')
+        # La demande est toujours faite pour soi (voir conge_request)
+        if debut and fin and self.scope and self.scope.has_profil:
+            for erreur in verifier_demande(
+                self.scope.employe_id, self.scope.departement_id, debut, fin, exclure=self.instance.pk,
+            ):
+                self.add_error(None, erreur)
+        return cleaned_data
 
 class AbsenceForm(forms.ModelForm):
     class Meta:
@@ -158,6 +175,20 @@ class FichePaieForm(forms.ModelForm):
             'net_a_payer',
         ]
 
+class CyclePaieForm(forms.ModelForm):
+    class Meta:
+        model = CyclePaie
+        fields = ['mois', 'annee', 'departement']
+        help_texts = {
+            'departement': "Laisser vide pour toute l'entreprise.",
+        }
+
+    def clean_mois(self):
+        mois = self.cleaned_data['mois']
+        if not 1 <= mois <= 12:
+            raise forms.ValidationError("Le mois doit être compris entre 1 et 12.")
+        return mois
+
 class EvaluationForm(forms.ModelForm):
     class Meta:
         model = Evaluation
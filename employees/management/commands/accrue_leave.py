@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employees.conges import acquerir_mois
+
+
+class Command(BaseCommand):
+    help = (
+        "Acquisition mensuelle des congés (CONGES_ACQUISITION_MENSUELLE). Sans --mois, crédite "
+        "tous les mois écoulés de l'année qui ne l'ont pas encore été"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', type=int)
+        parser.add_argument('--annee', type=int)
+
+    def handle(self, *args, **options):
+        aujourd_hui = timezone.localdate()
+        annee = options['annee'] or aujourd_hui.year
+        if options['mois']:
+            if not 1 <= options['mois'] <= 12:
+                raise CommandError("Le mois doit être compris entre 1 et 12.")
+            mois = [options['mois']]
+        else:
+            # Mois terminés uniquement ; rattrape un mois oublié sans créditer deux fois les autres
+            dernier = 12 if annee < aujourd_hui.year else aujourd_hui.month - 1
+            mois = range(1, dernier + 1)
+
+        for m in mois:
+            n = acquerir_mois(annee, m)
+            self.stdout.write(f"{m:02d}/{annee} : {n} compteur(s) crédité(s).")
@@ -0,0 +1,46 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from employees.pdf import PayslipTemplate, render_fiche_paie, render_fiches_paie
+
+
+class Command(BaseCommand):
+    help = "Compare le coût de rendu d'une fiche de paie : mise en page complète, gabarit réutilisé, document groupé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+
+    def handle(self, *args, **options):
+        for taille in options['sizes']:
+            fiches = [
+                {
+                    'employe': f"Prénom{i} Nom{i} (M{i:06d})",
+                    'mois': 3,
+                    'annee': 2025,
+                    'date_paiement': datetime.date(2025, 3, 28),
+                    'salaire_base': Decimal('2000.00') + i % 500,
+                    'primes': Decimal('150.00'),
+                    'deductions': Decimal('430.00'),
+                    'net_a_payer': Decimal('1720.00') + i % 500,
+                }
+                for i in range(taille)
+            ]
+            self.stdout.write(f"{taille} fiches")
+            # Ancien comportement : mise en page reconstruite pour chaque fiche, flux ASCII85
+            self.mesurer("avant (1 doc / fiche)", taille, lambda: [
+                PayslipTemplate(ascii85=True).render([d], "Fiche de paie", reutiliser_gabarit=False) for d in fiches
+            ])
+            self.mesurer("gabarit (1 doc / fiche)", taille, lambda: [render_fiche_paie(d) for d in fiches])
+            self.mesurer("gabarit (doc groupé)", taille, lambda: [render_fiches_paie(fiches)])
+
+    def mesurer(self, libelle, taille, rendu):
+        debut = time.perf_counter()
+        documents = rendu()
+        duree = time.perf_counter() - debut
+        octets = sum(len(d) for d in documents)
+        self.stdout.write(
+            f"  {libelle:<26} {1000 * duree / taille:7.3f} ms/fiche  {duree:7.2f} s  {octets / 1024:9.0f} Ko"
+        )
@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from employees.models import Departement, Employe, Poste
+from employees.search import build_search_document, search_employees
+
+PRENOMS = ["Jean", "Hélène", "Zoé", "François", "Loïc", "Maëlle", "Jérôme", "Céline", "Noël", "Agnès"]
+NOMS = ["Dupont", "Lefèvre", "Gaëtan", "Côté", "Bérénice", "Moreau", "Rousseau", "Garçon", "Faure", "Mercier"]
+TERMES = ["lefevre", "Hélène", "cote", "moreau jean", "dev"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare la recherche indexée de l'annuaire au filtre icontains historique (données jetables)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        for taille in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._bench(taille, options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _bench(self, taille, repeat):
+        dept = Departement.objects.create(nom="Bench", code="BENCH-S")
+        postes = [Poste.objects.create(titre=titre, departement=dept) for titre in ("Développeur", "Comptable", "Technicien")]
+        base = Employe.objects.count()
+        lot = []
+        for i in range(taille):
+            employe = Employe(
+                nom=random.choice(NOMS), prenom=random.choice(PRENOMS), matricule=f"B{base + i:07d}",
+                email=f"bench{base + i}@example.com", poste=random.choice(postes), departement=dept,
+                date_embauche=date.today(), salaire=2000,
+            )
+            employe.search_document = build_search_document(employe)
+            lot.append(employe)
+        Employe.objects.bulk_create(lot, batch_size=5000)
+
+        def ancien(terme):
+            return list(Employe.objects.filter(
+                Q(nom__icontains=terme) | Q(prenom__icontains=terme) |
+                Q(matricule__icontains=terme) | Q(poste__titre__icontains=terme)
+            ).order_by('nom', 'id')[:50])
+
+        def nouveau(terme):
+            return list(search_employees(Employe.objects.all(), terme).order_by('-search_rank', 'nom', 'id')[:50])
+
+        self.stdout.write(f"{taille} employés")
+        for terme in TERMES:
+            mesures = {}
+            for nom, fonction in (("icontains", ancien), ("index", nouveau)):
+                durees = []
+                for _ in range(repeat):
+                    debut = time.perf_counter()
+                    resultats = fonction(terme)
+                    durees.append((time.perf_counter() - debut) * 1000)
+                mesures[nom] = (statistics.median(durees), len(resultats))
+            self.stdout.write(
+                f"  {terme!r:14} icontains {mesures['icontains'][0]:8.2f} ms ({mesures['icontains'][1]} rés.)"
+                f"   index {mesures['index'][0]:8.2f} ms ({mesures['index'][1]} rés.)"
+            )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q, OuterRef, Subquery
+
+from employees.models import Employe, Poste
+
+
+class Command(BaseCommand):
+    help = "Vérifie que Employe.departement correspond au département du poste (et corrige avec --fix)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Corrige les écarts détectés")
+
+    def handle(self, *args, **options):
+        sans_poste = Employe.objects.filter(poste__isnull=True, departement__isnull=False)
+        divergents = Employe.objects.filter(poste__isnull=False).filter(
+            ~Q(departement_id=F('poste__departement_id')) | Q(departement__isnull=True)
+        )
+
+        ecarts = sans_poste.count() + divergents.count()
+        if not ecarts:
+            self.stdout.write(self.style.SUCCESS("Départements des employés cohérents."))
+            return
+
+        for employe in divergents.select_related('poste')[:20]:
+            self.stdout.write(f"  {employe} : département {employe.departement_id} au lieu de {employe.poste.departement_id}")
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING(f"{ecarts} employé(s) incohérent(s). Relancer avec --fix pour corriger."))
+            return
+
+        sans_poste.update(departement=None)
+        divergents.update(
+            departement_id=Subquery(Poste.objects.filter(pk=OuterRef('poste_id')).values('departement_id')[:1])
+        )
+        self.stdout.write(self.style.SUCCESS(f"{ecarts} employé(s) corrigé(s)."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from employees.models import Departement
+from employees.pointage import calculer_heures
+
+
+class Command(BaseCommand):
+    help = "Calcule les heures travaillées et les heures supplémentaires d'un mois de présences (mois en cours par défaut)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', type=int)
+        parser.add_argument('--annee', type=int)
+        parser.add_argument('--departement', type=int, help="Identifiant du département (toute l'entreprise par défaut)")
+
+    def handle(self, *args, **options):
+        aujourd_hui = timezone.localdate()
+        mois = options['mois'] or aujourd_hui.month
+        annee = options['annee'] or aujourd_hui.year
+        if not 1 <= mois <= 12:
+            raise CommandError("Le mois doit être compris entre 1 et 12.")
+        if options['departement'] and not Departement.objects.filter(pk=options['departement']).exists():
+            raise CommandError(f"Département inconnu : {options['departement']}")
+
+        debut = time.perf_counter()
+        n = calculer_heures(annee, mois, options['departement'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{n} présence(s) de {mois:02d}/{annee} calculée(s) en {time.perf_counter() - debut:.2f} s."
+        ))
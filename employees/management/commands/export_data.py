@@ -0,0 +1,49 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.exports import EXPORTS, FORMATS, ExportError, parse_export_date, write_export
+from employees.scope import AccessScope, resolve_access_scope
+
+
+class Command(BaseCommand):
+    help = "Exporte un modèle RH (CSV, JSON Lines, XLSX ou Parquet) pour les extractions paie / BI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('modele', choices=sorted(EXPORTS))
+        parser.add_argument('--format', default='csv', choices=sorted(FORMATS))
+        parser.add_argument('--fields', default='', help="Colonnes séparées par des virgules (ex. employe__matricule,net_a_payer)")
+        parser.add_argument('--du', help="Début de période (AAAA-MM-JJ)")
+        parser.add_argument('--au', help="Fin de période (AAAA-MM-JJ)")
+        parser.add_argument('--utilisateur', help="Restreint l'export au périmètre de cet utilisateur")
+        parser.add_argument('--output', '-o', help="Fichier de sortie (sortie standard par défaut)")
+
+    def handle(self, *args, **options):
+        scope = AccessScope(is_authenticated=True, is_superuser=True)
+        if options['utilisateur']:
+            try:
+                scope = resolve_access_scope(User.objects.get(username=options['utilisateur']))
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['utilisateur']}")
+
+        fields = [f for f in options['fields'].split(',') if f] or None
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            write_export(
+                out,
+                options['modele'],
+                scope,
+                format=options['format'],
+                fields=fields,
+                du=parse_export_date(options['du']),
+                au=parse_export_date(options['au']),
+            )
+        except (ExportError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+        except PermissionDenied:
+            raise CommandError(f"{options['modele']} : données de paie ou de recrutement réservées aux RH.")
+        finally:
+            if options['output']:
+                out.close()
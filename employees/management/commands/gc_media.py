@@ -0,0 +1,126 @@
+import datetime
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from employees.models import FichierStocke
+from employees.storage import CAS_FIELDS, CAS_PREFIX, cas_storage, est_blob, noms_references
+
+
+class Command(BaseCommand):
+    help = (
+        "Ramasse-miettes du stockage par contenu : recompte les références des blobs "
+        "et supprime ceux qui ne sont plus utilisés, ainsi que les fichiers de cas/ sans ligne en base"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=float, default=getattr(settings, 'CAS_GC_GRACE_HOURS', 24),
+            help="Âge minimal (heures) d'un blob non référencé avant suppression",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Affiche sans rien supprimer")
+        parser.add_argument(
+            '--migrer', action='store_true',
+            help="Déplace d'abord les fichiers hérités (hors cas/) dans le stockage par contenu",
+        )
+
+    def handle(self, *args, **options):
+        if options['migrer']:
+            self.migrer(options['dry_run'])
+
+        # Marquage : les tables font foi, le compteur n'est qu'un raccourci
+        compte = noms_references()
+        corriges = []
+        for blob in FichierStocke.objects.only('id', 'nom', 'references').iterator(chunk_size=2000):
+            reel = compte.get(blob.nom, 0)
+            if blob.references != reel:
+                blob.references = reel
+                corriges.append(blob)
+        if corriges and not options['dry_run']:
+            FichierStocke.objects.bulk_update(corriges, ['references'], batch_size=1000)
+        if corriges:
+            self.stdout.write(self.style.WARNING(f"{len(corriges)} compteur(s) de références corrigé(s)."))
+
+        # Balayage
+        limite = timezone.now() - datetime.timedelta(hours=options['grace'])
+        orphelins = FichierStocke.objects.filter(references__lte=0, dernier_usage__lt=limite)
+        supprimes, octets = 0, 0
+        for blob in orphelins.iterator(chunk_size=500):
+            if compte.get(blob.nom):
+                continue
+            if not options['dry_run']:
+                # Suppression conditionnelle : un envoi du même contenu depuis la lecture garde le blob
+                supprime, _ = orphelins.filter(pk=blob.pk).delete()
+                if not supprime:
+                    continue
+                cas_storage().purge(blob.nom)
+            supprimes += 1
+            octets += blob.taille
+
+        sans_ligne, octets_sans_ligne = self.balayer_fichiers(limite, options['dry_run'])
+        supprimes += sans_ligne
+        octets += octets_sans_ligne
+
+        partages = sum(1 for n in compte.values() if n > 1)
+        verbe = "à supprimer" if options['dry_run'] else "supprimé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{supprimes} blob(s) {verbe} ({octets / 1024 / 1024:.1f} Mo), "
+            f"{partages} blob(s) partagé(s) par plusieurs fiches ou documents."
+        ))
+
+    def balayer_fichiers(self, limite, dry_run):
+        """
+        Fichiers de cas/ sans ligne FichierStocke (écrits par une transaction
+        annulée, ou temporaires d'une écriture interrompue), plus vieux que `limite`.
+        """
+        storage = cas_storage()
+        racine = storage.path(CAS_PREFIX)
+        candidats = {}
+        for dossier, _, fichiers in os.walk(racine):
+            for fichier in fichiers:
+                chemin = os.path.join(dossier, fichier)
+                stat = os.stat(chemin)
+                if datetime.datetime.fromtimestamp(stat.st_mtime, tz=datetime.timezone.utc) >= limite:
+                    continue
+                nom = CAS_PREFIX + os.path.relpath(chemin, racine).replace(os.sep, '/')
+                candidats[nom] = stat.st_size
+
+        supprimes, octets = 0, 0
+        noms = list(candidats)
+        for i in range(0, len(noms), 500):
+            paquet = noms[i:i + 500]
+            connus = set(FichierStocke.objects.filter(nom__in=paquet).values_list('nom', flat=True))
+            for nom in paquet:
+                if nom in connus:
+                    continue
+                supprimes += 1
+                octets += candidats[nom]
+                if not dry_run:
+                    storage.purge(nom)
+        return supprimes, octets
+
+    def migrer(self, dry_run):
+        storage = cas_storage()
+        anciens = set()
+        for model_name, field in CAS_FIELDS:
+            model = apps.get_model('employees', model_name)
+            lignes = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for pk, nom in lignes.values_list('pk', field).iterator(chunk_size=500):
+                if est_blob(nom) or not storage.exists(nom):
+                    continue
+                anciens.add(nom)
+                if dry_run:
+                    continue
+                with storage.open(nom) as fichier:
+                    nouveau = storage.save(nom, fichier)
+                # UPDATE direct : le compteur est recalculé juste après par le marquage
+                model.objects.filter(pk=pk).update(**{field: nouveau})
+        self.stdout.write(f"{len(anciens)} fichier(s) hérité(s) {'à migrer' if dry_run else 'migré(s)'}.")
+        if not dry_run:
+            restants = noms_references()
+            for nom in anciens:
+                if not restants.get(nom):
+                    storage.purge(nom)
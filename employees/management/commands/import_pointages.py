@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.pointage import POINTAGE_BATCH_SIZE, importer_journal
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des journaux de badgeages (CSV matricule,horodatage ou JSON Lines) : "
+        "doublons éliminés, arrivées et départs appariés par employé et par jour"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichiers', nargs='+', help="Journaux à importer ('-' pour l'entrée standard)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Déduit de l'extension par défaut")
+        parser.add_argument('--batch', type=int, default=POINTAGE_BATCH_SIZE, help="Journées écrites par requête")
+
+    def handle(self, *args, **options):
+        total_rejets = 0
+        for chemin in options['fichiers']:
+            format = options['format'] or ('csv' if chemin.lower().endswith('.csv') else 'jsonl')
+            try:
+                flux = sys.stdin.buffer if chemin == '-' else open(chemin, 'rb')
+            except OSError as exc:
+                raise CommandError(str(exc))
+            try:
+                bilan = importer_journal(flux, format, options['batch'])
+            finally:
+                if flux is not sys.stdin.buffer:
+                    flux.close()
+
+            for ligne, erreur in bilan.rejets:
+                self.stderr.write(f"{chemin}:{ligne}: {erreur}")
+            if bilan.nb_rejets > len(bilan.rejets):
+                self.stderr.write(f"{chemin}: ... {bilan.nb_rejets - len(bilan.rejets)} autre(s) rejet(s)")
+            total_rejets += bilan.nb_rejets
+            self.stdout.write(self.style.SUCCESS(
+                f"{chemin} : {bilan.lus} ligne(s) lue(s), {bilan.journees} mise(s) à jour de journée, "
+                f"{bilan.nb_rejets} rejet(s)."
+            ))
+        if total_rejets:
+            # Code de sortie non nul pour les imports planifiés
+            raise CommandError(f"{total_rejets} ligne(s) rejetée(s).", returncode=2)
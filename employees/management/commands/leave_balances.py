@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from employees.conges import soldes_attendus
+from employees.models import SoldeConge
+
+
+class Command(BaseCommand):
+    help = "Vérifie les soldes de congés contre l'historique des demandes approuvées, et les corrige avec --corriger"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--annee', type=int)
+        parser.add_argument('--corriger', action='store_true', help="Réécrit les compteurs divergents")
+
+    def handle(self, *args, **options):
+        annee = options['annee'] or timezone.localdate().year
+        with transaction.atomic():
+            attendus = soldes_attendus(annee)
+            existants = {
+                (s.employe_id, s.type_conge, s.annee): s
+                for s in SoldeConge.objects.filter(annee=annee).select_for_update()
+            }
+            a_corriger, a_creer = [], []
+            for cle, (acquis, pris) in attendus.items():
+                compteur = existants.get(cle)
+                if compteur is None:
+                    a_creer.append(SoldeConge(employe_id=cle[0], type_conge=cle[1], annee=annee, acquis=acquis, pris=pris))
+                    self.stdout.write(f"Employé {cle[0]} {cle[1]} : compteur manquant ({pris} j pris)")
+                elif (compteur.acquis, compteur.pris) != (acquis, pris):
+                    self.stdout.write(
+                        f"Employé {cle[0]} {cle[1]} : {compteur.acquis}/{compteur.pris} enregistré, "
+                        f"{acquis}/{pris} attendu (acquis/pris)"
+                    )
+                    compteur.acquis, compteur.pris = acquis, pris
+                    a_corriger.append(compteur)
+
+            if options['corriger']:
+                SoldeConge.objects.bulk_create(a_creer, batch_size=1000)
+                SoldeConge.objects.bulk_update(a_corriger, ['acquis', 'pris'], batch_size=1000)
+
+        ecarts = len(a_creer) + len(a_corriger)
+        if not ecarts:
+            self.stdout.write(self.style.SUCCESS(f"{len(attendus)} compteur(s) {annee} conformes."))
+        elif options['corriger']:
+            self.stdout.write(self.style.SUCCESS(f"{ecarts} compteur(s) {annee} corrigé(s)."))
+        else:
+            raise CommandError(f"{ecarts} compteur(s) {annee} divergent(s). Relancer avec --corriger.")
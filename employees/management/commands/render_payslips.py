@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from employees.models import FichePaie
+from employees.paie import PAIE_BATCH_SIZE, pdf_executor, remettre_en_file, traiter_file_pdf
+
+
+class Command(BaseCommand):
+    help = "Worker de rendu des fiches de paie en attente (PAIE_PDF_MODE = 'async')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vide la file puis s'arrête")
+        parser.add_argument('--interval', type=float, default=2.0, help="Attente (s) quand la file est vide")
+        parser.add_argument('--batch', type=int, default=PAIE_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, help="Processus de rendu (PAIE_PDF_WORKERS par défaut)")
+        parser.add_argument(
+            '--recuperer', action='store_true',
+            help="Remet en file les fiches restées en cours (worker arrêté brutalement) ou en échec",
+        )
+
+    def handle(self, *args, **options):
+        if options['recuperer']:
+            n = remettre_en_file(FichePaie.objects.all())
+            self.stdout.write(f"{n} fiche(s) remise(s) en file.")
+
+        executor = pdf_executor(options['workers'])
+        try:
+            while True:
+                debut = time.perf_counter()
+                reservees, generees = traiter_file_pdf(options['batch'], executor)
+                if reservees:
+                    duree = 1000 * (time.perf_counter() - debut)
+                    self.stdout.write(
+                        f"{generees}/{reservees} PDF généré(s) en {duree:.0f} ms ({duree / reservees:.2f} ms/fiche)."
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor:
+                executor.shutdown()
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.models import CyclePaie, Departement
+from employees.paie import executer_cycle, prendre_cycle_en_file
+
+
+class Command(BaseCommand):
+    help = "Exécute un cycle de paie (calcul groupé des fiches puis rendu parallèle des PDF), ou reprend un cycle interrompu"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', type=int)
+        parser.add_argument('--annee', type=int)
+        parser.add_argument('--departement', type=int, help="Identifiant du département (toute l'entreprise par défaut)")
+        parser.add_argument('--reprendre', type=int, metavar='CYCLE_ID', help="Reprend le cycle indiqué là où il s'est arrêté")
+        parser.add_argument('--file', action='store_true', help="Exécute les cycles lancés ou repris depuis l'interface, puis s'arrête")
+        parser.add_argument('--workers', type=int, help="Processus de rendu PDF (PAIE_PDF_WORKERS par défaut)")
+
+    def handle(self, *args, **options):
+        if options['file']:
+            return self.vider_file(options['workers'])
+        if options['reprendre']:
+            try:
+                cycle = CyclePaie.objects.get(pk=options['reprendre'])
+            except CyclePaie.DoesNotExist:
+                raise CommandError(f"Cycle inconnu : {options['reprendre']}")
+        else:
+            if not options['mois'] or not options['annee']:
+                raise CommandError("--mois et --annee sont requis pour un nouveau cycle.")
+            if not 1 <= options['mois'] <= 12:
+                raise CommandError("Le mois doit être compris entre 1 et 12.")
+            departement = None
+            if options['departement']:
+                departement = Departement.objects.filter(pk=options['departement']).first()
+                if departement is None:
+                    raise CommandError(f"Département inconnu : {options['departement']}")
+            cycle = CyclePaie.objects.create(mois=options['mois'], annee=options['annee'], departement=departement)
+
+        self.stdout.write(f"Cycle #{cycle.pk} : {cycle}")
+        try:
+            executer_cycle(cycle, workers=options['workers'], progress=self.afficher)
+        except Exception as exc:
+            raise CommandError(f"Cycle #{cycle.pk} interrompu ({exc}). Relancer avec --reprendre {cycle.pk}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Cycle #{cycle.pk} terminé : {cycle.fiches_creees} fiche(s), {cycle.pdf_generes} PDF."
+        ))
+
+    def vider_file(self, workers):
+        traites = echecs = 0
+        while cycle := prendre_cycle_en_file():
+            self.stdout.write(f"Cycle #{cycle.pk} : {cycle}")
+            try:
+                executer_cycle(cycle, workers=workers, progress=self.afficher)
+            except Exception as exc:
+                # Cycle en échec, repris depuis l'interface ; les suivants passent quand même
+                self.stderr.write(f"Cycle #{cycle.pk} interrompu ({exc}).")
+                echecs += 1
+            else:
+                traites += 1
+        self.stdout.write(f"{traites} cycle(s) terminé(s), {echecs} en échec.")
+
+    def afficher(self, cycle):
+        self.stdout.write(
+            f"  [{cycle.get_statut_display()}] {cycle.fiches_creees}/{cycle.total} fiches, "
+            f"{cycle.pdf_generes} PDF ({cycle.progression} %)"
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from employees.notifications import envoyer_recapitulatifs
+
+
+class Command(BaseCommand):
+    help = (
+        "Met en file les récapitulatifs des éléments à valider (congés, inscriptions, "
+        "candidatures) pour les validateurs qui les ont choisis. À planifier chaque jour "
+        "(--frequence quotidien) et chaque semaine (--frequence hebdomadaire)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequence', choices=['quotidien', 'hebdomadaire'], default='quotidien')
+
+    def handle(self, *args, **options):
+        n = envoyer_recapitulatifs(options['frequence'].upper())
+        self.stdout.write(self.style.SUCCESS(
+            f"{n} récapitulatif(s) mis en file (envoyés par send_notifications)."
+        ))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from employees.models import Notification
+from employees.notifications import NOTIFICATION_BATCH_SIZE, envoyer_notifications, statistiques_notifications
+
+
+class Command(BaseCommand):
+    help = "Worker d'envoi des notifications de la boîte d'envoi (courriels en attente)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vide la file puis s'arrête")
+        parser.add_argument('--interval', type=float, default=5.0, help="Attente (s) quand rien n'est à envoyer")
+        parser.add_argument('--batch', type=int, default=NOTIFICATION_BATCH_SIZE)
+        parser.add_argument(
+            '--relancer', action='store_true',
+            help="Remet en file les notifications en échec définitif (après réparation du serveur SMTP)",
+        )
+
+    def handle(self, *args, **options):
+        if options['relancer']:
+            n = Notification.objects.filter(statut='ECHEC').update(
+                statut='EN_ATTENTE', tentatives=0, prochain_essai=timezone.now(),
+            )
+            self.stdout.write(f"{n} notification(s) remise(s) en file.")
+
+        try:
+            while True:
+                debut = time.perf_counter()
+                bilan = envoyer_notifications(options['batch'])
+                if bilan.envoyees or bilan.reportees or bilan.abandonnees:
+                    duree = 1000 * (time.perf_counter() - debut)
+                    self.stdout.write(
+                        f"{bilan.envoyees} envoyée(s), {bilan.reportees} reportée(s), "
+                        f"{bilan.abandonnees} abandonnée(s) en {duree:.0f} ms."
+                    )
+                    if bilan.envoyees:
+                        continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        stats = statistiques_notifications()
+        self.stdout.write(self.style.SUCCESS(
+            f"File : {stats['EN_ATTENTE']} en attente, {stats['ECHEC']} en échec, {stats['ENVOYE']} envoyée(s)."
+        ))
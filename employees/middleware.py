@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .scope import resolve_access_scope
+
+
+class AccessScopeMiddleware:
+    """
+    Pose request.access_scope : le périmètre de l'utilisateur n'est chargé
+    qu'au premier accès, en une seule requête, puis réutilisé par les vues,
+    les décorateurs, les formulaires et les gabarits.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access_scope = SimpleLazyObject(lambda: resolve_access_scope(request.user))
+        return self.get_response(request)
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_departement(apps, schema_editor):
+    Employe = apps.get_model("employees", "Employe")
+    Poste = apps.get_model("employees", "Poste")
+    Employe.objects.update(
+        departement_id=Subquery(
+            Poste.objects.filter(pk=OuterRef("poste_id")).values("departement_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0007_formation_departement"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employe",
+            name="departement",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="employes",
+                to="employees.departement",
+                verbose_name="Département",
+            ),
+        ),
+        migrations.RunPython(backfill_departement, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:54
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0008_employe_departement"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(
+                fields=["statut", "employe"], name="conge_statut_employe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(
+                fields=["statut", "date_debut"], name="conge_statut_debut_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(
+                condition=models.Q(("statut", "EN_ATTENTE")),
+                fields=["-date_debut"],
+                name="conge_en_attente_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employe",
+            index=models.Index(
+                django.db.models.functions.datetime.ExtractMonth("date_naissance"),
+                name="employe_mois_naissance_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employe",
+            index=models.Index(
+                fields=["date_embauche"], name="employe_date_embauche_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fichepaie",
+            index=models.Index(fields=["annee", "mois"], name="fichepaie_periode_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="presence",
+            index=models.Index(
+                fields=["employe", "date"], name="presence_employe_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="presence",
+            index=models.Index(fields=["-date", "-id"], name="presence_date_idx"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0009_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="employe",
+            index=models.Index(fields=["nom", "id"], name="employe_nom_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(
+                fields=["-date_debut", "-id"], name="conge_date_debut_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:30
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copies figées de employees.search au moment de la migration : une évolution du
+# module ne doit pas changer ce que fait (ou défait) cette migration
+FTS_TABLE = "employees_employe_fts"
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize("NFKD", texte or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", texte.lower()))
+
+
+def backfill_search_document(apps, schema_editor):
+    Employe = apps.get_model("employees", "Employe")
+    batch = []
+    for employe in Employe.objects.select_related("poste").iterator(chunk_size=2000):
+        poste = employe.poste.titre if employe.poste_id else ""
+        employe.search_document = normaliser(
+            " ".join(filter(None, [employe.nom, employe.prenom, employe.matricule, poste]))
+        )
+        batch.append(employe)
+        if len(batch) >= 2000:
+            Employe.objects.bulk_update(batch, ["search_document"])
+            batch = []
+    if batch:
+        Employe.objects.bulk_update(batch, ["search_document"])
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS employe_search_trgm_idx "
+            "ON employees_employe USING gin (search_document gin_trgm_ops)"
+        )
+    elif vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+                # Pas de FTS5 : search_employees() se rabat sur search_document
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "search_document, content='employees_employe', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON employees_employe BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON employees_employe BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            "VALUES ('delete', old.id, old.search_document); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON employees_employe BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            "VALUES ('delete', old.id, old.search_document); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS employe_search_trgm_idx")
+    elif vendor == "sqlite":
+        for suffixe in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffixe}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0010_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employe",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 6.0.1 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0011_employe_search_document"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CyclePaie",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mois", models.IntegerField(verbose_name="Mois")),
+                ("annee", models.IntegerField(verbose_name="Année")),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("CALCUL", "Calcul des fiches"),
+                            ("RENDU", "Génération des PDF"),
+                            ("TERMINE", "Terminé"),
+                            ("ECHEC", "Échec"),
+                        ],
+                        default="CALCUL",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(default=0, verbose_name="Employés concernés"),
+                ),
+                (
+                    "fiches_creees",
+                    models.IntegerField(default=0, verbose_name="Fiches créées"),
+                ),
+                (
+                    "pdf_generes",
+                    models.IntegerField(default=0, verbose_name="PDF générés"),
+                ),
+                ("erreur", models.TextField(blank=True, verbose_name="Erreur")),
+                (
+                    "date_creation",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Lancé le"),
+                ),
+                (
+                    "date_fin",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Terminé le"
+                    ),
+                ),
+                (
+                    "cree_par",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Lancé par",
+                    ),
+                ),
+                (
+                    "departement",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="cycles_paie",
+                        to="employees.departement",
+                        verbose_name="Département",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="fichepaie",
+            name="cycle",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="fiches",
+                to="employees.cyclepaie",
+                verbose_name="Cycle de paie",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fichepaie",
+            index=models.Index(
+                fields=["employe", "annee", "mois"],
+                name="fichepaie_employe_periode_idx",
+            ),
+        ),
+    ]
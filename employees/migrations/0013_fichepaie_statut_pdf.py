@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+def marquer_pdf_existants(apps, schema_editor):
+    # Les fiches déjà rendues ne repassent pas dans la file
+    FichePaie = apps.get_model("employees", "FichePaie")
+    FichePaie.objects.exclude(fichier_pdf="").exclude(fichier_pdf__isnull=True).update(
+        statut_pdf="GENERE"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0012_cycle_paie"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fichepaie",
+            name="erreur_pdf",
+            field=models.TextField(
+                blank=True, editable=False, verbose_name="Erreur de rendu"
+            ),
+        ),
+        migrations.AddField(
+            model_name="fichepaie",
+            name="statut_pdf",
+            field=models.CharField(
+                choices=[
+                    ("EN_ATTENTE", "En attente"),
+                    ("EN_COURS", "En cours"),
+                    ("GENERE", "Généré"),
+                    ("ECHEC", "Échec"),
+                ],
+                default="EN_ATTENTE",
+                editable=False,
+                max_length=20,
+                verbose_name="Statut du PDF",
+            ),
+        ),
+        migrations.RunPython(marquer_pdf_existants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="fichepaie",
+            index=models.Index(
+                condition=models.Q(("statut_pdf", "EN_ATTENTE")),
+                fields=["id"],
+                name="fichepaie_pdf_en_attente_idx",
+            ),
+        ),
+    ]
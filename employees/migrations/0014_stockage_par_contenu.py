@@ -0,0 +1,103 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:30
+
+import employees.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0013_fichepaie_statut_pdf"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="candidature",
+            name="cv",
+            field=models.FileField(
+                storage=employees.storage.cas_storage,
+                upload_to="cvs/",
+                verbose_name="CV",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="contrat",
+            name="fichier",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=employees.storage.cas_storage,
+                upload_to="contrats/",
+                verbose_name="Fichier du contrat",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="documentrh",
+            name="fichier",
+            field=models.FileField(
+                storage=employees.storage.cas_storage,
+                upload_to="documents_rh/",
+                verbose_name="Fichier",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="fichepaie",
+            name="fichier_pdf",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=employees.storage.cas_storage,
+                upload_to="fiches_paie/",
+                verbose_name="Fiche de paie PDF",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="inscriptionformation",
+            name="attestation",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=employees.storage.cas_storage,
+                upload_to="attestations/",
+                verbose_name="Attestation",
+            ),
+        ),
+        migrations.CreateModel(
+            name="FichierStocke",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "nom",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Chemin"
+                    ),
+                ),
+                ("taille", models.BigIntegerField(verbose_name="Taille (octets)")),
+                (
+                    "references",
+                    models.IntegerField(default=0, verbose_name="Références"),
+                ),
+                (
+                    "date_creation",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créé le"),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("references__lte", 0)),
+                        fields=["date_creation"],
+                        name="fichier_orphelin_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def supprimer_doublons(apps, schema_editor):
+    # Avant la contrainte : on garde la première présence saisie de chaque (employé, jour)
+    Presence = apps.get_model("employees", "Presence")
+    doublons = (
+        Presence.objects.values("employe_id", "date")
+        .annotate(n=Count("id"), premier=Min("id"))
+        .filter(n__gt=1)
+    )
+    for ligne in doublons.iterator():
+        Presence.objects.filter(employe_id=ligne["employe_id"], date=ligne["date"]).exclude(
+            id=ligne["premier"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0014_stockage_par_contenu"),
+    ]
+
+    operations = [
+        migrations.RunPython(supprimer_doublons, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="presence",
+            name="presence_employe_date_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="presence",
+            constraint=models.UniqueConstraint(
+                fields=("employe", "date"), name="presence_employe_date_uniq"
+            ),
+        ),
+    ]
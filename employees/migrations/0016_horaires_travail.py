@@ -0,0 +1,86 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0015_presence_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="presence",
+            name="heures_travaillees",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=5,
+                null=True,
+                verbose_name="Heures travaillées",
+            ),
+        ),
+        migrations.CreateModel(
+            name="HoraireTravail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nom", models.CharField(max_length=100, verbose_name="Nom")),
+                (
+                    "heures_par_jour",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("7.00"),
+                        max_digits=4,
+                        verbose_name="Heures par jour",
+                    ),
+                ),
+                (
+                    "pause_minutes",
+                    models.PositiveSmallIntegerField(
+                        default=60, verbose_name="Pause déduite (minutes)"
+                    ),
+                ),
+                (
+                    "arrondi_minutes",
+                    models.PositiveSmallIntegerField(
+                        default=15, verbose_name="Arrondi des heures sup. (minutes)"
+                    ),
+                ),
+                (
+                    "majoration",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("1.25"),
+                        max_digits=4,
+                        verbose_name="Majoration des heures sup.",
+                    ),
+                ),
+                (
+                    "departement",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="horaire",
+                        to="employees.departement",
+                        verbose_name="Département",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Horaire de travail",
+                "verbose_name_plural": "Horaires de travail",
+            },
+        ),
+    ]
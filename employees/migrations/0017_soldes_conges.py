@@ -0,0 +1,117 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:05
+
+import datetime
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def initialiser_jours_pris(apps, schema_editor):
+    # Jours ouvrés des congés déjà approuvés ; l'acquisition est laissée à accrue_leave
+    Conge = apps.get_model("employees", "Conge")
+    SoldeConge = apps.get_model("employees", "SoldeConge")
+    pris = Counter()
+    approuves = Conge.objects.filter(statut="APPROUVE").values_list(
+        "employe_id", "type_conge", "date_debut", "date_fin"
+    )
+    for employe_id, type_conge, debut, fin in approuves.iterator():
+        jour = debut
+        while jour <= fin:
+            if jour.weekday() < 5:
+                pris[(employe_id, type_conge, jour.year)] += 1
+            jour += datetime.timedelta(days=1)
+    SoldeConge.objects.bulk_create(
+        [
+            SoldeConge(employe_id=employe_id, type_conge=type_conge, annee=annee, pris=jours)
+            for (employe_id, type_conge, annee), jours in pris.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0016_horaires_travail"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SoldeConge",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type_conge",
+                    models.CharField(
+                        choices=[
+                            ("ANNUEL", "Congé Annuel"),
+                            ("MALADIE", "Congé Maladie"),
+                            ("MATERNITE", "Maternité"),
+                            ("SANS_SOLDE", "Sans Solde"),
+                            ("AUTRE", "Autre"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type de congé",
+                    ),
+                ),
+                ("annee", models.IntegerField(verbose_name="Année")),
+                (
+                    "acquis",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=6,
+                        verbose_name="Jours acquis",
+                    ),
+                ),
+                (
+                    "pris",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=6,
+                        verbose_name="Jours pris",
+                    ),
+                ),
+                (
+                    "mois_acquis",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Mois acquis"
+                    ),
+                ),
+                (
+                    "date_maj",
+                    models.DateTimeField(auto_now=True, verbose_name="Mis à jour le"),
+                ),
+                (
+                    "employe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="soldes_conges",
+                        to="employees.employe",
+                        verbose_name="Employé",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Solde de congés",
+                "verbose_name_plural": "Soldes de congés",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("employe", "type_conge", "annee"),
+                        name="solde_conge_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(initialiser_jours_pris, migrations.RunPython.noop),
+    ]
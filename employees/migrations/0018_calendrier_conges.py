@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+# Index GiST sur (employé, période) propre à PostgreSQL, défini ici une fois pour
+# toutes : la migration ne dépend pas de employees.calendrier
+GIST_INDEX = "conge_periode_gist_idx"
+
+
+def install_calendar_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # btree_gist : employe_id (entier) dans un index GiST
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {GIST_INDEX} ON employees_conge "
+        "USING gist (employe_id, daterange(date_debut, date_fin, '[]'))"
+    )
+
+
+def uninstall_calendar_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {GIST_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0017_soldes_conges"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="departement",
+            name="absents_max",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Vide : pas de limite",
+                null=True,
+                verbose_name="Absents simultanés autorisés",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(
+                fields=["employe", "date_debut", "date_fin"],
+                name="conge_employe_periode_idx",
+            ),
+        ),
+        migrations.RunPython(install_calendar_index, uninstall_calendar_index),
+    ]
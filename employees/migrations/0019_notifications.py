@@ -0,0 +1,83 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0018_calendrier_conges"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Notification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "destinataire",
+                    models.EmailField(max_length=254, verbose_name="Destinataire"),
+                ),
+                ("sujet", models.CharField(max_length=255, verbose_name="Sujet")),
+                ("corps", models.TextField(verbose_name="Message")),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("EN_ATTENTE", "En attente"),
+                            ("ENVOYE", "Envoyé"),
+                            ("ECHEC", "Échec définitif"),
+                        ],
+                        default="EN_ATTENTE",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "tentatives",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Tentatives"
+                    ),
+                ),
+                (
+                    "prochain_essai",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Prochain essai"
+                    ),
+                ),
+                (
+                    "derniere_erreur",
+                    models.TextField(blank=True, verbose_name="Dernière erreur"),
+                ),
+                (
+                    "date_creation",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créée le"),
+                ),
+                (
+                    "date_envoi",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Envoyée le"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Notification",
+                "verbose_name_plural": "Notifications",
+                "indexes": [
+                    models.Index(
+                        fields=["statut", "prochain_essai"],
+                        name="notification_file_idx",
+                    )
+                ],
+            },
+        ),
+    ]
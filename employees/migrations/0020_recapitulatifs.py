@@ -0,0 +1,73 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:00
+
+from django.db import migrations, models
+
+
+# Copie figée de employees.search.FTS_TABLE au moment de la migration
+FTS_TABLE = "employees_employe_fts"
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite recrée la table employe pour ajouter les colonnes : ses triggers FTS disparaissent
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+            return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "search_document, content='employees_employe', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON employees_employe BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON employees_employe BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+        "VALUES ('delete', old.id, old.search_document); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON employees_employe BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+        "VALUES ('delete', old.id, old.search_document); "
+        f"INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document); END"
+    )
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0019_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employe",
+            name="dernier_recapitulatif",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Dernier récapitulatif",
+            ),
+        ),
+        migrations.AddField(
+            model_name="employe",
+            name="mode_notification",
+            field=models.CharField(
+                choices=[
+                    ("IMMEDIAT", "Un courriel par demande"),
+                    ("QUOTIDIEN", "Récapitulatif quotidien"),
+                    ("HEBDOMADAIRE", "Récapitulatif hebdomadaire"),
+                ],
+                default="IMMEDIAT",
+                max_length=20,
+                verbose_name="Notifications de validation",
+            ),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
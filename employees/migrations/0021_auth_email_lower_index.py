@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:15
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Copie figée de employees.backends.EMAIL_LOWER_INDEX au moment de la migration
+EMAIL_LOWER_INDEX = "auth_user_email_lower_idx"
+
+
+def install_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor not in ("postgresql", "sqlite"):
+        return
+    table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {EMAIL_LOWER_INDEX} ON {schema_editor.quote_name(table)} (LOWER(email))"
+    )
+
+
+def uninstall_email_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("postgresql", "sqlite"):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {EMAIL_LOWER_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0020_recapitulatifs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(install_email_index, uninstall_email_index),
+    ]
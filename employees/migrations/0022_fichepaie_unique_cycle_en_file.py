@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def verifier_doublons(apps, schema_editor):
+    # Fiches de paie : pièces comptables, aucune n'est supprimée d'office. Les doublons
+    # (employé, période) sont listés et la migration s'arrête pour un arbitrage manuel.
+    FichePaie = apps.get_model("employees", "FichePaie")
+    doublons = list(
+        FichePaie.objects.values_list("employe_id", "annee", "mois")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by("employe_id", "annee", "mois")
+    )
+    if doublons:
+        lignes = "\n".join(
+            f"  employe_id={employe_id} {mois:02d}/{annee} : {n} fiches"
+            for employe_id, annee, mois, n in doublons
+        )
+        raise RuntimeError(
+            f"{len(doublons)} période(s) avec plusieurs fiches de paie pour le même employé.\n"
+            f"{lignes}\n"
+            "Supprimer ou corriger les fiches en trop (admin), puis relancer migrate."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0021_auth_email_lower_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(verifier_doublons, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="fichepaie",
+            name="fichepaie_employe_periode_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="fichepaie",
+            constraint=models.UniqueConstraint(
+                fields=("employe", "annee", "mois"),
+                name="fichepaie_employe_periode_uniq",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cyclepaie",
+            name="en_file",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="En file"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:55
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def reprendre_date_creation(apps, schema_editor):
+    # Blobs existants : leur dernier usage connu est leur création
+    FichierStocke = apps.get_model("employees", "FichierStocke")
+    FichierStocke.objects.update(dernier_usage=F("date_creation"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0022_fichepaie_unique_cycle_en_file"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="fichierstocke",
+            name="fichier_orphelin_idx",
+        ),
+        migrations.AddField(
+            model_name="fichierstocke",
+            name="dernier_usage",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Dernier usage"
+            ),
+        ),
+        migrations.RunPython(reprendre_date_creation, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="fichierstocke",
+            index=models.Index(
+                condition=models.Q(("references__lte", 0)),
+                fields=["dernier_usage"],
+                name="fichier_orphelin_idx",
+            ),
+        ),
+    ]
@@ -1,12 +1,129 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import ExtractMonth
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
-from io import BytesIO
+from django.utils import timezone
+
+from .pdf import fiche_paie_donnees, render_fiche_paie
+from .storage import cas_storage
+
+
+# Filtres de périmètre : un seul chemin audité pour "restreint à mon département
+# sauf RH / superadmin", partagé par toutes les listes.
+class EmployeQuerySet(models.QuerySet):
+    def in_departement(self, departement_id):
+        return self.filter(departement_id=departement_id)
+
+    def visible_to(self, scope):
+        if scope.sees_all:
+            return self
+        if not scope.departement_id:
+            return self.none()
+        return self.in_departement(scope.departement_id)
+
+
+class CongeQuerySet(models.QuerySet):
+    def in_departement(self, departement_id):
+        return self.filter(employe__departement_id=departement_id)
+
+    def visible_to(self, scope):
+        if scope.sees_all:
+            return self
+        if scope.is_dept_admin:
+            if not scope.departement_id:
+                return self.none()
+            return self.in_departement(scope.departement_id)
+        # Simple employé : uniquement ses propres demandes
+        return self.filter(employe_id=scope.employe_id)
+
+
+class PresenceQuerySet(models.QuerySet):
+    def in_departement(self, departement_id):
+        return self.filter(employe__departement_id=departement_id)
+
+    def visible_to(self, scope):
+        if scope.sees_all:
+            return self
+        if scope.is_manager:
+            if not scope.departement_id:
+                return self.none()
+            return self.in_departement(scope.departement_id)
+        return self.filter(employe_id=scope.employe_id)
+
+
+class FormationQuerySet(models.QuerySet):
+    def in_departement(self, departement_id):
+        # Les formations sans département sont ouvertes à tous
+        return self.filter(Q(departement_id=departement_id) | Q(departement__isnull=True))
+
+    def visible_to(self, scope):
+        if scope.sees_all:
+            return self
+        if not scope.has_profil:
+            return self.none()
+        if not scope.departement_id:
+            return self.filter(departement__isnull=True)
+        return self.in_departement(scope.departement_id)
+
+
+class OffreEmploiQuerySet(models.QuerySet):
+    def in_departement(self, departement_id):
+        return self.filter(departement_id=departement_id)
+
+    def visible_to(self, scope):
+        if scope.sees_all:
+            return self
+        if not scope.departement_id:
+            return self.none()
+        return self.in_departement(scope.departement_id)
+
+
+class FichePaieQuerySet(models.QuerySet):
+    def visible_to(self, scope):
+        # Données de paie : RH et superadmin, sinon ses propres fiches (pas d'accès manager au département)
+        if scope.is_superadmin or scope.is_rh:
+            return self
+        if not scope.employe_id:
+            return self.none()
+        return self.filter(employe_id=scope.employe_id)
+
+
+class CandidatureQuerySet(models.QuerySet):
+    def visible_to(self, scope):
+        # Candidatures (CV, coordonnées) : réservées aux RH, comme recrutement_detail
+        if scope.is_superadmin or scope.is_rh:
+            return self
+        return self.none()
+
+
+class FichierStocke(models.Model):
+    """Blob du stockage adressé par le contenu (employees.storage) et ses références."""
+    nom = models.CharField(max_length=255, unique=True, verbose_name="Chemin")
+    taille = models.BigIntegerField(verbose_name="Taille (octets)")
+    # Nombre de champs FileField pointant vers ce blob
+    references = models.IntegerField(default=0, verbose_name="Références")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    # Dernier enregistrement de ce contenu : le délai de grâce de gc_media part de là
+    dernier_usage = models.DateTimeField(default=timezone.now, verbose_name="Dernier usage")
+
+    def __str__(self):
+        return f"{self.nom} ({self.references} réf.)"
+
+    class Meta:
+        indexes = [
+            # Candidats au ramasse-miettes
+            models.Index(fields=['dernier_usage'], condition=Q(references__lte=0), name='fichier_orphelin_idx'),
+        ]
 
 class Departement(models.Model):
     nom = models.CharField(max_length=100, verbose_name="Nom du département")
     code = models.CharField(max_length=10, unique=True, verbose_name="Code")
     chef_de_service = models.OneToOneField('Employe', on_delete=models.SET_NULL, null=True, blank=True, related_name='departement_dirige', verbose_name="Chef de service")
+    absents_max = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Absents simultanés autorisés", help_text="Vide : pas de limite")
 
     def __str__(self):
         return self.nom
@@ -23,6 +140,22 @@ class Poste(models.Model):
     def __str__(self):
         return f"{self.titre} ({self.departement.nom})"
 
+    def save(self, *args, **kwargs):
+        ancien_titre = None
+        if self.pk:
+            ancien_titre = Poste.objects.filter(pk=self.pk).values_list('titre', flat=True).first()
+        super().save(*args, **kwargs)
+        # Répercuter un changement de département sur la copie portée par les employés
+        Employe.objects.filter(poste_id=self.pk).exclude(departement_id=self.departement_id).update(departement_id=self.departement_id)
+        if ancien_titre is not None and ancien_titre != self.titre:
+            # Le titre du poste fait partie du document de recherche des employés
+            from .search import build_search_document
+            employes = list(self.employes.all())
+            for employe in employes:
+                employe.poste = self
+                employe.search_document = build_search_document(employe)
+            Employe.objects.bulk_update(employes, ['search_document'], batch_size=500)
+
     class Meta:
         verbose_name = "Poste"
 
@@ -33,6 +166,11 @@ class Employe(models.Model):
         ('MANAGER', 'Chef Service'),
         ('EMPLOYE', 'Employé'),
     ]
+    MODES_NOTIFICATION = [
+        ('IMMEDIAT', 'Un courriel par demande'),
+        ('QUOTIDIEN', 'Récapitulatif quotidien'),
+        ('HEBDOMADAIRE', 'Récapitulatif hebdomadaire'),
+    ]
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='profil', verbose_name="Utilisateur")
     role = models.CharField(max_length=20, choices=ROLES, default='EMPLOYE', verbose_name="Rôle")
     matricule = models.CharField(max_length=20, unique=True, null=True, blank=True, verbose_name="Matricule")
@@ -43,12 +181,37 @@ class Employe(models.Model):
     telephone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Téléphone")
     adresse = models.TextField(blank=True, verbose_name="Adresse")
     poste = models.ForeignKey(Poste, on_delete=models.SET_NULL, null=True, related_name='employes', verbose_name="Poste")
+    # Copie dénormalisée de poste.departement, maintenue par Employe.save() et Poste.save()
+    departement = models.ForeignKey(Departement, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='employes', verbose_name="Département")
     date_embauche = models.DateField(verbose_name="Date d'embauche")
     salaire = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Salaire")
+    # Demandes à valider : un courriel chacune, ou regroupées (commande send_digests)
+    mode_notification = models.CharField(
+        max_length=20, choices=MODES_NOTIFICATION, default='IMMEDIAT', verbose_name="Notifications de validation",
+    )
+    dernier_recapitulatif = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Dernier récapitulatif")
+    # Nom, prénom, matricule et poste normalisés (minuscules, sans accents) pour la recherche
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    objects = EmployeQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.prenom} {self.nom} ({self.matricule})"
 
+    def save(self, *args, **kwargs):
+        from .search import build_search_document
+        self.departement_id = self.poste.departement_id if self.poste_id else None
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'poste' in update_fields:
+                update_fields.add('departement')
+            if update_fields & {'nom', 'prenom', 'matricule', 'poste'}:
+                update_fields.add('search_document')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     @property
     def is_superadmin(self):
         return self.role == 'ADMIN' or self.user.is_superuser
@@ -95,6 +258,13 @@ class Employe(models.Model):
 
     class Meta:
         verbose_name = "Employé"
+        indexes = [
+            # Anniversaires du mois : date_naissance__month=...
+            models.Index(ExtractMonth('date_naissance'), name='employe_mois_naissance_idx'),
+            models.Index(fields=['date_embauche'], name='employe_date_embauche_idx'),
+            # Clé de pagination de l'annuaire
+            models.Index(fields=['nom', 'id'], name='employe_nom_idx'),
+        ]
 
 class TypeContrat(models.Model):
     nom = models.CharField(max_length=50, verbose_name="Nom du type de contrat")
@@ -108,7 +278,7 @@ class Contrat(models.Model):
     type_contrat = models.ForeignKey(TypeContrat, on_delete=models.CASCADE, verbose_name="Type de contrat")
     date_debut = models.DateField(verbose_name="Date de début")
     date_fin = models.DateField(null=True, blank=True, verbose_name="Date de fin")
-    fichier = models.FileField(upload_to='contrats/', null=True, blank=True, verbose_name="Fichier du contrat")
+    fichier = models.FileField(upload_to='contrats/', storage=cas_storage, null=True, blank=True, verbose_name="Fichier du contrat")
     actif = models.BooleanField(default=True, verbose_name="Actif")
 
     def __str__(self):
@@ -136,9 +306,56 @@ class Conge(models.Model):
     motif = models.TextField(blank=True, verbose_name="Motif")
     commentaire_manager = models.TextField(blank=True, verbose_name="Commentaire Manager")
 
+    objects = CongeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.type_conge} - {self.employe} ({self.date_debut} au {self.date_fin})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'employe'], name='conge_statut_employe_idx'),
+            models.Index(fields=['statut', 'date_debut'], name='conge_statut_debut_idx'),
+            # Chevauchements d'un employé (voir aussi l'index GiST installé sous PostgreSQL)
+            models.Index(fields=['employe', 'date_debut', 'date_fin'], name='conge_employe_periode_idx'),
+            # Clé de pagination de la liste des congés
+            models.Index(fields=['-date_debut', '-id'], name='conge_date_debut_idx'),
+            # Demandes en attente triées par date : tableau de bord et écrans de validation
+            models.Index(
+                fields=['-date_debut'],
+                condition=Q(statut='EN_ATTENTE'),
+                name='conge_en_attente_idx',
+            ),
+        ]
+
+class SoldeConge(models.Model):
+    """
+    Compteur de congés d'un employé pour un type et une année civile, tenu à jour
+    à chaque approbation / rejet (conges.changer_statut) et par l'acquisition
+    mensuelle : le solde se lit sans parcourir l'historique des demandes.
+    """
+    employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='soldes_conges', verbose_name="Employé")
+    type_conge = models.CharField(max_length=20, choices=Conge.TYPE_CONGE, verbose_name="Type de congé")
+    annee = models.IntegerField(verbose_name="Année")
+    acquis = models.DecimalField(max_digits=6, decimal_places=2, default=0, verbose_name="Jours acquis")
+    pris = models.DecimalField(max_digits=6, decimal_places=2, default=0, verbose_name="Jours pris")
+    # Dernier mois crédité par l'acquisition mensuelle : la relancer ne crédite pas deux fois
+    mois_acquis = models.PositiveSmallIntegerField(default=0, verbose_name="Mois acquis")
+    date_maj = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    def __str__(self):
+        return f"{self.employe} - {self.type_conge} {self.annee} : {self.restant} j"
+
+    @property
+    def restant(self):
+        return self.acquis - self.pris
+
+    class Meta:
+        verbose_name = "Solde de congés"
+        verbose_name_plural = "Soldes de congés"
+        constraints = [
+            models.UniqueConstraint(fields=['employe', 'type_conge', 'annee'], name='solde_conge_uniq'),
+        ]
+
 class Absence(models.Model):
     employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='absences', verbose_name="Employé")
     date = models.DateField(verbose_name="Date")
@@ -153,12 +370,86 @@ class Presence(models.Model):
     date = models.DateField(verbose_name="Date")
     heure_arrivee = models.TimeField(verbose_name="Heure d'arrivée")
     heure_depart = models.TimeField(null=True, blank=True, verbose_name="Heure de départ")
+    # Calculés par lot (pointage.calculer_heures) d'après l'horaire du département
+    heures_travaillees = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Heures travaillées")
     heures_sup = models.DecimalField(max_digits=4, decimal_places=2, default=0, verbose_name="Heures supplémentaires")
 
+    objects = PresenceQuerySet.as_manager()
+
     def __str__(self):
         return f"Présence {self.employe} le {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='presence_date_idx'),
+        ]
+        constraints = [
+            # Une présence par employé et par jour ; son index sert aussi les recherches (employe, date)
+            models.UniqueConstraint(fields=['employe', 'date'], name='presence_employe_date_uniq'),
+        ]
+
+class HoraireTravail(models.Model):
+    """Horaire de référence d'un département (sans département : horaire par défaut de l'entreprise)."""
+    nom = models.CharField(max_length=100, verbose_name="Nom")
+    departement = models.OneToOneField(Departement, on_delete=models.CASCADE, null=True, blank=True, related_name='horaire', verbose_name="Département")
+    heures_par_jour = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal('7.00'), verbose_name="Heures par jour")
+    pause_minutes = models.PositiveSmallIntegerField(default=60, verbose_name="Pause déduite (minutes)")
+    # Les heures au-delà de l'horaire sont comptées par tranches entières (15 min par défaut)
+    arrondi_minutes = models.PositiveSmallIntegerField(default=15, verbose_name="Arrondi des heures sup. (minutes)")
+    majoration = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal('1.25'), verbose_name="Majoration des heures sup.")
+
+    def __str__(self):
+        return f"{self.nom} ({self.departement or 'par défaut'})"
+
+    @property
+    def heures_mensuelles(self):
+        # Base mensualisée : 5 jours par semaine, 52 semaines par an
+        return self.heures_par_jour * 5 * 52 / 12
+
+    class Meta:
+        verbose_name = "Horaire de travail"
+        verbose_name_plural = "Horaires de travail"
+
+class CyclePaie(models.Model):
+    """Campagne de paie d'un mois, pour toute l'entreprise ou un département."""
+    STATUTS = [
+        ('CALCUL', 'Calcul des fiches'),
+        ('RENDU', 'Génération des PDF'),
+        ('TERMINE', 'Terminé'),
+        ('ECHEC', 'Échec'),
+    ]
+    mois = models.IntegerField(verbose_name="Mois")
+    annee = models.IntegerField(verbose_name="Année")
+    departement = models.ForeignKey(Departement, on_delete=models.SET_NULL, null=True, blank=True, related_name='cycles_paie', verbose_name="Département")
+    statut = models.CharField(max_length=20, choices=STATUTS, default='CALCUL', verbose_name="Statut")
+    # Avancement, mis à jour par lot pendant l'exécution
+    total = models.IntegerField(default=0, verbose_name="Employés concernés")
+    fiches_creees = models.IntegerField(default=0, verbose_name="Fiches créées")
+    pdf_generes = models.IntegerField(default=0, verbose_name="PDF générés")
+    # Lancé ou repris depuis l'interface : exécuté par `run_payroll --file`, jamais dans la requête
+    en_file = models.BooleanField(default=False, editable=False, verbose_name="En file")
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+    cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Lancé par")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Lancé le")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Terminé le")
+
+    def __str__(self):
+        return f"Paie {self.mois:02d}/{self.annee} - {self.departement or 'Tous départements'}"
+
+    @property
+    def progression(self):
+        if not self.total:
+            return 100 if self.statut == 'TERMINE' else 0
+        # Calcul et rendu comptent chacun pour moitié
+        return int(50 * (self.fiches_creees + self.pdf_generes) / self.total)
+
 class FichePaie(models.Model):
+    STATUTS_PDF = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('GENERE', 'Généré'),
+        ('ECHEC', 'Échec'),
+    ]
     employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='fiches_paie', verbose_name="Employé")
     mois = models.IntegerField(verbose_name="Mois")
     annee = models.IntegerField(verbose_name="Année")
@@ -167,77 +458,61 @@ class FichePaie(models.Model):
     deductions = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Déductions")
     net_a_payer = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Net à payer")
     date_paiement = models.DateField(auto_now_add=True, verbose_name="Date de paiement")
-    fichier_pdf = models.FileField(upload_to='fiches_paie/', null=True, blank=True, verbose_name="Fiche de paie PDF")
+    fichier_pdf = models.FileField(upload_to='fiches_paie/', storage=cas_storage, null=True, blank=True, verbose_name="Fiche de paie PDF")
+    # File de rendu : les fiches EN_ATTENTE sont traitées par la commande render_payslips
+    statut_pdf = models.CharField(max_length=20, choices=STATUTS_PDF, default='EN_ATTENTE', editable=False, verbose_name="Statut du PDF")
+    erreur_pdf = models.TextField(blank=True, editable=False, verbose_name="Erreur de rendu")
+    cycle = models.ForeignKey('CyclePaie', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='fiches', verbose_name="Cycle de paie")
+
+    objects = FichePaieQuerySet.as_manager()
 
     def _build_pdf_content(self):
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.lib.units import cm
-            from reportlab.pdfgen import canvas
-        except ImportError as exc:
-            raise RuntimeError(
-                "La génération PDF nécessite la dépendance 'reportlab'."
-            ) from exc
-
-        buffer = BytesIO()
-        page_width, page_height = A4
-        pdf = canvas.Canvas(buffer, pagesize=A4)
-
-        pdf.setTitle(f"Fiche de paie {self.mois:02d}/{self.annee}")
-        pdf.setFont("Helvetica-Bold", 16)
-        pdf.drawString(2 * cm, page_height - 2 * cm, "Fiche de paie")
-
-        pdf.setFont("Helvetica", 10)
-        pdf.drawString(2 * cm, page_height - 3 * cm, f"Employé : {self.employe}")
-        pdf.drawString(2 * cm, page_height - 3.8 * cm, f"Période : {self.mois:02d}/{self.annee}")
-        pdf.drawString(
-            2 * cm,
-            page_height - 4.6 * cm,
-            f"Date de paiement : {self.date_paiement:%d/%m/%Y}",
-        )
-
-        current_y = page_height - 6 * cm
-        pdf.setFont("Helvetica-Bold", 11)
-        pdf.drawString(2 * cm, current_y, "Salaire de base")
-        pdf.drawRightString(page_width - 2 * cm, current_y, f"{self.salaire_base} €")
-
-        current_y -= 0.8 * cm
-        pdf.setFont("Helvetica", 11)
-        pdf.drawString(2 * cm, current_y, "Primes")
-        pdf.drawRightString(page_width - 2 * cm, current_y, f"{self.primes} €")
-
-        current_y -= 0.8 * cm
-        pdf.drawString(2 * cm, current_y, "Déductions")
-        pdf.drawRightString(page_width - 2 * cm, current_y, f"{self.deductions} €")
-
-        current_y -= 1.2 * cm
-        pdf.setFont("Helvetica-Bold", 12)
-        pdf.drawString(2 * cm, current_y, "Net à payer")
-        pdf.drawRightString(page_width - 2 * cm, current_y, f"{self.net_a_payer} €")
-
-        pdf.showPage()
-        pdf.save()
-        buffer.seek(0)
-        return ContentFile(buffer.read())
+        return ContentFile(render_fiche_paie(fiche_paie_donnees(self)))
+
+    def pdf_filename(self):
+        return f"fiche_paie_{self.employe_id}_{self.annee}_{self.mois:02d}.pdf"
 
     def generate_pdf(self):
-        filename = f"fiche_paie_{self.employe_id}_{self.annee}_{self.mois:02d}.pdf"
         pdf_content = self._build_pdf_content()
-        self.fichier_pdf.save(filename, pdf_content, save=False)
+        self.fichier_pdf.save(self.pdf_filename(), pdf_content, save=False)
 
     def save(self, *args, **kwargs):
         # Calcul automatique du net à payer si non renseigné ou pour mise à jour
         if self.salaire_base is not None:
             self.net_a_payer = self.salaire_base + (self.primes or 0) - (self.deductions or 0)
-            
+
+        if self.fichier_pdf:
+            self.statut_pdf = 'GENERE'
+        elif kwargs.get('update_fields') is None:
+            if getattr(settings, 'PAIE_PDF_MODE', 'sync') == 'sync':
+                # Rendu avant l'écriture : une seule requête au lieu d'un INSERT puis d'un UPDATE
+                if self.date_paiement is None:
+                    self.date_paiement = timezone.localdate()
+                self.generate_pdf()
+                self.statut_pdf = 'GENERE'
+            else:
+                self.statut_pdf = 'EN_ATTENTE'
         super().save(*args, **kwargs)
-        if not self.fichier_pdf:
-            self.generate_pdf()
-            super().save(update_fields=['fichier_pdf'])
 
     def __str__(self):
         return f"Fiche de paie {self.mois}/{self.annee} - {self.employe}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['annee', 'mois'], name='fichepaie_periode_idx'),
+            # File de rendu des PDF
+            models.Index(
+                fields=['id'],
+                condition=Q(statut_pdf='EN_ATTENTE'),
+                name='fichepaie_pdf_en_attente_idx',
+            ),
+        ]
+        constraints = [
+            # Une seule fiche par employé et par période, même si deux cycles se chevauchent
+            # (sert aussi d'index à la reprise d'un cycle)
+            models.UniqueConstraint(fields=['employe', 'annee', 'mois'], name='fichepaie_employe_periode_uniq'),
+        ]
+
 class Prime(models.Model):
     employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='primes_recues', verbose_name="Employé")
     montant = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Montant")
@@ -274,6 +549,8 @@ class Formation(models.Model):
     date_fin = models.DateField(verbose_name="Date de fin")
     budget = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Budget")
 
+    objects = FormationQuerySet.as_manager()
+
     def __str__(self):
         return self.titre
 
@@ -281,7 +558,7 @@ class InscriptionFormation(models.Model):
     employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='formations', verbose_name="Employé")
     formation = models.ForeignKey(Formation, on_delete=models.CASCADE, verbose_name="Formation")
     statut = models.CharField(max_length=50, default='Inscrit', verbose_name="Statut")
-    attestation = models.FileField(upload_to='attestations/', null=True, blank=True, verbose_name="Attestation")
+    attestation = models.FileField(upload_to='attestations/', storage=cas_storage, null=True, blank=True, verbose_name="Attestation")
 
     def __str__(self):
         return f"{self.employe} - {self.formation}"
@@ -293,6 +570,8 @@ class OffreEmploi(models.Model):
     date_publication = models.DateField(auto_now_add=True, verbose_name="Date de publication")
     cloturee = models.BooleanField(default=False, verbose_name="Clôturée")
 
+    objects = OffreEmploiQuerySet.as_manager()
+
     def __str__(self):
         return self.titre
 
@@ -301,10 +580,12 @@ class Candidature(models.Model):
     nom = models.CharField(max_length=100, verbose_name="Nom")
     prenom = models.CharField(max_length=100, verbose_name="Prénom")
     email = models.EmailField(verbose_name="Email")
-    cv = models.FileField(upload_to='cvs/', verbose_name="CV")
+    cv = models.FileField(upload_to='cvs/', storage=cas_storage, verbose_name="CV")
     lettre_motivation = models.TextField(blank=True, verbose_name="Lettre de motivation")
     statut = models.CharField(max_length=50, default='Nouveau', verbose_name="Statut")
 
+    objects = CandidatureQuerySet.as_manager()
+
     def __str__(self):
         return f"Candidature {self.prenom} {self.nom} pour {self.offre}"
 
@@ -318,9 +599,41 @@ class DocumentRH(models.Model):
     ]
     employe = models.ForeignKey(Employe, on_delete=models.CASCADE, related_name='documents', verbose_name="Employé")
     titre = models.CharField(max_length=200, verbose_name="Titre du document")
-    fichier = models.FileField(upload_to='documents_rh/', verbose_name="Fichier")
+    fichier = models.FileField(upload_to='documents_rh/', storage=cas_storage, verbose_name="Fichier")
     type_doc = models.CharField(max_length=20, choices=TYPE_DOC, verbose_name="Type de document")
     date_ajout = models.DateTimeField(auto_now_add=True, verbose_name="Date d'ajout")
 
     def __str__(self):
         return f"{self.titre} - {self.employe}"
+
+class Notification(models.Model):
+    """
+    Courriel en attente d'envoi (boîte d'envoi). Écrit dans la transaction de
+    l'action qui le déclenche, envoyé ensuite par la commande send_notifications :
+    une demande de congé ne dépend ni de la latence ni des pannes du serveur SMTP.
+    """
+    STATUT = [
+        ('EN_ATTENTE', 'En attente'),
+        ('ENVOYE', 'Envoyé'),
+        ('ECHEC', 'Échec définitif'),
+    ]
+    destinataire = models.EmailField(verbose_name="Destinataire")
+    sujet = models.CharField(max_length=255, verbose_name="Sujet")
+    corps = models.TextField(verbose_name="Message")
+    statut = models.CharField(max_length=20, choices=STATUT, default='EN_ATTENTE', verbose_name="Statut")
+    tentatives = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    prochain_essai = models.DateTimeField(default=timezone.now, verbose_name="Prochain essai")
+    derniere_erreur = models.TextField(blank=True, verbose_name="Dernière erreur")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    date_envoi = models.DateTimeField(null=True, blank=True, verbose_name="Envoyée le")
+
+    def __str__(self):
+        return f"{self.sujet} → {self.destinataire} ({self.get_statut_display()})"
+
+    class Meta:
+        verbose_name = "Notification"
+        verbose_name_plural = "Notifications"
+        indexes = [
+            # File d'envoi : messages dus, dans l'ordre
+            models.Index(fields=['statut', 'prochain_essai'], name='notification_file_idx'),
+        ]
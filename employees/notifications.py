@@ -0,0 +1,255 @@
+import datetime
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import CharField, Count, F, Min, Q, Value
+from django.utils import timezone
+
+from .models import Candidature, Conge, Employe, InscriptionFormation, Notification
+
+# Messages envoyés par transaction (et par ouverture de connexion SMTP)
+NOTIFICATION_BATCH_SIZE = 100
+# Plafond du délai entre deux essais, quel que soit le nombre de tentatives
+BACKOFF_MAX = datetime.timedelta(hours=6)
+# Messages pris par un worker : écartés de la file le temps de l'envoi. Si le worker
+# meurt avant d'enregistrer le résultat, ils redeviennent dus après ce délai.
+BAIL_ENVOI = datetime.timedelta(minutes=10)
+
+
+# Délai minimal entre deux récapitulatifs : marge pour un cron qui dérive un peu
+INTERVALLES_RECAPITULATIF = {
+    'QUOTIDIEN': datetime.timedelta(hours=20),
+    'HEBDOMADAIRE': datetime.timedelta(days=6, hours=20),
+}
+
+
+def max_tentatives():
+    return getattr(settings, 'NOTIFICATION_MAX_TENTATIVES', 5)
+
+
+def delai_reessai(tentatives):
+    """Attente exponentielle avant le prochain essai : base, 2×base, 4×base... plafonnée."""
+    base = getattr(settings, 'NOTIFICATION_BACKOFF', 60)
+    return min(datetime.timedelta(seconds=base * 2 ** (tentatives - 1)), BACKOFF_MAX)
+
+
+def notifier(destinataire, sujet, corps):
+    """Met un courriel dans la boîte d'envoi (dans la transaction en cours) ; rien n'est envoyé ici."""
+    if destinataire:
+        return Notification.objects.create(destinataire=destinataire, sujet=sujet, corps=corps)
+
+
+def notifier_en_masse(messages):
+    """Variante groupée de notifier : [(destinataire, sujet, corps)], un seul INSERT."""
+    Notification.objects.bulk_create(
+        [Notification(destinataire=d, sujet=s, corps=c) for d, s, c in messages if d],
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+
+
+@dataclass
+class BilanEnvoi:
+    envoyees: int = 0
+    reportees: int = 0
+    abandonnees: int = 0
+
+    def __iadd__(self, autre):
+        self.envoyees += autre.envoyees
+        self.reportees += autre.reportees
+        self.abandonnees += autre.abandonnees
+        return self
+
+
+def _reserver_lot(taille):
+    """
+    Prend au plus `taille` messages dus et les marque en vol (prochain essai
+    repoussé de BAIL_ENVOI), dans une transaction courte : aucun verrou n'est
+    gardé pendant l'envoi. SKIP LOCKED : plusieurs workers se partagent la file.
+    """
+    with transaction.atomic():
+        maintenant = timezone.now()
+        dus = (
+            Notification.objects.filter(statut='EN_ATTENTE', prochain_essai__lte=maintenant)
+            .order_by('prochain_essai', 'id')
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            dus = dus.select_for_update(skip_locked=True)
+        lot = list(dus[:taille])
+        if lot:
+            Notification.objects.filter(pk__in=[n.pk for n in lot]).update(prochain_essai=maintenant + BAIL_ENVOI)
+    return lot
+
+
+def _envoyer_lot(connexion, taille):
+    lot = _reserver_lot(taille)
+    if not lot:
+        return None
+
+    # Envoi hors transaction : un serveur SMTP lent ne bloque ni la base ni les autres workers,
+    # et un message parti n'est jamais « annulé » par un rollback
+    envoyees, echecs = [], []
+    try:
+        connexion.open()
+    except Exception as exc:
+        # Serveur injoignable : tout le lot est reporté
+        echecs = [(notification, exc) for notification in lot]
+    else:
+        for notification in lot:
+            message = EmailMessage(
+                notification.sujet, notification.corps, settings.DEFAULT_FROM_EMAIL,
+                [notification.destinataire], connection=connexion,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                echecs.append((notification, exc))
+            else:
+                envoyees.append(notification.pk)
+        if echecs:
+            # Connexion peut-être rompue : rouverte au lot suivant
+            connexion.close()
+
+    bilan = BilanEnvoi(envoyees=len(envoyees))
+    maintenant = timezone.now()
+    for notification, exc in echecs:
+        notification.tentatives += 1
+        notification.derniere_erreur = f"{type(exc).__name__}: {exc}"
+        if notification.tentatives >= max_tentatives():
+            notification.statut = 'ECHEC'
+            bilan.abandonnees += 1
+        else:
+            notification.prochain_essai = maintenant + delai_reessai(notification.tentatives)
+            bilan.reportees += 1
+    with transaction.atomic():
+        if envoyees:
+            Notification.objects.filter(pk__in=envoyees).update(
+                statut='ENVOYE', date_envoi=maintenant, tentatives=F('tentatives') + 1, derniere_erreur='',
+            )
+        if echecs:
+            Notification.objects.bulk_update(
+                [notification for notification, _ in echecs],
+                ['tentatives', 'derniere_erreur', 'statut', 'prochain_essai'],
+            )
+    return bilan
+
+
+def envoyer_notifications(taille=NOTIFICATION_BATCH_SIZE, limite=None):
+    """
+    Vide la boîte d'envoi par lots de `taille` messages, en réutilisant une seule
+    connexion SMTP. Un échec reporte le message (attente exponentielle) jusqu'à
+    NOTIFICATION_MAX_TENTATIVES, après quoi il passe en ECHEC. Renvoie un BilanEnvoi.
+    """
+    bilan = BilanEnvoi()
+    connexion = get_connection()
+    try:
+        while True:
+            traitees = bilan.envoyees + bilan.reportees + bilan.abandonnees
+            if limite is not None and traitees >= limite:
+                break
+            lot = _envoyer_lot(connexion, taille if limite is None else min(taille, limite - traitees))
+            if lot is None:
+                break
+            bilan += lot
+            if lot.envoyees == 0 and lot.reportees:
+                # Rien ne passe : inutile d'enchaîner les lots avant le prochain essai
+                break
+    finally:
+        connexion.close()
+    return bilan
+
+
+def statistiques_notifications():
+    """Messages par statut et âge (secondes) du plus ancien message en attente, en une requête."""
+    lignes = Notification.objects.values('statut').annotate(n=Count('id'), plus_ancien=Min('date_creation'))
+    stats = {'EN_ATTENTE': 0, 'ENVOYE': 0, 'ECHEC': 0, 'retard': 0.0}
+    for ligne in lignes:
+        stats[ligne['statut']] = ligne['n']
+        if ligne['statut'] == 'EN_ATTENTE' and ligne['plus_ancien']:
+            stats['retard'] = (timezone.now() - ligne['plus_ancien']).total_seconds()
+    return stats
+
+
+def elements_en_attente(mode):
+    """
+    Éléments à valider, comptés en une requête (UNION ALL de trois GROUP BY) :
+    (genre, clé, nombre, première date). Clé : validateur pour les congés (limités
+    à ceux qui ont choisi `mode`), département pour les inscriptions et candidatures.
+    """
+    def genre(nom):
+        return Value(nom, output_field=CharField())
+
+    conges = (
+        Conge.objects.filter(statut='EN_ATTENTE', validateur__mode_notification=mode)
+        .values(genre=genre('CONGE'), cle=F('validateur_id'))
+        .annotate(n=Count('id'), premiere=Min('date_debut'))
+    )
+    inscriptions = (
+        InscriptionFormation.objects.filter(statut='Inscrit')
+        .values(genre=genre('FORMATION'), cle=F('formation__departement_id'))
+        .annotate(n=Count('id'), premiere=Min('formation__date_debut'))
+    )
+    candidatures = (
+        Candidature.objects.filter(statut='Nouveau', offre__cloturee=False)
+        .values(genre=genre('CANDIDATURE'), cle=F('offre__departement_id'))
+        .annotate(n=Count('id'), premiere=Min('offre__date_publication'))
+    )
+    return conges.union(inscriptions, candidatures, all=True)
+
+
+def _lignes_recapitulatif(employe, groupes):
+    # Congés : ceux dont il est validateur ; formations : son département (tous pour RH) ; candidatures : RH
+    conges = [(n, premiere) for g, cle, n, premiere in groupes if g == 'CONGE' and cle == employe.pk]
+    formations = [
+        (n, premiere) for g, cle, n, premiere in groupes
+        if g == 'FORMATION' and (employe.role == 'RH' or (employe.role == 'MANAGER' and cle and cle == employe.departement_id))
+    ]
+    candidatures = [n for g, cle, n, premiere in groupes if g == 'CANDIDATURE' and employe.role == 'RH']
+    lignes = []
+    if conges:
+        n, premiere = conges[0]
+        lignes.append(f"- {n} demande(s) de congé (la première débute le {premiere:%d/%m/%Y})")
+    if formations:
+        n = sum(n for n, _ in formations)
+        premiere = min(premiere for _, premiere in formations)
+        lignes.append(f"- {n} inscription(s) à une formation (la première commence le {premiere:%d/%m/%Y})")
+    if candidatures:
+        lignes.append(f"- {sum(candidatures)} nouvelle(s) candidature(s)")
+    total = sum(n for n, _ in conges) + sum(n for n, _ in formations) + sum(candidatures)
+    return total, lignes
+
+
+def envoyer_recapitulatifs(mode):
+    """
+    Met en file un courriel récapitulatif par validateur ayant choisi `mode`
+    ('QUOTIDIEN' ou 'HEBDOMADAIRE') et non servi depuis l'intervalle correspondant.
+    Renvoie le nombre de récapitulatifs créés.
+    """
+    maintenant = timezone.now()
+    destinataires = list(
+        Employe.objects.filter(mode_notification=mode).exclude(email='')
+        .filter(Q(dernier_recapitulatif__isnull=True) | Q(dernier_recapitulatif__lte=maintenant - INTERVALLES_RECAPITULATIF[mode]))
+        .only('id', 'prenom', 'email', 'role', 'departement')
+    )
+    if not destinataires:
+        return 0
+    groupes = list(elements_en_attente(mode).values_list('genre', 'cle', 'n', 'premiere'))
+
+    messages, servis = [], []
+    periode = "du jour" if mode == 'QUOTIDIEN' else "de la semaine"
+    for employe in destinataires:
+        total, lignes = _lignes_recapitulatif(employe, groupes)
+        if not total:
+            continue
+        corps = (
+            f"Bonjour {employe.prenom},\n\nÉléments en attente de votre validation :\n"
+            + "\n".join(lignes)
+            + "\n\nMerci de vous connecter pour les traiter."
+        )
+        messages.append((employe.email, f"Récapitulatif RH {periode} : {total} élément(s) en attente", corps))
+        servis.append(employe.pk)
+    with transaction.atomic():
+        notifier_en_masse(messages)
+        Employe.objects.filter(pk__in=servis).update(dernier_recapitulatif=maintenant)
+    return len(messages)
@@ -0,0 +1,106 @@
+from functools import cached_property
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+CURSOR_SALT = 'employees.pagination'
+
+
+class _CursorSerializer(signing.JSONSerializer):
+    def dumps(self, obj):
+        return DjangoJSONEncoder(separators=(',', ':')).encode(obj).encode('latin-1')
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, next_cursor=None, previous_cursor=None):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pagination par curseur : chaque page filtre sur la clé de tri de la dernière
+    ligne vue au lieu d'un OFFSET, la page N coûte donc autant que la page 1.
+
+    `ordering` doit être un tri total (se terminer par une clé unique comme 'id')
+    et ne porter que sur des colonnes non nulles de l'objet.
+    """
+
+    def __init__(self, queryset, ordering, per_page=50):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    def _fields(self):
+        return [(f.lstrip('-'), f.startswith('-')) for f in self.ordering]
+
+    def _encode(self, obj, direction):
+        values = [getattr(obj, name) for name, _ in self._fields()]
+        return signing.dumps({'d': direction, 'v': values}, salt=CURSOR_SALT, serializer=_CursorSerializer)
+
+    def _decode(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return None, None
+        values = payload.get('v')
+        if payload.get('d') not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.ordering):
+            return None, None
+        return payload['d'], values
+
+    def _after(self, values, reverse=False):
+        # (a, b, c) > (x, y, z) développé en OR de préfixes égaux, un opérateur par sens de tri
+        condition = Q()
+        egalites = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= egalites & Q(**{f'{name}__{lookup}': value})
+            egalites &= Q(**{name: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        direction, values = self._decode(cursor) if cursor else (None, None)
+        queryset = self.queryset
+
+        if direction == 'p':
+            reverse_ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+            rows = list(queryset.filter(self._after(values, reverse=True)).order_by(*reverse_ordering)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            if direction == 'n':
+                queryset = queryset.filter(self._after(values))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = direction == 'n'
+
+        return KeysetPage(
+            self,
+            rows,
+            next_cursor=self._encode(rows[-1], 'n') if rows and has_next else None,
+            previous_cursor=self._encode(rows[0], 'p') if rows and has_previous else None,
+        )
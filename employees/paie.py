@@ -0,0 +1,276 @@
+import calendar
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Sum
+from django.utils import timezone
+
+from .models import CyclePaie, Employe, FichePaie, Presence, Prime
+from .pdf import fiche_paie_donnees, render_fiche_paie
+from .pointage import calculer_heures, horaires_par_departement
+from .storage import ajuster_references
+
+# Taille des lots : employés calculés par INSERT, fiches rendues entre deux points d'avancement
+PAIE_BATCH_SIZE = 500
+
+CENTIME = Decimal('0.01')
+
+
+def taux_deductions():
+    """Part du brut retenue sur la fiche (cotisations), réglée par PAIE_TAUX_DEDUCTIONS."""
+    return Decimal(str(getattr(settings, 'PAIE_TAUX_DEDUCTIONS', '0')))
+
+
+def employes_du_cycle(cycle):
+    employes = Employe.objects.all()
+    if cycle.departement_id:
+        employes = employes.in_departement(cycle.departement_id)
+    return employes
+
+
+def employes_sans_fiche(cycle):
+    # Reprise : un employé déjà payé pour la période n'est jamais recalculé
+    deja_payes = FichePaie.objects.filter(employe=OuterRef('pk'), mois=cycle.mois, annee=cycle.annee)
+    return employes_du_cycle(cycle).filter(~Exists(deja_payes))
+
+
+def periode(cycle):
+    debut = datetime.date(cycle.annee, cycle.mois, 1)
+    return debut, debut.replace(day=calendar.monthrange(cycle.annee, cycle.mois)[1])
+
+
+def primes_du_mois(cycle, employe_ids):
+    lignes = (
+        Prime.objects.filter(employe_id__in=employe_ids, date__range=periode(cycle))
+        .values('employe_id')
+        .annotate(total=Sum('montant'))
+    )
+    return {ligne['employe_id']: ligne['total'] for ligne in lignes}
+
+
+def heures_sup_du_mois(cycle, employe_ids):
+    lignes = (
+        Presence.objects.filter(employe_id__in=employe_ids, date__range=periode(cycle))
+        .values('employe_id')
+        .annotate(total=Sum('heures_sup'))
+    )
+    return {ligne['employe_id']: ligne['total'] for ligne in lignes}
+
+
+def montant_heures_sup(salaire, heures, horaire):
+    """Heures sup. payées au taux horaire du salaire mensuel, majoré selon l'horaire."""
+    if not heures:
+        return Decimal('0')
+    taux_horaire = salaire / horaire.heures_mensuelles
+    return (heures * taux_horaire * horaire.majoration).quantize(CENTIME, ROUND_HALF_UP)
+
+
+def calculer_fiches(cycle, progress=None):
+    """
+    Crée les fiches manquantes du cycle par lots : une requête pour les primes du
+    lot, un INSERT groupé. Le PDF n'est pas rendu ici (voir rendre_pdfs).
+    """
+    taux = taux_deductions()
+    horaires = horaires_par_departement()
+    lot = []
+
+    def enregistrer(lot):
+        employe_ids = [employe_id for employe_id, _, _ in lot]
+        primes = primes_du_mois(cycle, employe_ids)
+        heures_sup = heures_sup_du_mois(cycle, employe_ids)
+        fiches = []
+        for employe_id, salaire, departement_id in lot:
+            horaire = horaires.get(departement_id, horaires[None])
+            montant_primes = (primes.get(employe_id) or Decimal('0')) + montant_heures_sup(
+                salaire, heures_sup.get(employe_id), horaire
+            )
+            deductions = ((salaire + montant_primes) * taux).quantize(CENTIME, ROUND_HALF_UP)
+            fiches.append(FichePaie(
+                employe_id=employe_id,
+                mois=cycle.mois,
+                annee=cycle.annee,
+                salaire_base=salaire,
+                primes=montant_primes,
+                deductions=deductions,
+                # bulk_create ne passe pas par save() : net calculé ici
+                net_a_payer=salaire + montant_primes - deductions,
+                cycle=cycle,
+            ))
+        with transaction.atomic():
+            FichePaie.objects.bulk_create(fiches)
+            CyclePaie.objects.filter(pk=cycle.pk).update(fiches_creees=F('fiches_creees') + len(fiches))
+        cycle.fiches_creees += len(fiches)
+        if progress:
+            progress(cycle)
+
+    employes = employes_sans_fiche(cycle).order_by('pk').values_list('pk', 'salaire', 'departement_id')
+    for ligne in employes.iterator(chunk_size=PAIE_BATCH_SIZE):
+        lot.append(ligne)
+        if len(lot) >= PAIE_BATCH_SIZE:
+            enregistrer(lot)
+            lot = []
+    if lot:
+        enregistrer(lot)
+
+
+def reserver_fiches(fiches, limite=PAIE_BATCH_SIZE):
+    """
+    Fait passer au plus `limite` fiches EN_ATTENTE de `fiches` à EN_COURS et les
+    renvoie. Sous PostgreSQL, SKIP LOCKED garantit que deux workers ne réservent
+    jamais la même fiche ; SQLite sérialise de toute façon les écritures. Appelée
+    dans une transaction englobant le rendu, les fiches restent verrouillées tant
+    que le worker les traite.
+    """
+    with transaction.atomic():
+        candidates = fiches.filter(statut_pdf='EN_ATTENTE').order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:limite])
+        FichePaie.objects.filter(pk__in=ids).update(statut_pdf='EN_COURS', erreur_pdf='')
+    return list(FichePaie.objects.filter(pk__in=ids).select_related('employe').order_by('pk'))
+
+
+def remettre_en_file(fiches):
+    """
+    Remet EN_ATTENTE les fiches EN_COURS ou en ECHEC de `fiches` (worker arrêté
+    brutalement, rendu raté). Les fiches verrouillées par un worker en train de
+    les rendre sont ignorées (SKIP LOCKED). Renvoie le nombre de fiches remises.
+    """
+    with transaction.atomic():
+        candidates = fiches.filter(statut_pdf__in=['EN_COURS', 'ECHEC'])
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True))
+        return FichePaie.objects.filter(pk__in=ids).update(statut_pdf='EN_ATTENTE')
+
+
+def rendre_fiches(fiches, executor=None):
+    """
+    Rend les PDF des fiches réservées, dans `executor` (pool de processus) s'il
+    est fourni. Une fiche en erreur passe en ECHEC sans bloquer les autres.
+    Renvoie le nombre de PDF générés.
+    """
+    donnees = [fiche_paie_donnees(fiche) for fiche in fiches]
+    if executor:
+        resultats = [executor.submit(render_fiche_paie, d) for d in donnees]
+    else:
+        resultats = donnees
+
+    generes, echecs = [], []
+    for fiche, resultat in zip(fiches, resultats):
+        try:
+            contenu = resultat.result() if executor else render_fiche_paie(resultat)
+            fiche.fichier_pdf.save(fiche.pdf_filename(), ContentFile(contenu), save=False)
+        except Exception as exc:
+            fiche.statut_pdf = 'ECHEC'
+            fiche.erreur_pdf = f"{type(exc).__name__}: {exc}"
+            echecs.append(fiche)
+        else:
+            fiche.statut_pdf = 'GENERE'
+            generes.append(fiche)
+
+    with transaction.atomic():
+        FichePaie.objects.bulk_update(generes, ['fichier_pdf', 'statut_pdf'])
+        FichePaie.objects.bulk_update(echecs, ['statut_pdf', 'erreur_pdf'])
+        # bulk_update n'émet pas post_save : références comptées ici
+        ajuster_references(ajoutes=[fiche.fichier_pdf.name for fiche in generes])
+    return len(generes)
+
+
+def pdf_executor(workers=None):
+    """Pool de rendu (PAIE_PDF_WORKERS par défaut), ou None pour rendre dans le processus courant."""
+    workers = getattr(settings, 'PAIE_PDF_WORKERS', None) if workers is None else workers
+    return ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+
+
+def traiter_file_pdf(limite=PAIE_BATCH_SIZE, executor=None):
+    """Traite un lot de la file de rendu ; renvoie (fiches réservées, PDF générés)."""
+    # Verrous gardés pendant le rendu : une reprise concurrente ne touche pas au lot
+    with transaction.atomic():
+        fiches = reserver_fiches(FichePaie.objects.all(), limite)
+        if not fiches:
+            return 0, 0
+        return len(fiches), rendre_fiches(fiches, executor)
+
+
+def rendre_pdfs(cycle, workers=None, progress=None):
+    """
+    Rend les PDF des fiches du cycle encore en attente. Le rendu ReportLab est
+    confié à un pool de processus ; l'écriture des fichiers et la mise à jour de
+    la base restent dans le processus appelant.
+    """
+    executor = pdf_executor(workers)
+    try:
+        while True:
+            with transaction.atomic():
+                fiches = reserver_fiches(cycle.fiches.all())
+                if not fiches:
+                    break
+                generes = rendre_fiches(fiches, executor)
+                CyclePaie.objects.filter(pk=cycle.pk).update(pdf_generes=F('pdf_generes') + generes)
+            cycle.pdf_generes += generes
+            if progress:
+                progress(cycle)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def executer_cycle(cycle, workers=None, progress=None):
+    """
+    Exécute (ou reprend) un cycle de paie : calcul des fiches manquantes puis rendu
+    des PDF manquants. Relancer un cycle interrompu ne refait que le travail restant.
+    """
+    cycle.refresh_from_db()
+    try:
+        if cycle.statut in ('CALCUL', 'ECHEC'):
+            deja = FichePaie.objects.filter(cycle=cycle).count()
+            cycle.total = deja + employes_sans_fiche(cycle).count()
+            cycle.fiches_creees = deja
+            cycle.statut = 'CALCUL'
+            cycle.erreur = ''
+            cycle.save(update_fields=['total', 'fiches_creees', 'statut', 'erreur'])
+            # Heures sup. du mois à jour avant de les payer
+            calculer_heures(cycle.annee, cycle.mois, cycle.departement_id)
+            calculer_fiches(cycle, progress=progress)
+
+        cycle.statut = 'RENDU'
+        # Reprise : fiches restées en cours ou en échec lors d'une exécution précédente
+        remettre_en_file(cycle.fiches.all())
+        cycle.pdf_generes = cycle.fiches.filter(statut_pdf='GENERE').count()
+        cycle.save(update_fields=['statut', 'pdf_generes'])
+        rendre_pdfs(cycle, workers=workers, progress=progress)
+        echecs = cycle.fiches.filter(statut_pdf='ECHEC').count()
+        if echecs:
+            raise RuntimeError(f"{echecs} PDF en échec")
+    except Exception as exc:
+        cycle.statut = 'ECHEC'
+        cycle.erreur = f"{type(exc).__name__}: {exc}"
+        cycle.save(update_fields=['statut', 'erreur'])
+        raise
+
+    cycle.statut = 'TERMINE'
+    cycle.date_fin = timezone.now()
+    cycle.save(update_fields=['statut', 'date_fin'])
+    return cycle
+
+
+def prendre_cycle_en_file():
+    """
+    Retire de la file le plus ancien cycle lancé depuis l'interface et le renvoie
+    (None si la file est vide). SKIP LOCKED : deux workers ne prennent jamais le
+    même cycle.
+    """
+    with transaction.atomic():
+        cycles = CyclePaie.objects.filter(en_file=True).order_by('date_creation', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            cycles = cycles.select_for_update(skip_locked=True)
+        cycle = cycles.first()
+        if cycle is not None:
+            CyclePaie.objects.filter(pk=cycle.pk).update(en_file=False)
+            cycle.en_file = False
+    return cycle
@@ -0,0 +1,166 @@
+import threading
+import time
+from functools import lru_cache
+from io import BytesIO
+
+# Nom du gabarit statique (Form XObject) dans chaque document produit
+GABARIT = 'fiche_paie_statique'
+
+# useA85 est un réglage global de ReportLab : un rendu à la fois le modifie (voir render)
+_rl_config_lock = threading.Lock()
+
+# Durées de rendu cumulées dans ce processus (voir render_timings)
+_timings = {'documents': 0, 'fiches': 0, 'secondes': 0.0}
+
+
+def fiche_paie_donnees(fiche):
+    """Valeurs nécessaires au rendu, sérialisables : transmises telles quelles aux processus de rendu."""
+    return {
+        'employe': str(fiche.employe),
+        'mois': fiche.mois,
+        'annee': fiche.annee,
+        'date_paiement': fiche.date_paiement,
+        'salaire_base': fiche.salaire_base,
+        'primes': fiche.primes,
+        'deductions': fiche.deductions,
+        'net_a_payer': fiche.net_a_payer,
+    }
+
+
+class PayslipTemplate:
+    """
+    Mise en page d'une fiche de paie, calculée une fois par processus.
+
+    Dans un document de plusieurs fiches, les éléments fixes (titre, libellés)
+    sont dessinés une seule fois dans un Form XObject réutilisé par chaque page ;
+    seules les valeurs propres à la fiche sont dessinées page par page.
+    """
+
+    def __init__(self, ascii85=False):
+        try:
+            from reportlab import rl_config
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib.units import cm
+            from reportlab.pdfgen import canvas
+        except ImportError as exc:
+            raise RuntimeError(
+                "La génération PDF nécessite la dépendance 'reportlab'."
+            ) from exc
+
+        self.rl_config = rl_config
+        # Flux compressés laissés en binaire par défaut : l'encodage ASCII85 (Python
+        # pur sans l'extension rl_accel) coûtait près de 40 % du rendu d'une fiche
+        self.ascii85 = ascii85
+        self.canvas_class = canvas.Canvas
+        self.pagesize = A4
+        page_width, page_height = A4
+        self.gauche = 2 * cm
+        self.droite = page_width - 2 * cm
+        self.y_employe = page_height - 3 * cm
+        self.y_periode = page_height - 3.8 * cm
+        self.y_paiement = page_height - 4.6 * cm
+        self.y_salaire = page_height - 6 * cm
+        self.y_primes = self.y_salaire - 0.8 * cm
+        self.y_deductions = self.y_primes - 0.8 * cm
+        self.y_net = self.y_deductions - 1.2 * cm
+        # (police, taille, y, texte) des libellés fixes
+        self.libelles = [
+            ("Helvetica-Bold", 16, page_height - 2 * cm, "Fiche de paie"),
+            ("Helvetica", 10, self.y_employe, "Employé :"),
+            ("Helvetica", 10, self.y_periode, "Période :"),
+            ("Helvetica", 10, self.y_paiement, "Date de paiement :"),
+            ("Helvetica-Bold", 11, self.y_salaire, "Salaire de base"),
+            ("Helvetica", 11, self.y_primes, "Primes"),
+            ("Helvetica", 11, self.y_deductions, "Déductions"),
+            ("Helvetica-Bold", 12, self.y_net, "Net à payer"),
+        ]
+        # Abscisse des valeurs de l'en-tête : juste après leur libellé
+        self.x_entete = {
+            y: self.gauche + canvas.Canvas(BytesIO()).stringWidth(texte + ' ', "Helvetica", 10)
+            for _, _, y, texte in self.libelles[1:4]
+        }
+
+    def dessiner_statique(self, pdf):
+        for police, taille, y, texte in self.libelles:
+            pdf.setFont(police, taille)
+            pdf.drawString(self.gauche, y, texte)
+
+    def dessiner_valeurs(self, pdf, donnees):
+        pdf.setFont("Helvetica", 10)
+        pdf.drawString(self.x_entete[self.y_employe], self.y_employe, donnees['employe'])
+        pdf.drawString(self.x_entete[self.y_periode], self.y_periode, f"{donnees['mois']:02d}/{donnees['annee']}")
+        pdf.drawString(self.x_entete[self.y_paiement], self.y_paiement, f"{donnees['date_paiement']:%d/%m/%Y}")
+        pdf.setFont("Helvetica-Bold", 11)
+        pdf.drawRightString(self.droite, self.y_salaire, f"{donnees['salaire_base']} €")
+        pdf.setFont("Helvetica", 11)
+        pdf.drawRightString(self.droite, self.y_primes, f"{donnees['primes']} €")
+        pdf.drawRightString(self.droite, self.y_deductions, f"{donnees['deductions']} €")
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawRightString(self.droite, self.y_net, f"{donnees['net_a_payer']} €")
+
+    def render(self, fiches, titre, reutiliser_gabarit=True):
+        """PDF (octets) d'une page par fiche ; `reutiliser_gabarit=False` redessine tout à chaque page."""
+        debut = time.perf_counter()
+        buffer = BytesIO()
+        # ReportLab ne lit useA85 que dans rl_config (pas d'option par canvas) : réglé
+        # le temps de ce rendu puis rétabli, sous verrou pour qu'un autre thread ne
+        # rende pas avec la valeur de celui-ci (le rendu, en Python pur, tient le GIL
+        # de toute façon ; le parallélisme passe par les processus de paie.py)
+        with _rl_config_lock:
+            precedent = self.rl_config.useA85
+            self.rl_config.useA85 = int(self.ascii85)
+            try:
+                # invariant : pas d'horodatage ni d'identifiant aléatoire, une fiche régénérée
+                # à l'identique donne les mêmes octets (dédupliqués par employees.storage)
+                pdf = self.canvas_class(buffer, pagesize=self.pagesize, invariant=1)
+                pdf.setTitle(titre)
+                if reutiliser_gabarit:
+                    pdf.beginForm(GABARIT)
+                    self.dessiner_statique(pdf)
+                    pdf.endForm()
+
+                n = 0
+                for donnees in fiches:
+                    if reutiliser_gabarit:
+                        pdf.doForm(GABARIT)
+                    else:
+                        self.dessiner_statique(pdf)
+                    self.dessiner_valeurs(pdf, donnees)
+                    pdf.showPage()
+                    n += 1
+                pdf.save()
+            finally:
+                self.rl_config.useA85 = precedent
+
+            _timings['documents'] += 1
+            _timings['fiches'] += n
+            _timings['secondes'] += time.perf_counter() - debut
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def payslip_template():
+    """Gabarit partagé par tous les rendus du processus."""
+    return PayslipTemplate()
+
+
+def render_fiche_paie(donnees):
+    """Rend une fiche de paie en PDF (octets) à partir de fiche_paie_donnees()."""
+    # Une seule page : le Form XObject alourdirait le fichier sans rien économiser
+    return payslip_template().render(
+        [donnees], f"Fiche de paie {donnees['mois']:02d}/{donnees['annee']}", reutiliser_gabarit=False
+    )
+
+
+def render_fiches_paie(fiches, titre="Fiches de paie"):
+    """Un seul PDF, une page par fiche (ex. tout un département pour un mois)."""
+    return payslip_template().render(fiches, titre)
+
+
+def render_timings():
+    """Nombre de documents / fiches rendus dans ce processus et durée moyenne par fiche (ms)."""
+    fiches = _timings['fiches']
+    return {
+        **_timings,
+        'ms_par_fiche': 1000 * _timings['secondes'] / fiches if fiches else 0.0,
+    }
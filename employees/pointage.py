@@ -0,0 +1,350 @@
+import codecs
+import csv
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Departement, Employe, HoraireTravail, Presence
+
+# Lignes par INSERT groupé
+POINTAGE_BATCH_SIZE = 1000
+
+# Fragments SQL propres au moteur (upsert des pointages, calcul des heures)
+SQL_MOTEUR = {
+    'postgresql': {
+        'plus_tot': 'LEAST',
+        'plus_tard': 'GREATEST',
+        'date': 'CAST({} AS date)',
+        'heure': 'CAST({} AS time)',
+        'secondes': 'EXTRACT(EPOCH FROM ({} - {}))',
+    },
+    'sqlite': {
+        'plus_tot': 'MIN',
+        'plus_tard': 'MAX',
+        'date': '{}',
+        'heure': '{}',
+        'secondes': '((julianday({}) - julianday({})) * 86400)',
+    },
+}
+
+
+@dataclass
+class BilanSaisie:
+    inseres: int = 0
+    deja_saisis: int = 0
+    refuses: list = field(default_factory=list)
+
+
+def saisir_presences(scope, employe_ids, date, heure_arrivee, heure_depart=None):
+    """
+    Saisie groupée d'une journée de présence : une requête valide tous les
+    employés (existence et périmètre), une autre repère ceux déjà pointés, puis
+    un INSERT groupé. ignore_conflicts couvre un pointage concurrent sur la
+    contrainte (employe, date).
+    """
+    demandes = set()
+    bilan = BilanSaisie()
+    for employe_id in employe_ids:
+        try:
+            demandes.add(int(employe_id))
+        except (TypeError, ValueError):
+            bilan.refuses.append(employe_id)
+
+    autorises = set(Employe.objects.visible_to(scope).filter(id__in=demandes).values_list('id', flat=True))
+    bilan.refuses.extend(sorted(demandes - autorises))
+    deja = set(
+        Presence.objects.filter(date=date, employe_id__in=autorises).values_list('employe_id', flat=True)
+    )
+    bilan.deja_saisis = len(deja)
+
+    nouvelles = [
+        Presence(employe_id=employe_id, date=date, heure_arrivee=heure_arrivee, heure_depart=heure_depart)
+        for employe_id in sorted(autorises - deja)
+    ]
+    with transaction.atomic():
+        Presence.objects.bulk_create(nouvelles, batch_size=POINTAGE_BATCH_SIZE, ignore_conflicts=True)
+    bilan.inseres = len(nouvelles)
+    return bilan
+
+
+@dataclass
+class Pointage:
+    employe: object
+    date: datetime.date
+    heure_arrivee: datetime.time
+    heure_depart: datetime.time = None
+
+
+def anti_rebond():
+    """Écart (secondes) en deçà duquel deux badgeages ne font qu'un (double passage, double clic)."""
+    return getattr(settings, 'POINTAGE_ANTI_REBOND', 120)
+
+
+def lire_horodatage(valeur):
+    """Horodatage ISO 8601 d'un terminal, ramené à l'heure locale ; None si invalide."""
+    try:
+        moment = parse_datetime(valeur) if isinstance(valeur, str) else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return timezone.localtime(moment).replace(microsecond=0)
+
+
+def _journees(premiers_derniers):
+    rebond = anti_rebond()
+    lignes = []
+    for (identifiant, date), (premier, dernier) in premiers_derniers.items():
+        ecart = datetime.datetime.combine(date, dernier) - datetime.datetime.combine(date, premier)
+        lignes.append(Pointage(identifiant, date, premier, dernier if ecart.total_seconds() > rebond else None))
+    return lignes
+
+
+def lots_de_journees(badgeages, taille=POINTAGE_BATCH_SIZE):
+    """
+    [(identifiant, datetime local)] -> lots de Pointage, une ligne par (identifiant,
+    jour) : premier badgeage = arrivée, dernier = départ s'il est au-delà de
+    l'anti-rebond. Un même INSERT ne peut pas toucher deux fois la même ligne,
+    d'où ce regroupement préalable.
+
+    En un seul passage : dès que `taille` journées sont ouvertes, le lot est
+    rendu. Une journée peut ainsi être coupée entre deux lots sans conséquence,
+    l'upsert fusionnant avec ce qui est déjà enregistré.
+    """
+    ouvertes = {}
+    for identifiant, moment in badgeages:
+        cle = (identifiant, moment.date())
+        premier, dernier = ouvertes.get(cle, (moment.time(), moment.time()))
+        ouvertes[cle] = (min(premier, moment.time()), max(dernier, moment.time()))
+        if taille and len(ouvertes) >= taille:
+            yield _journees(ouvertes)
+            ouvertes = {}
+    if ouvertes:
+        yield _journees(ouvertes)
+
+
+def regrouper_badgeages(badgeages):
+    return [pointage for lot in lots_de_journees(badgeages, taille=None) for pointage in lot]
+
+
+def _upsert_sql(nb_lignes, cle):
+    fragments = SQL_MOTEUR[connection.vendor]
+    qn = connection.ops.quote_name
+    presence, employe = qn(Presence._meta.db_table), qn(Employe._meta.db_table)
+    tot, tard = fragments['plus_tot'], fragments['plus_tard']
+    arrivee = f"{tot}(p.heure_arrivee, excluded.heure_arrivee)"
+    dernier = (
+        f"{tard}(COALESCE(p.heure_depart, p.heure_arrivee), "
+        f"COALESCE(excluded.heure_depart, excluded.heure_arrivee))"
+    )
+    ecart = fragments['secondes'].format(dernier, arrivee)
+    valeurs = ", ".join(["(%s, %s, %s, %s)"] * nb_lignes)
+    return f"""
+        INSERT INTO {presence} AS p (employe_id, {qn('date')}, heure_arrivee, heure_depart, heures_sup)
+        SELECT e.id, {fragments['date'].format('v.column2')}, {fragments['heure'].format('v.column3')},
+               {fragments['heure'].format('v.column4')}, 0
+        FROM (VALUES {valeurs}) AS v JOIN {employe} e ON e.{qn(cle)} = v.column1
+        WHERE 1 = 1
+        ON CONFLICT (employe_id, {qn('date')}) DO UPDATE SET
+            heure_arrivee = {arrivee},
+            heure_depart = CASE WHEN {ecart} > %s THEN {dernier} END
+        RETURNING (SELECT e2.{qn(cle)} FROM {employe} e2 WHERE e2.id = employe_id),
+                  {qn('date')}, heure_arrivee, heure_depart
+    """
+
+
+def enregistrer_pointages(pointages, cle='matricule'):
+    """
+    Enregistre des journées de pointage (voir regrouper_badgeages) en un INSERT ...
+    ON CONFLICT DO UPDATE par lot, sans lecture préalable : l'employé est résolu par
+    jointure sur `cle` (matricule ou id), et une journée déjà commencée ne garde que
+    le plus tôt des arrivées et le plus tard des badgeages. Concurrents et rejouables
+    (terminal resté hors ligne) sans créer de doublon.
+
+    Renvoie les journées à jour, sous forme de Pointage ; les identifiants inconnus
+    n'y figurent pas.
+    """
+    ops = connection.ops
+    resultat = []
+    for debut in range(0, len(pointages), POINTAGE_BATCH_SIZE):
+        lot = pointages[debut:debut + POINTAGE_BATCH_SIZE]
+        params = []
+        for pointage in lot:
+            params += [
+                pointage.employe,
+                ops.adapt_datefield_value(pointage.date),
+                ops.adapt_timefield_value(pointage.heure_arrivee),
+                ops.adapt_timefield_value(pointage.heure_depart),
+            ]
+        params.append(anti_rebond())
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(len(lot), cle), params)
+            lignes = cursor.fetchall()
+        resultat += [Pointage(*_convertir(ligne)) for ligne in lignes]
+    return resultat
+
+
+def _convertir(ligne):
+    identifiant, date, arrivee, depart = ligne
+    # SQLite renvoie des chaînes ISO
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    if isinstance(arrivee, str):
+        arrivee = datetime.time.fromisoformat(arrivee)
+    if isinstance(depart, str):
+        depart = datetime.time.fromisoformat(depart)
+    return identifiant, date, arrivee, depart
+
+
+def badger(employe_id, moment=None):
+    """Badgeage d'un employé connecté : une seule requête, sans course possible."""
+    moment = moment or timezone.localtime().replace(microsecond=0)
+    return enregistrer_pointages(regrouper_badgeages([(employe_id, moment)]), cle='id')[0]
+
+
+# Rejets conservés pour le rapport d'import (les suivants sont seulement comptés)
+IMPORT_MAX_REJETS = 1000
+
+
+@dataclass
+class BilanImport:
+    lus: int = 0
+    # Écritures de journées : une journée coupée entre deux lots compte plusieurs fois
+    journees: int = 0
+    nb_rejets: int = 0
+    rejets: list = field(default_factory=list)
+
+    def rejeter(self, ligne, erreur):
+        self.nb_rejets += 1
+        if len(self.rejets) < IMPORT_MAX_REJETS:
+            self.rejets.append((ligne, erreur))
+
+
+def lire_journal(flux, format):
+    """
+    Journal de badgeages (flux binaire), lu ligne à ligne -> (numéro de ligne,
+    matricule, horodatage brut, erreur). CSV avec en-tête matricule,horodatage
+    (séparateur , ou ;) ou JSON Lines {"matricule": ..., "horodatage": ...}.
+    """
+    lignes = codecs.iterdecode(flux, 'utf-8-sig')
+    if format == 'csv':
+        lignes = iter(lignes)
+        entete = next(lignes, '')
+        separateur = ',' if entete.count(',') >= entete.count(';') else ';'
+        colonnes = [c.strip().lower() for c in next(csv.reader([entete], delimiter=separateur), [])]
+        if not {'matricule', 'horodatage'} <= set(colonnes):
+            yield 1, None, None, "en-tête matricule,horodatage attendu"
+            return
+        for numero, valeurs in enumerate(csv.reader(lignes, delimiter=separateur), start=2):
+            if not valeurs:
+                continue
+            ligne = dict(zip(colonnes, valeurs))
+            yield numero, (ligne.get('matricule') or '').strip(), ligne.get('horodatage'), None
+    else:
+        for numero, texte in enumerate(lignes, start=1):
+            if not texte.strip():
+                continue
+            try:
+                ligne = json.loads(texte)
+                yield numero, str(ligne.get('matricule') or '').strip(), ligne.get('horodatage'), None
+            except (ValueError, AttributeError):
+                yield numero, None, None, "JSON invalide"
+
+
+def importer_journal(flux, format, taille=POINTAGE_BATCH_SIZE):
+    """
+    Importe un journal de badgeages en flux : doublons et paires arrivée / départ
+    résolus par lots de journées, chaque lot écrit en un seul upsert. La mémoire
+    est bornée par la taille d'un lot, quelle que soit celle du fichier.
+    """
+    bilan = BilanImport()
+    # Première ligne de chaque matricule du lot en cours, pour signaler les inconnus
+    premieres_lignes = {}
+
+    def badgeages():
+        for numero, matricule, horodatage, erreur in lire_journal(flux, format):
+            bilan.lus += 1
+            moment = lire_horodatage(horodatage) if matricule else None
+            if erreur or moment is None:
+                bilan.rejeter(numero, erreur or "matricule ou horodatage invalide")
+                continue
+            premieres_lignes.setdefault(matricule, numero)
+            yield matricule, moment
+
+    for lot in lots_de_journees(badgeages(), taille):
+        connus = {journee.employe for journee in enregistrer_pointages(lot)}
+        bilan.journees += sum(1 for pointage in lot if pointage.employe in connus)
+        for pointage in lot:
+            if pointage.employe not in connus and pointage.employe in premieres_lignes:
+                bilan.rejeter(premieres_lignes.pop(pointage.employe), f"matricule inconnu : {pointage.employe}")
+        premieres_lignes.clear()
+    return bilan
+
+
+def horaires_par_departement():
+    """{departement_id: HoraireTravail} ; clé None pour l'horaire par défaut (7 h, 1 h de pause s'il n'existe pas)."""
+    horaires = {horaire.departement_id: horaire for horaire in HoraireTravail.objects.all()}
+    horaires.setdefault(None, HoraireTravail(nom="Par défaut"))
+    return horaires
+
+
+def _calcul_heures_sql(par_departement):
+    fragments = SQL_MOTEUR[connection.vendor]
+    qn = connection.ops.quote_name
+    presence, employe = qn(Presence._meta.db_table), qn(Employe._meta.db_table)
+    tard = fragments['plus_tard']
+    # Arrondi à la seconde : julianday() de SQLite travaille en virgule flottante
+    duree = "ROUND({})".format(fragments['secondes'].format('heure_depart', 'heure_arrivee'))
+    # Départ avant l'arrivée : poste de nuit terminé le lendemain
+    minutes = f"(({duree} + CASE WHEN heure_depart < heure_arrivee THEN 86400 ELSE 0 END) / 60.0 - %(pause)s)"
+    travaillees = f"{tard}({minutes}, 0) / 60.0"
+    sup = f"FLOOR({tard}({minutes} - %(minutes_jour)s, 0) / %(arrondi)s) * %(arrondi)s / 60.0"
+    departement = "departement_id = %(departement)s" if par_departement else "departement_id IS NULL"
+    return f"""
+        UPDATE {presence} SET
+            heures_travaillees = CASE WHEN heure_depart IS NULL THEN NULL ELSE ROUND({travaillees}, 2) END,
+            heures_sup = CASE WHEN heure_depart IS NULL THEN 0 ELSE ROUND({sup}, 2) END
+        WHERE {qn('date')} BETWEEN %(debut)s AND %(fin)s
+          AND employe_id IN (SELECT id FROM {employe} WHERE {departement})
+    """
+
+
+def calculer_heures(annee, mois, departement_id=None):
+    """
+    Heures travaillées et heures supplémentaires du mois, recalculées d'un bloc :
+    un UPDATE ensembliste par département (horaire du département, sinon horaire
+    par défaut), exécuté par la base sur toutes les présences du mois à la fois.
+    Idempotent : à relancer après toute correction de pointage.
+
+    Renvoie le nombre de présences mises à jour.
+    """
+    debut = datetime.date(annee, mois, 1)
+    fin = (debut + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    horaires = horaires_par_departement()
+    if departement_id:
+        departements = [departement_id]
+    else:
+        # Employés sans département : horaire par défaut
+        departements = [None] + list(Departement.objects.values_list('id', flat=True))
+
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for dept in departements:
+            horaire = horaires.get(dept, horaires[None])
+            cursor.execute(_calcul_heures_sql(dept is not None), {
+                'pause': horaire.pause_minutes,
+                'minutes_jour': float(horaire.heures_par_jour * 60),
+                'arrondi': horaire.arrondi_minutes or 1,
+                'departement': dept,
+                'debut': connection.ops.adapt_datefield_value(debut),
+                'fin': connection.ops.adapt_datefield_value(fin),
+            })
+            total += cursor.rowcount
+    return total
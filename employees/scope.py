@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+
+from .models import Employe
+
+
+@dataclass(frozen=True)
+class AccessScope:
+    """Périmètre d'accès de l'utilisateur courant, résolu une fois par requête."""
+    is_authenticated: bool = False
+    is_superuser: bool = False
+    employe_id: int = None
+    role: str = None
+    # Département du poste occupé
+    departement_id: int = None
+    # Département dirigé (chef de service)
+    led_departement_id: int = None
+
+    @property
+    def has_profil(self):
+        return self.employe_id is not None
+
+    @property
+    def is_superadmin(self):
+        return self.role == 'ADMIN' or self.is_superuser
+
+    @property
+    def is_rh(self):
+        return self.role == 'RH'
+
+    @property
+    def is_manager(self):
+        return self.role == 'MANAGER'
+
+    @property
+    def is_dept_admin(self):
+        return self.is_manager
+
+    @property
+    def is_any_admin(self):
+        return self.is_superadmin or self.is_dept_admin or self.is_rh
+
+    @property
+    def is_only_employe(self):
+        return self.role == 'EMPLOYE'
+
+    @property
+    def role_display(self):
+        return dict(Employe.ROLES).get(self.role, '')
+
+    @property
+    def sees_all(self):
+        # Superadmin et RH uniquement : un compte sans profil employé ne voit rien
+        return self.is_superadmin or self.is_rh
+
+    def covers_departement(self, departement_id):
+        """Vrai si le département fait partie du périmètre de l'utilisateur."""
+        return self.sees_all or (departement_id is not None and departement_id == self.departement_id)
+
+
+ANONYMOUS_SCOPE = AccessScope()
+
+
+def resolve_access_scope(user):
+    if not user.is_authenticated:
+        return ANONYMOUS_SCOPE
+    profil = (
+        Employe.objects.filter(user_id=user.pk)
+        .values('id', 'role', 'departement_id', 'departement_dirige__id')
+        .first()
+    )
+    if profil is None:
+        return AccessScope(is_authenticated=True, is_superuser=user.is_superuser)
+    return AccessScope(
+        is_authenticated=True,
+        is_superuser=user.is_superuser,
+        employe_id=profil['id'],
+        role=profil['role'],
+        departement_id=profil['departement_id'],
+        led_departement_id=profil['departement_dirige__id'],
+    )
+
+
+def get_access_scope(request):
+    """Renvoie le périmètre posé par AccessScopeMiddleware, ou le résout à la volée."""
+    scope = getattr(request, 'access_scope', None)
+    if scope is None:
+        scope = resolve_access_scope(request.user)
+        request.access_scope = scope
+    return scope
@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'employees_employe_fts'
+
+_fts_disponible = None
+
+
+def normaliser(texte):
+    """Minuscules sans accents ni ponctuation : 'Hélène Lefèvre-Côté' -> 'helene lefevre cote'."""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texte.lower()))
+
+
+def build_search_document(employe):
+    poste = employe.poste.titre if employe.poste_id else ''
+    return normaliser(' '.join(filter(None, [employe.nom, employe.prenom, employe.matricule, poste])))
+
+
+def _sqlite_fts_disponible():
+    global _fts_disponible
+    if _fts_disponible is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_disponible = cursor.fetchone() is not None
+    return _fts_disponible
+
+
+def search_employees(queryset, terme):
+    """
+    Filtre `queryset` sur le terme recherché et annote `search_rank` (plus grand = plus pertinent).
+
+    - PostgreSQL : sous-chaîne ou opérateur %> (pg_trgm), servis tous deux par
+      l'index GIN gin_trgm_ops ; classement par similarité trigramme
+    - SQLite : table FTS5 employees_employe_fts ; classement simplifié (les
+      documents commençant par le terme d'abord)
+    - autres moteurs : sous-chaîne sur search_document, même classement simplifié
+    """
+    terme = normaliser(terme)
+    if not terme:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        # Pas de filtre sur search_rank : un OR avec une expression calculée
+        # empêcherait le recours à l'index
+        return queryset.filter(
+            Q(search_document__contains=terme) | TrigramWordSimilar(F('search_document'), Value(terme))
+        ).annotate(search_rank=TrigramWordSimilarity(terme, 'search_document'))
+
+    if connection.vendor == 'sqlite' and _sqlite_fts_disponible():
+        # Chaque mot est cherché comme préfixe : "dup jea" trouve "Dupont Jean"
+        requete = ' '.join(f'"{mot}"*' for mot in terme.split())
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (requete,))
+        )
+    else:
+        queryset = queryset.filter(search_document__contains=terme)
+
+    # bm25 exigerait une sous-requête MATCH par ligne, bien trop lente sur SQLite
+    return queryset.annotate(search_rank=Case(
+        When(search_document__startswith=terme, then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField(),
+    ))
+
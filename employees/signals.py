@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    Employe, Conge, Formation, Departement, Poste,
+    FichePaie, Contrat, DocumentRH, Candidature, InscriptionFormation
+)
+from .backends import oublier_identifiants
+from .dashboard import invalidate_dashboard_cache
+from .storage import ajuster_references
+
+
+@receiver(post_save, sender=Employe)
+@receiver(post_delete, sender=Employe)
+@receiver(post_save, sender=Conge)
+@receiver(post_delete, sender=Conge)
+@receiver(post_save, sender=Formation)
+@receiver(post_delete, sender=Formation)
+@receiver(post_save, sender=Departement)
+@receiver(post_delete, sender=Departement)
+@receiver(post_save, sender=Poste)
+@receiver(post_delete, sender=Poste)
+def invalider_tableau_de_bord(sender, **kwargs):
+    invalidate_dashboard_cache()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def oublier_compte_utilisateur(sender, instance, **kwargs):
+    # Cache négatif de EmailOrUsernameBackend : le compte devient valide immédiatement
+    if instance.email:
+        oublier_identifiants(instance.username, instance.email, instance.email.lower())
+    else:
+        oublier_identifiants(instance.username)
+
+
+@receiver(post_save, sender=Employe)
+def oublier_matricule(sender, instance, **kwargs):
+    oublier_identifiants(instance.matricule)
+
+
+@receiver(pre_delete, sender=Poste)
+def detacher_departement_des_employes(sender, instance, **kwargs):
+    # Le SET_NULL sur Employe.poste se fait par UPDATE, sans passer par Employe.save()
+    Employe.objects.filter(poste_id=instance.pk).update(departement_id=None)
+
+
+# Compteur de références des fichiers stockés par contenu
+FICHIERS = {
+    FichePaie: 'fichier_pdf',
+    Contrat: 'fichier',
+    DocumentRH: 'fichier',
+    Candidature: 'cv',
+    InscriptionFormation: 'attestation',
+}
+
+
+def _nom_fichier(instance, champ):
+    # Lu dans __dict__ pour ne pas charger un champ différé
+    valeur = instance.__dict__.get(champ)
+    return getattr(valeur, 'name', valeur) or ''
+
+
+def memoriser_fichier(sender, instance, **kwargs):
+    instance._fichier_initial = _nom_fichier(instance, FICHIERS[sender])
+
+
+def compter_fichier(sender, instance, created, **kwargs):
+    nom = _nom_fichier(instance, FICHIERS[sender])
+    initial = '' if created else getattr(instance, '_fichier_initial', '')
+    if nom != initial:
+        ajuster_references(ajoutes=[nom], retires=[initial])
+        instance._fichier_initial = nom
+
+
+def decompter_fichier(sender, instance, **kwargs):
+    ajuster_references(retires=[getattr(instance, '_fichier_initial', '')])
+
+
+for _model in FICHIERS:
+    post_init.connect(memoriser_fichier, sender=_model)
+    post_save.connect(compter_fichier, sender=_model)
+    post_delete.connect(decompter_fichier, sender=_model)
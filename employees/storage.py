@@ -0,0 +1,116 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+# Racine des blobs sous MEDIA_ROOT : cas/ab/cd/<sha256><extension>
+CAS_PREFIX = 'cas/'
+
+# (modèle, champ) des fichiers stockés par contenu
+CAS_FIELDS = [
+    ('FichePaie', 'fichier_pdf'),
+    ('Contrat', 'fichier'),
+    ('DocumentRH', 'fichier'),
+    ('Candidature', 'cv'),
+    ('InscriptionFormation', 'attestation'),
+]
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stockage adressé par le contenu : le nom d'un fichier est l'empreinte SHA-256
+    de ses octets, un contenu identique n'est donc écrit qu'une fois.
+
+    Les fichiers ne sont jamais supprimés individuellement (un blob peut être
+    partagé) : la commande gc_media retire ceux qui ne sont plus référencés.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif est calculé dans _save() : pas de suffixe anti-collision
+        return name
+
+    def _save(self, name, content):
+        empreinte = hashlib.sha256()
+        taille = 0
+        for chunk in content.chunks():
+            empreinte.update(chunk)
+            taille += len(chunk)
+        digest = empreinte.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = f"{CAS_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+        path = self.path(name)
+        try:
+            # Contenu déjà présent : date du fichier rafraîchie, le balayage de cas/
+            # par gc_media ne le prend pas pour un reste de transaction annulée
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Écriture dans un fichier temporaire puis renommage atomique : deux
+            # envois simultanés du même contenu écrivent les mêmes octets
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    for chunk in content.chunks():
+                        out.write(chunk)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp, self.file_permissions_mode)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+        # Blob déjà connu (même orphelin) : dernier_usage rafraîchi, gc_media ne le
+        # balaiera pas avant que la référence toute neuve ne soit comptée
+        FichierStocke = apps.get_model('employees', 'FichierStocke')
+        FichierStocke.objects.bulk_create(
+            [FichierStocke(nom=name, taille=taille, dernier_usage=timezone.now())],
+            update_conflicts=True, unique_fields=['nom'], update_fields=['dernier_usage'],
+        )
+        return name
+
+    def delete(self, name):
+        # Voir gc_media
+        pass
+
+    def purge(self, name):
+        super().delete(name)
+
+
+cas_storage_instance = ContentAddressedStorage()
+
+
+def cas_storage():
+    return cas_storage_instance
+
+
+def est_blob(nom):
+    return bool(nom) and nom.startswith(CAS_PREFIX)
+
+
+def ajuster_references(ajoutes=(), retires=()):
+    """Met à jour le compteur de références des blobs (noms de fichiers ajoutés / retirés)."""
+    FichierStocke = apps.get_model('employees', 'FichierStocke')
+    delta = Counter(nom for nom in ajoutes if est_blob(nom))
+    delta.subtract(nom for nom in retires if est_blob(nom))
+    for nom, n in delta.items():
+        if n:
+            FichierStocke.objects.filter(nom=nom).update(references=F('references') + n)
+
+
+def noms_references():
+    """Compte exact des références de chaque fichier, relu dans toutes les tables concernées."""
+    compte = Counter()
+    for model_name, field in CAS_FIELDS:
+        model = apps.get_model('employees', model_name)
+        noms = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        compte.update(noms.values_list(field, flat=True).iterator(chunk_size=2000))
+    return compte
@@ -1,12 +1,62 @@
-from django.test import TestCase
-from django.urls import reverse
-from .models import Departement, Poste, Employe
-from datetime import date
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from dataclasses import FrozenInstanceError
+from datetime import date, time, timedelta
+from decimal import Decimal
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .backends import EMAIL_LOWER_INDEX, EmailOrUsernameBackend
+from .calendrier import absents, pic_absences, verifier_demande
+from .conges import acquerir_mois, changer_statut, decider, solde
+from .dashboard import (
+    DEPARTEMENT, GLOBAL, DashboardScope, compute_dashboard_stats, dashboard_cache_counters, get_dashboard_stats,
+)
+from .exports import ExportError, write_export
+from .models import (
+    Candidature, Conge, CyclePaie, Departement, DocumentRH, Employe, FichePaie, FichierStocke, Formation,
+    HoraireTravail, InscriptionFormation, Notification, OffreEmploi, Poste, Presence, Prime, SoldeConge,
+)
+from .notifications import envoyer_notifications, envoyer_recapitulatifs, statistiques_notifications
+from .pagination import KeysetPaginator
+from .paie import executer_cycle, traiter_file_pdf
+from .pdf import PayslipTemplate, render_fiche_paie, render_fiches_paie, render_timings
+from .pointage import saisir_presences
+from .scope import AccessScope, resolve_access_scope
+from .search import search_employees
+
+# Fichiers écrits par les tests (fiches de paie, documents, CV) : jamais dans le vrai MEDIA_ROOT
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='rh-tests-media-')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class MediaTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
 
 class HRMTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username='testuser', password='password')
+        self.user = User.objects.create_user(username='testuser', password='password', is_superuser=True)
         self.client.login(username='testuser', password='password')
         self.dept = Departement.objects.create(nom="RH", code="RH01")
         self.poste = Poste.objects.create(titre="Manager", departement=self.dept)
@@ -31,3 +81,1336 @@ class HRMTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "jean.dupont@example.com")
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Informatique", code="INFO")
+        self.autre = Departement.objects.create(nom="Finance", code="FIN")
+        poste = Poste.objects.create(titre="Développeur", departement=self.dept)
+        poste_fin = Poste.objects.create(titre="Comptable", departement=self.autre)
+        self.employe = Employe.objects.create(
+            nom="Martin", prenom="Paul", email="paul.martin@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2500
+        )
+        Employe.objects.create(
+            nom="Durand", prenom="Marie", email="marie.durand@example.com",
+            date_embauche=date.today(), poste=poste_fin, salaire=2800
+        )
+
+    def test_global_scope_counts_everyone(self):
+        stats = compute_dashboard_stats(DashboardScope(GLOBAL))
+        self.assertEqual(stats.total_employees, 2)
+        self.assertEqual(stats.arrivals_per_day[-1]['count'], 2)
+        self.assertEqual(len(stats.arrivals_per_day), 7)
+
+    def test_departement_scope_is_restricted(self):
+        stats = compute_dashboard_stats(DashboardScope(DEPARTEMENT, departement_id=self.dept.id))
+        self.assertEqual(stats.total_employees, 1)
+        self.assertEqual([d.nom for d in stats.departements], ["Informatique"])
+        self.assertEqual(stats.arrivals_per_day[-1]['count'], 1)
+
+    def test_kpis_use_constant_number_of_queries(self):
+        # 6 requêtes : effectif + arrivées (une agrégation), congés en attente, formations,
+        # puis les listes départements, congés récents, anniversaires
+        with self.assertNumQueries(6), CaptureQueriesContext(connection) as requetes:
+            compute_dashboard_stats(DashboardScope(GLOBAL))
+        # Compteur des congés en attente filtré en WHERE : l'index partiel est utilisable
+        self.assertTrue(any(
+            'FROM "employees_conge" WHERE "employees_conge"."statut" = ' in q['sql'] and 'FILTER' not in q['sql']
+            for q in requetes
+        ))
+
+    def test_account_without_profile_gets_empty_dashboard(self):
+        User.objects.create_user(username='sansprofil', password='password')
+        self.client.login(username='sansprofil', password='password')
+        response = self.client.get(reverse('employees:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['stats']
+        self.assertEqual((stats.total_employees, stats.total_pending_conges), (0, 0))
+        self.assertEqual((stats.departements, stats.anniversaires, stats.recent_conges), ([], [], []))
+        self.assertNotContains(response, "Martin")
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dept = Departement.objects.create(nom="Logistique", code="LOG")
+        self.poste = Poste.objects.create(titre="Magasinier", departement=self.dept)
+
+    def test_snapshot_is_reused_then_invalidated(self):
+        scope = DashboardScope(GLOBAL)
+        self.assertEqual(get_dashboard_stats(scope).total_employees, 0)
+        with self.assertNumQueries(0):
+            get_dashboard_stats(scope)
+        self.assertEqual(dashboard_cache_counters(), {'hits': 1, 'misses': 1})
+
+        Employe.objects.create(
+            nom="Petit", prenom="Luc", email="luc.petit@example.com",
+            date_embauche=date.today(), poste=self.poste, salaire=2000
+        )
+        self.assertEqual(get_dashboard_stats(scope).total_employees, 1)
+
+    def test_metrics_endpoint_requires_superadmin(self):
+        url = reverse('employees:dashboard_cache_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        User.objects.create_superuser(username='admin', password='password')
+        self.client.login(username='admin', password='password')
+        response = self.client.get(url)
+        self.assertContains(response, "rh_dashboard_cache_hits_total")
+
+class AccessScopeTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Production", code="PROD")
+        self.autre = Departement.objects.create(nom="Achats", code="ACH")
+        self.poste = Poste.objects.create(titre="Chef d'atelier", departement=self.dept)
+        poste_achats = Poste.objects.create(titre="Acheteur", departement=self.autre)
+        self.user = User.objects.create_user(username='chef', password='password')
+        self.manager = Employe.objects.create(
+            user=self.user, role='MANAGER', nom="Leroy", prenom="Anne", email="anne.leroy@example.com",
+            date_embauche=date.today(), poste=self.poste, salaire=4000
+        )
+        self.dept.chef_de_service = self.manager
+        self.dept.save()
+        self.externe = Employe.objects.create(
+            nom="Morel", prenom="Hugo", email="hugo.morel@example.com",
+            date_embauche=date.today(), poste=poste_achats, salaire=2600
+        )
+
+    def test_scope_is_resolved_in_one_query(self):
+        with self.assertNumQueries(1):
+            scope = resolve_access_scope(self.user)
+        self.assertEqual(scope.employe_id, self.manager.pk)
+        self.assertEqual(scope.departement_id, self.dept.pk)
+        self.assertEqual(scope.led_departement_id, self.dept.pk)
+        self.assertTrue(scope.is_manager)
+        self.assertFalse(scope.sees_all)
+
+    def test_scope_is_immutable(self):
+        scope = resolve_access_scope(self.user)
+        with self.assertRaises(FrozenInstanceError):
+            scope.role = 'RH'
+
+    def test_manager_cannot_see_other_departement(self):
+        self.client.login(username='chef', password='password')
+        response = self.client.get(reverse('employees:employee_list'))
+        self.assertContains(response, "Leroy")
+        self.assertNotContains(response, "Morel")
+        response = self.client.get(reverse('employees:employee_detail', args=[self.externe.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_account_without_profile_sees_nothing(self):
+        User.objects.create_user(username='sansprofil', password='password')
+        Formation.objects.create(
+            titre="Sécurité", description="Générale", date_debut=date.today(), date_fin=date.today(),
+        )
+        Presence.objects.create(employe=self.externe, date=date.today(), heure_arrivee=time(8, 0))
+        scope = resolve_access_scope(User.objects.get(username='sansprofil'))
+        self.assertFalse(scope.sees_all)
+        self.assertFalse(Formation.objects.visible_to(scope).exists())
+
+        # Pas de plantage : les listes s'affichent, vides
+        self.client.login(username='sansprofil', password='password')
+        response = self.client.get(reverse('employees:employee_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Morel")
+        for name in ('presence_list', 'conge_list', 'formation_list'):
+            response = self.client.get(reverse(f'employees:{name}'))
+            self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Sécurité")
+        response = self.client.get(reverse('employees:employee_detail', args=[self.externe.pk]))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('employees:export_employees_csv'))
+        self.assertNotIn("Morel", b''.join(response.streaming_content).decode())
+
+class VisibleToTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Qualité", code="QUA")
+        autre = Departement.objects.create(nom="Ventes", code="VEN")
+        poste = Poste.objects.create(titre="Auditeur", departement=self.dept)
+        poste_ventes = Poste.objects.create(titre="Commercial", departement=autre)
+        self.employe = Employe.objects.create(
+            nom="Roux", prenom="Léa", email="lea.roux@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2400
+        )
+        self.collegue = Employe.objects.create(
+            nom="Blanc", prenom="Noé", email="noe.blanc@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2400
+        )
+        self.vendeur = Employe.objects.create(
+            nom="Faure", prenom="Ines", email="ines.faure@example.com",
+            date_embauche=date.today(), poste=poste_ventes, salaire=2400
+        )
+        for employe in (self.employe, self.collegue, self.vendeur):
+            Conge.objects.create(employe=employe, type_conge='ANNUEL', date_debut=date.today(), date_fin=date.today())
+
+    def scope(self, **kwargs):
+        return AccessScope(is_authenticated=True, **kwargs)
+
+    def test_rh_sees_everything(self):
+        scope = self.scope(employe_id=self.employe.pk, role='RH', departement_id=self.dept.pk)
+        self.assertEqual(Employe.objects.visible_to(scope).count(), 3)
+        self.assertEqual(Conge.objects.visible_to(scope).count(), 3)
+
+    def test_manager_is_restricted_to_departement(self):
+        scope = self.scope(employe_id=self.employe.pk, role='MANAGER', departement_id=self.dept.pk)
+        self.assertEqual(set(Employe.objects.visible_to(scope)), {self.employe, self.collegue})
+        self.assertEqual(Conge.objects.visible_to(scope).count(), 2)
+
+    def test_employe_only_sees_own_leaves(self):
+        scope = self.scope(employe_id=self.employe.pk, role='EMPLOYE', departement_id=self.dept.pk)
+        self.assertEqual(Employe.objects.visible_to(scope).count(), 2)
+        self.assertEqual(list(Conge.objects.visible_to(scope).values_list('employe_id', flat=True)), [self.employe.pk])
+
+    def test_employe_without_poste_sees_no_colleague(self):
+        scope = self.scope(employe_id=self.employe.pk, role='EMPLOYE')
+        self.assertFalse(Employe.objects.visible_to(scope).exists())
+
+class DepartementDenormalisationTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Support", code="SUP")
+        self.autre = Departement.objects.create(nom="Juridique", code="JUR")
+        self.poste = Poste.objects.create(titre="Technicien", departement=self.dept)
+        self.employe = Employe.objects.create(
+            nom="Gauthier", prenom="Eva", email="eva.gauthier@example.com",
+            date_embauche=date.today(), poste=self.poste, salaire=2100
+        )
+
+    def test_departement_follows_poste(self):
+        self.assertEqual(self.employe.departement_id, self.dept.id)
+        self.employe.poste = Poste.objects.create(titre="Juriste", departement=self.autre)
+        self.employe.save(update_fields=['poste'])
+        self.employe.refresh_from_db()
+        self.assertEqual(self.employe.departement_id, self.autre.id)
+
+    def test_moving_poste_updates_employes(self):
+        self.poste.departement = self.autre
+        self.poste.save()
+        self.employe.refresh_from_db()
+        self.assertEqual(self.employe.departement_id, self.autre.id)
+
+    def test_deleting_poste_clears_departement(self):
+        self.poste.delete()
+        self.employe.refresh_from_db()
+        self.assertIsNone(self.employe.departement_id)
+
+    def test_check_command_fixes_drift(self):
+        Employe.objects.filter(pk=self.employe.pk).update(departement=self.autre)
+        out = StringIO()
+        call_command('check_departements', '--fix', stdout=out)
+        self.employe.refresh_from_db()
+        self.assertEqual(self.employe.departement_id, self.dept.id)
+
+@skipUnless(connection.vendor == 'postgresql', "Plans d'exécution spécifiques à PostgreSQL")
+class IndexUsageTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Usine", code="USI")
+        poste = Poste.objects.create(titre="Opérateur", departement=dept)
+        self.employe = Employe.objects.create(
+            nom="Lambert", prenom="Tom", email="tom.lambert@example.com",
+            date_naissance=date(1990, 5, 12), date_embauche=date.today(), poste=poste, salaire=2000
+        )
+
+    def assertUsesIndex(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            # Sur des tables quasi vides le planificateur préfère un parcours séquentiel
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            self.assertIn(index_name, queryset.explain())
+
+    def test_pending_leaves_use_partial_index(self):
+        self.assertUsesIndex(Conge.objects.filter(statut='EN_ATTENTE').order_by('-date_debut')[:5], 'conge_en_attente_idx')
+
+    def test_birthdays_use_month_expression_index(self):
+        self.assertUsesIndex(Employe.objects.filter(date_naissance__month=5), 'employe_mois_naissance_idx')
+
+    def test_payslip_period_uses_composite_index(self):
+        self.assertUsesIndex(FichePaie.objects.filter(annee=2026, mois=1), 'fichepaie_periode_idx')
+
+    def test_attendance_uses_employe_date_index(self):
+        self.assertUsesIndex(Presence.objects.filter(employe=self.employe, date=date.today()), 'presence_employe_date_uniq')
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Atelier", code="ATL")
+        poste = Poste.objects.create(titre="Soudeur", departement=dept)
+        self.employe = Employe.objects.create(
+            nom="Caron", prenom="Jules", email="jules.caron@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2000
+        )
+        collegue = Employe.objects.create(
+            nom="Hubert", prenom="Léa", email="lea.hubert@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2000
+        )
+        # Deux présences par jour (une par employé) : égalités sur la date départagées par l'id
+        for i in range(7):
+            Presence.objects.create(
+                employe=(self.employe, collegue)[i % 2], date=date.today() - timedelta(days=i // 2), heure_arrivee='08:00'
+            )
+
+    def test_pages_walk_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Presence.objects.all(), ordering=('-date', '-id'), per_page=3)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        seen = [p.pk for page in (first, second, third) for p in page]
+        expected = list(Presence.objects.order_by('-date', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertFalse(third.has_next())
+        self.assertEqual([p.pk for p in paginator.get_page(second.previous_cursor)], [p.pk for p in first])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Presence.objects.all(), ordering=('-date', '-id'), per_page=3)
+        self.assertFalse(paginator.get_page('not-a-cursor').has_previous())
+
+    def test_employee_list_keeps_search_across_pages(self):
+        User.objects.create_superuser(username='admin', password='password')
+        self.client.login(username='admin', password='password')
+        for i in range(60):
+            Employe.objects.create(nom=f"Caron{i:02d}", prenom="X", email=f"c{i}@example.com", date_embauche=date.today(), salaire=1)
+        response = self.client.get(reverse('employees:employee_list'), {'q': 'Caron'})
+        page = response.context['employees']
+        self.assertEqual(len(page), 50)
+        self.assertContains(response, "q=Caron&amp;cursor=")
+        response = self.client.get(reverse('employees:employee_list'), {'q': 'Caron', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['employees']), 11)
+
+class EmployeeSearchTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Marketing", code="MKT")
+        self.poste = Poste.objects.create(titre="Chargée de communication", departement=dept)
+        self.helene = Employe.objects.create(
+            nom="Lefèvre", prenom="Hélène", matricule="MKT-001", email="helene.lefevre@example.com",
+            date_embauche=date.today(), poste=self.poste, salaire=2600
+        )
+        Employe.objects.create(
+            nom="Bernard", prenom="Marc", matricule="MKT-002", email="marc.bernard@example.com",
+            date_embauche=date.today(), poste=self.poste, salaire=2600
+        )
+
+    def test_search_is_accent_insensitive(self):
+        for terme in ("lefevre", "HELENE", "Lefèvre hél"):
+            self.assertEqual(list(search_employees(Employe.objects.all(), terme)), [self.helene], terme)
+
+    def test_search_matches_poste_and_follows_renames(self):
+        self.assertEqual(search_employees(Employe.objects.all(), "communication").count(), 2)
+        self.poste.titre = "Graphiste"
+        self.poste.save()
+        self.assertEqual(search_employees(Employe.objects.all(), "communication").count(), 0)
+        self.assertEqual(search_employees(Employe.objects.all(), "graphiste").count(), 2)
+
+    def test_search_document_updates_with_partial_save(self):
+        self.helene.nom = "Côté"
+        self.helene.save(update_fields=['nom'])
+        self.assertEqual(list(search_employees(Employe.objects.all(), "cote")), [self.helene])
+
+class EmployeeCsvExportTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Logistique", code="LOG")
+        autre = Departement.objects.create(nom="Achats", code="ACH")
+        poste = Poste.objects.create(titre="Magasinier", departement=dept)
+        poste_achats = Poste.objects.create(titre="Acheteur", departement=autre)
+        self.user = User.objects.create_user(username='chef', password='password')
+        Employe.objects.create(
+            user=self.user, nom="Petit", prenom="Anne", email="anne.petit@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2600, role='MANAGER'
+        )
+        Employe.objects.create(
+            nom="Sans", prenom="Poste", email="sans.poste@example.com",
+            date_embauche=date.today(), poste=None, salaire=1900
+        )
+        Employe.objects.create(
+            nom="Vidal", prenom="Luc", email="luc.vidal@example.com",
+            date_embauche=date.today(), poste=poste_achats, salaire=2700
+        )
+
+    def export(self):
+        response = self.client.get(reverse('employees:export_employees_csv'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_export_handles_employee_without_poste(self):
+        User.objects.create_user(username='admin', password='password', is_superuser=True)
+        self.client.login(username='admin', password='password')
+        lignes = self.export()
+        self.assertEqual(len(lignes), 4)
+        self.assertIn("Sans,Poste,sans.poste@example.com,,,", "\n".join(lignes))
+
+    def test_export_is_scoped_to_departement(self):
+        self.client.login(username='chef', password='password')
+        lignes = self.export()
+        self.assertEqual(len(lignes), 2)
+        self.assertTrue(lignes[1].startswith(",Petit,Anne,"))
+
+class ExportEngineTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Paie", code="PAI")
+        autre = Departement.objects.create(nom="Juridique", code="JUR")
+        self.employe = Employe.objects.create(
+            matricule="P001", nom="Garnier", prenom="Lucie", email="lucie.garnier@example.com",
+            date_embauche=date(2024, 1, 2), poste=Poste.objects.create(titre="Gestionnaire", departement=dept),
+            salaire=2500,
+        )
+        juriste = Employe.objects.create(
+            matricule="J001", nom="Morel", prenom="Hugo", email="hugo.morel@example.com",
+            date_embauche=date(2024, 1, 2), poste=Poste.objects.create(titre="Juriste", departement=autre),
+            salaire=3100,
+        )
+        # Génération PDF hors sujet ici : fichier_pdf déjà renseigné
+        for employe, mois in ((self.employe, 1), (self.employe, 2), (juriste, 1)):
+            FichePaie.objects.create(
+                employe=employe, mois=mois, annee=2025, salaire_base=employe.salaire, fichier_pdf='x.pdf'
+            )
+        self.rh = self.scope(role='RH', employe_id=self.employe.pk, departement_id=dept.pk)
+        self.manager = self.scope(role='MANAGER', employe_id=juriste.pk, departement_id=autre.pk)
+
+    def scope(self, **kwargs):
+        return AccessScope(is_authenticated=True, **kwargs)
+
+    def export(self, scope, format, modele='fiches-paie', **kwargs):
+        out = BytesIO()
+        write_export(out, modele, scope, format=format, **kwargs)
+        return out.getvalue()
+
+    def test_csv_field_selection_and_scope(self):
+        contenu = self.export(self.rh, 'csv', fields=['employe__matricule', 'net_a_payer'])
+        self.assertEqual(
+            contenu.decode().splitlines(),
+            ['employe__matricule,net_a_payer', 'P001,2500.00', 'P001,2500.00', 'J001,3100.00'],
+        )
+        contenu = self.export(self.manager, 'csv', modele='employes', fields=['matricule'])
+        self.assertEqual(contenu.decode().splitlines(), ['matricule', 'J001'])
+
+    def test_payroll_and_recruitment_exports_are_rh_only(self):
+        for modele in ('fiches-paie', 'primes', 'candidatures'):
+            with self.assertRaises(PermissionDenied):
+                self.export(self.manager, 'csv', modele=modele)
+        # Salaire : absent des colonnes par défaut hors RH, refusé s'il est demandé
+        entete = self.export(self.manager, 'csv', modele='employes').decode().splitlines()[0]
+        self.assertNotIn('salaire', entete)
+        self.assertIn('salaire', self.export(self.rh, 'csv', modele='employes').decode().splitlines()[0])
+        with self.assertRaises(PermissionDenied):
+            self.export(self.manager, 'csv', modele='employes', fields=['matricule', 'salaire'])
+        User.objects.create_user(username='juriste', password='password')
+        Employe.objects.filter(matricule="J001").update(user=User.objects.get(username='juriste'), role='MANAGER')
+        self.client.login(username='juriste', password='password')
+        response = self.client.get(reverse('employees:export_data', args=['fiches-paie']))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('employees:export_employees_csv'))
+        lignes = b''.join(response.streaming_content).decode().splitlines()
+        self.assertNotIn('Salaire', lignes[0])
+        self.assertNotIn('3100', lignes[1])
+
+    def test_jsonl_date_range(self):
+        FichePaie.objects.filter(mois=2).update(date_paiement=date(2025, 2, 28))
+        FichePaie.objects.exclude(mois=2).update(date_paiement=date(2025, 1, 31))
+        lignes = self.export(self.rh, 'jsonl', du=date(2025, 2, 1), au=date(2025, 2, 28)).decode().splitlines()
+        self.assertEqual([json.loads(l)['mois'] for l in lignes], [2])
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ExportError):
+            self.export(self.rh, 'csv', fields=['employe__user__password'])
+        with self.assertRaises(ExportError):
+            self.export(self.rh, 'csv', fields=['nope'])
+
+    @skipUnless(find_spec('pyarrow'), "pyarrow non installé")
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet as pq
+        table = pq.read_table(BytesIO(self.export(self.rh, 'parquet')))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(str(table.schema.field('net_a_payer').type), 'decimal128(10, 2)')
+
+    @skipUnless(find_spec('openpyxl'), "openpyxl non installé")
+    def test_xlsx_view(self):
+        User.objects.create_user(username='admin', password='password', is_superuser=True)
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('employees:export_data', args=['fiches-paie']), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+        response = self.client.get(reverse('employees:export_data', args=['fiches-paie']), {'du': 'hier'})
+        self.assertEqual(response.status_code, 400)
+
+@override_settings(PAIE_TAUX_DEDUCTIONS='0.10', PAIE_PDF_WORKERS=1)
+class CyclePaieTests(MediaTestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Production", code="PRO")
+        autre = Departement.objects.create(nom="Direction", code="DIR")
+        poste = Poste.objects.create(titre="Opérateur", departement=self.dept)
+        self.operateurs = [
+            Employe.objects.create(
+                nom=f"Opérateur{i}", prenom="Test", email=f"op{i}@example.com",
+                date_embauche=date(2024, 1, 1), poste=poste, salaire=2000 + i,
+            )
+            for i in range(3)
+        ]
+        Employe.objects.create(
+            nom="Directeur", prenom="Test", email="dir@example.com", date_embauche=date(2024, 1, 1),
+            poste=Poste.objects.create(titre="Directeur", departement=autre), salaire=5000,
+        )
+
+    def test_cycle_computes_slips_with_primes_and_deductions(self):
+        Prime.objects.create(employe=self.operateurs[0], montant=300, motif="Objectifs", date=date(2025, 3, 15))
+        Prime.objects.create(employe=self.operateurs[0], montant=999, motif="Hors période", date=date(2025, 4, 1))
+
+        cycle = executer_cycle(CyclePaie.objects.create(mois=3, annee=2025, departement=self.dept))
+
+        self.assertEqual((cycle.statut, cycle.total, cycle.fiches_creees, cycle.pdf_generes), ('TERMINE', 3, 3, 3))
+        fiche = FichePaie.objects.get(employe=self.operateurs[0])
+        self.assertEqual((fiche.primes, fiche.deductions, fiche.net_a_payer), (300, 230, 2070))
+        self.assertTrue(fiche.fichier_pdf.read().startswith(b'%PDF'))
+
+    def test_cycle_pays_overtime_from_department_schedule(self):
+        # 6 h / jour : base de 130 h par mois, soit 20 € de l'heure pour 2 600 €
+        HoraireTravail.objects.create(
+            nom="Atelier", departement=self.dept, heures_par_jour=6, pause_minutes=30, majoration=Decimal('1.50')
+        )
+        operateur = self.operateurs[0]
+        Employe.objects.filter(pk=operateur.pk).update(salaire=2600)
+        for jour, depart in ((3, '15:10'), (4, '16:00'), (5, None)):
+            Presence.objects.create(employe=operateur, date=date(2025, 3, jour), heure_arrivee='08:00', heure_depart=depart)
+
+        executer_cycle(CyclePaie.objects.create(mois=3, annee=2025, departement=self.dept))
+
+        presences = Presence.objects.filter(employe=operateur).order_by('date')
+        self.assertEqual(
+            [(p.heures_travaillees, p.heures_sup) for p in presences],
+            [(Decimal('6.67'), Decimal('0.50')), (Decimal('7.50'), Decimal('1.50')), (None, 0)],
+        )
+        # 2 h sup. à 20 € majorées de 50 %
+        self.assertEqual(FichePaie.objects.get(employe=operateur).primes, Decimal('60.00'))
+
+    def test_cycle_resumes_without_duplicates(self):
+        # Cycle interrompu : une fiche déjà créée, sans PDF
+        cycle = CyclePaie.objects.create(mois=3, annee=2025)
+        FichePaie.objects.bulk_create([FichePaie(
+            employe=self.operateurs[0], mois=3, annee=2025, salaire_base=2000, net_a_payer=2000, cycle=cycle,
+        )])
+
+        executer_cycle(cycle)
+        executer_cycle(cycle)
+
+        self.assertEqual(FichePaie.objects.filter(mois=3, annee=2025).count(), 4)
+        self.assertFalse(FichePaie.objects.filter(fichier_pdf='').exists())
+        cycle.refresh_from_db()
+        self.assertEqual((cycle.total, cycle.fiches_creees, cycle.pdf_generes), (4, 4, 4))
+
+    def test_view_only_queues_the_cycle(self):
+        User.objects.create_user(username='paie', password='password', is_superuser=True)
+        self.client.login(username='paie', password='password')
+        response = self.client.post(reverse('employees:paie_cycle_list'), {'mois': 3, 'annee': 2025, 'departement': self.dept.pk})
+        self.assertRedirects(response, reverse('employees:paie_cycle_list'))
+        cycle = CyclePaie.objects.get()
+        self.assertTrue(cycle.en_file)
+        self.assertEqual(cycle.statut, 'CALCUL')
+        self.assertFalse(FichePaie.objects.exists())
+
+        call_command('run_payroll', file=True, stdout=StringIO())
+        cycle.refresh_from_db()
+        self.assertFalse(cycle.en_file)
+        self.assertEqual((cycle.statut, cycle.fiches_creees, cycle.pdf_generes), ('TERMINE', 3, 3))
+
+    def test_one_slip_per_employee_and_period(self):
+        fiche = FichePaie(employe=self.operateurs[0], mois=3, annee=2025, salaire_base=2000, net_a_payer=2000)
+        FichePaie.objects.bulk_create([fiche])
+        fiche.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FichePaie.objects.bulk_create([fiche])
+
+@override_settings(PAIE_PDF_WORKERS=1)
+class PayslipPdfQueueTests(MediaTestCase):
+    def setUp(self):
+        self.employe = Employe.objects.create(
+            nom="Lemoine", prenom="Eva", email="eva.lemoine@example.com", date_embauche=date(2024, 1, 1), salaire=2100
+        )
+
+    def creer_fiche(self):
+        return FichePaie.objects.create(employe=self.employe, mois=6, annee=2025, salaire_base=2100)
+
+    def test_sync_mode_renders_in_a_single_write(self):
+        with override_settings(PAIE_PDF_MODE='sync'), CaptureQueriesContext(connection) as requetes:
+            fiche = self.creer_fiche()
+        ecritures = [q['sql'] for q in requetes if '"employees_fichepaie"' in q['sql'].split(' WHERE ')[0]]
+        self.assertEqual(len(ecritures), 1)
+        self.assertEqual(fiche.statut_pdf, 'GENERE')
+        self.assertTrue(fiche.fichier_pdf.name.endswith('.pdf'))
+
+    def test_async_mode_enqueues_and_worker_renders(self):
+        with override_settings(PAIE_PDF_MODE='async'):
+            fiche = self.creer_fiche()
+        self.assertEqual(fiche.statut_pdf, 'EN_ATTENTE')
+        self.assertFalse(fiche.fichier_pdf)
+
+        call_command('render_payslips', once=True, stdout=StringIO())
+        fiche.refresh_from_db()
+        self.assertEqual(fiche.statut_pdf, 'GENERE')
+        self.assertTrue(fiche.fichier_pdf.read().startswith(b'%PDF'))
+
+    def test_render_failure_is_recorded_per_slip(self):
+        with override_settings(PAIE_PDF_MODE='async'):
+            fiche = self.creer_fiche()
+        with mock.patch('employees.paie.render_fiche_paie', side_effect=RuntimeError("reportlab absent")):
+            self.assertEqual(traiter_file_pdf(), (1, 0))
+        fiche.refresh_from_db()
+        self.assertEqual(fiche.statut_pdf, 'ECHEC')
+        self.assertIn("reportlab absent", fiche.erreur_pdf)
+
+class PayslipRendererTests(TestCase):
+    def donnees(self, i):
+        return {
+            'employe': f"Employé {i}", 'mois': 4, 'annee': 2025, 'date_paiement': date(2025, 4, 30),
+            'salaire_base': 2000, 'primes': 0, 'deductions': 0, 'net_a_payer': 2000,
+        }
+
+    def test_grouped_document_has_one_page_per_slip(self):
+        avant = render_timings()
+        contenu = render_fiches_paie([self.donnees(i) for i in range(5)])
+        self.assertTrue(contenu.startswith(b'%PDF'))
+        self.assertEqual(contenu.count(b'/Type /Page\n'), 5)
+        apres = render_timings()
+        self.assertEqual((apres['documents'] - avant['documents'], apres['fiches'] - avant['fiches']), (1, 5))
+        self.assertGreater(apres['ms_par_fiche'], 0)
+
+    def test_ascii85_setting_is_scoped_to_the_render(self):
+        rl_config = PayslipTemplate().rl_config
+        avant = rl_config.useA85
+        self.assertNotIn(b'ASCII85Decode', render_fiche_paie(self.donnees(1)))
+        self.assertIn(b'ASCII85Decode', PayslipTemplate(ascii85=True).render([self.donnees(1)], "Fiche de paie"))
+        self.assertEqual(rl_config.useA85, avant)
+
+    def test_concurrent_renders_keep_their_own_encoding(self):
+        rl_config = PayslipTemplate().rl_config
+        avant = rl_config.useA85
+        gabarits = {True: PayslipTemplate(ascii85=True), False: PayslipTemplate()}
+        resultats = {True: [], False: []}
+
+        def rendre(ascii85):
+            for i in range(20):
+                contenu = gabarits[ascii85].render([self.donnees(i)], "Fiche de paie", reutiliser_gabarit=False)
+                resultats[ascii85].append(b'ASCII85Decode' in contenu)
+
+        threads = [threading.Thread(target=rendre, args=(ascii85,)) for ascii85 in (True, False)]
+        # Bascule de thread très fréquente : les deux rendus s'entrelacent à coup sûr
+        intervalle = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(intervalle)
+        self.assertEqual(resultats, {True: [True] * 20, False: [False] * 20})
+        self.assertEqual(rl_config.useA85, avant)
+
+    def test_departement_pdf_view(self):
+        dept = Departement.objects.create(nom="Compta", code="CPT")
+        poste = Poste.objects.create(titre="Comptable", departement=dept)
+        with override_settings(PAIE_PDF_MODE='async'):
+            for i in range(3):
+                employe = Employe.objects.create(
+                    nom=f"Compta{i}", prenom="X", email=f"c{i}@example.com",
+                    date_embauche=date(2024, 1, 1), poste=poste, salaire=1800,
+                )
+                FichePaie.objects.create(employe=employe, mois=4, annee=2025, salaire_base=1800)
+        User.objects.create_user(username='admin', password='password', is_superuser=True)
+        self.client.login(username='admin', password='password')
+        response = self.client.get(reverse('employees:paie_departement_pdf'), {'mois': 4, 'annee': 2025, 'departement': dept.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b'/Type /Page\n'), 3)
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def setUp(self):
+        self.employe = Employe.objects.create(
+            nom="Arnaud", prenom="Zoé", email="zoe.arnaud@example.com", date_embauche=date(2024, 1, 1), salaire=2000
+        )
+
+    def document(self, contenu, titre="Pièce"):
+        document = DocumentRH(employe=self.employe, titre=titre, type_doc='AUTRE')
+        document.fichier.save('piece.pdf', ContentFile(contenu), save=False)
+        document.save()
+        return document
+
+    def test_identical_uploads_share_one_blob(self):
+        a = self.document(b'%PDF-identique')
+        b = self.document(b'%PDF-identique')
+        c = self.document(b'%PDF-autre')
+        self.assertEqual(a.fichier.name, b.fichier.name)
+        self.assertTrue(a.fichier.name.startswith('cas/'))
+        self.assertNotEqual(a.fichier.name, c.fichier.name)
+        self.assertEqual(FichierStocke.objects.get(nom=a.fichier.name).references, 2)
+
+        b.delete()
+        self.assertEqual(FichierStocke.objects.get(nom=a.fichier.name).references, 1)
+        self.assertTrue(a.fichier.storage.exists(a.fichier.name))
+
+    def test_regenerated_payslip_is_deduplicated(self):
+        with override_settings(PAIE_PDF_MODE='sync'):
+            fiche = FichePaie.objects.create(employe=self.employe, mois=1, annee=2025, salaire_base=2000)
+        nom = fiche.fichier_pdf.name
+        fiche.generate_pdf()
+        self.assertEqual(fiche.fichier_pdf.name, nom)
+        self.assertEqual(FichierStocke.objects.filter(nom=nom).count(), 1)
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        garde = self.document(b'garde')
+        jete = self.document(b'jete')
+        nom_jete = jete.fichier.name
+        jete.delete()
+        # Compteur faussé volontairement : le marquage doit le corriger
+        FichierStocke.objects.filter(nom=garde.fichier.name).update(references=0)
+
+        call_command('gc_media', grace=0, stdout=StringIO())
+
+        self.assertFalse(garde.fichier.storage.exists(nom_jete))
+        self.assertFalse(FichierStocke.objects.filter(nom=nom_jete).exists())
+        self.assertTrue(garde.fichier.storage.exists(garde.fichier.name))
+        self.assertEqual(FichierStocke.objects.get(nom=garde.fichier.name).references, 1)
+
+    def test_reused_orphan_survives_gc(self):
+        ancien = self.document(b'%PDF-ancien')
+        nom = ancien.fichier.name
+        ancien.delete()
+        il_y_a_deux_jours = timezone.now() - timedelta(days=2)
+        FichierStocke.objects.filter(nom=nom).update(date_creation=il_y_a_deux_jours, dernier_usage=il_y_a_deux_jours)
+
+        # Même contenu renvoyé : le fichier est écrit, la ligne qui le référence pas encore
+        storage = DocumentRH._meta.get_field('fichier').storage
+        self.assertEqual(storage.save('piece.pdf', ContentFile(b'%PDF-ancien')), nom)
+        call_command('gc_media', grace=24, stdout=StringIO())
+
+        self.assertTrue(storage.exists(nom))
+        self.assertGreater(FichierStocke.objects.get(nom=nom).dernier_usage, il_y_a_deux_jours)
+
+
+    def test_gc_removes_blobs_left_by_a_rolled_back_transaction(self):
+        storage = DocumentRH._meta.get_field('fichier').storage
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ancien = storage.save('piece.pdf', ContentFile(b'%PDF-annule'))
+            recent = storage.save('piece.pdf', ContentFile(b'%PDF-annule-recent'))
+            raise RuntimeError("enregistrement annulé")
+        self.assertFalse(FichierStocke.objects.filter(nom__in=[ancien, recent]).exists())
+        il_y_a_deux_jours = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(storage.path(ancien), (il_y_a_deux_jours, il_y_a_deux_jours))
+        garde = self.document(b'garde')
+        os.utime(storage.path(garde.fichier.name), (il_y_a_deux_jours, il_y_a_deux_jours))
+
+        call_command('gc_media', grace=24, stdout=StringIO())
+
+        self.assertFalse(storage.exists(ancien))
+        # Trop récent : peut-être une transaction encore en cours
+        self.assertTrue(storage.exists(recent))
+        self.assertTrue(storage.exists(garde.fichier.name))
+
+
+class FileDownloadTests(MediaTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='salarie', password='password')
+        employe = Employe.objects.create(
+            user=self.user, nom="Roux", prenom="Inès", email="ines.roux@example.com",
+            date_embauche=date(2024, 1, 1), salaire=2000,
+        )
+        collegue = Employe.objects.create(
+            nom="Blanc", prenom="Marc", email="marc.blanc@example.com", date_embauche=date(2024, 1, 1), salaire=2000
+        )
+        self.contenu = bytes(range(256)) * 40
+        self.documents = []
+        for proprietaire in (employe, collegue):
+            document = DocumentRH(employe=proprietaire, titre="Attestation employeur", type_doc='AUTRE')
+            document.fichier.save('attestation.pdf', ContentFile(self.contenu), save=False)
+            document.save()
+            self.documents.append(document)
+        self.url = reverse('employees:telecharger_fichier', args=['document', self.documents[0].pk])
+        self.client.login(username='salarie', password='password')
+
+    def test_download_is_scoped_and_streamed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.contenu)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attestation_employeur_roux.pdf', response['Content-Disposition'])
+        self.assertIn('private', response['Cache-Control'])
+
+        autre = reverse('employees:telecharger_fichier', args=['document', self.documents[1].pk])
+        self.assertEqual(self.client.get(autre).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_payslips_and_cvs_are_not_open_to_managers(self):
+        dept = Departement.objects.create(nom="Vente", code="VTE")
+        poste = Poste.objects.create(titre="Vendeur", departement=dept)
+        User.objects.create_user(username='chef-vente', password='password')
+        Employe.objects.create(
+            user=User.objects.get(username='chef-vente'), role='MANAGER', nom="Robin", prenom="Eli",
+            email="eli.robin@example.com", date_embauche=date(2020, 1, 1), poste=poste, salaire=3500,
+        )
+        Employe.objects.filter(user=self.user).update(poste=poste, departement=dept)
+        fiche = FichePaie(employe=Employe.objects.get(user=self.user), mois=1, annee=2025, salaire_base=2000)
+        fiche.fichier_pdf.save('fiche.pdf', ContentFile(b'%PDF-fiche'), save=False)
+        fiche.save()
+        offre = OffreEmploi.objects.create(titre="Vendeur", description="...", departement=dept)
+        candidature = Candidature(offre=offre, nom="Rey", prenom="Lou", email="lou.rey@example.com")
+        candidature.cv.save('cv.pdf', ContentFile(b'%PDF-cv'), save=False)
+        candidature.save()
+        url_fiche = reverse('employees:telecharger_fichier', args=['fiche-paie', fiche.pk])
+        url_cv = reverse('employees:telecharger_fichier', args=['cv', candidature.pk])
+
+        # Le salarié récupère sa propre fiche, pas les CV
+        self.assertEqual(self.client.get(url_fiche).status_code, 200)
+        self.assertEqual(self.client.get(url_cv).status_code, 404)
+        # Le chef du département : ni la fiche de son équipe ni le CV de son offre
+        self.client.login(username='chef-vente', password='password')
+        self.assertEqual(self.client.get(url_fiche).status_code, 404)
+        self.assertEqual(self.client.get(url_cv).status_code, 404)
+
+    def test_range_and_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertIn(self.documents[0].fichier.name.rsplit('/', 1)[1].split('.')[0], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.contenu)}')
+        self.assertEqual(b''.join(response.streaming_content), self.contenu[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.contenu[-10:])
+        # Fichier modifié depuis (If-Range ne correspond plus) : tout le contenu
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"autre"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.contenu)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_offload_to_web_server(self):
+        with override_settings(DOWNLOAD_OFFLOAD='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.documents[0].fichier.name)
+
+
+class FileLinkPagesTests(MediaTestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Paie", code="PAI")
+        poste = Poste.objects.create(titre="Gestionnaire", departement=dept)
+        self.user = User.objects.create_user(username='gestion', password='password')
+        self.employe = Employe.objects.create(
+            user=self.user, role='RH', nom="Lambert", prenom="Jade", email="jade.lambert@example.com",
+            date_embauche=date(2022, 1, 1), poste=poste, salaire=3100,
+        )
+        self.formation = Formation.objects.create(
+            titre="Paie avancée", description="...", departement=dept, date_debut=date(2025, 3, 3), date_fin=date(2025, 3, 4),
+        )
+        self.offre = OffreEmploi.objects.create(titre="Comptable", description="...", departement=dept)
+        self.fichiers = {}
+        for type_fichier, objet, champ in (
+            ('attestation', InscriptionFormation(employe=self.employe, formation=self.formation), 'attestation'),
+            ('document', DocumentRH(employe=self.employe, titre="Diplôme", type_doc='AUTRE'), 'fichier'),
+            ('fiche-paie', FichePaie(employe=self.employe, mois=2, annee=2025, salaire_base=3100), 'fichier_pdf'),
+            ('cv', Candidature(offre=self.offre, nom="Petit", prenom="Tom", email="tom.petit@example.com"), 'cv'),
+        ):
+            getattr(objet, champ).save(f'{type_fichier}.pdf', ContentFile(f'%PDF-{type_fichier}'.encode()), save=False)
+            objet.save()
+            self.fichiers[type_fichier] = reverse('employees:telecharger_fichier', args=[type_fichier, objet.pk])
+        self.client.login(username='gestion', password='password')
+
+    def test_pages_render_download_links(self):
+        pages = [
+            (reverse('employees:paie_list'), ['fiche-paie']),
+            (reverse('employees:employee_detail', args=[self.employe.pk]), ['attestation', 'document']),
+            (reverse('employees:formation_detail', args=[self.formation.pk]), ['attestation']),
+            (reverse('employees:recrutement_detail', args=[self.offre.pk]), ['cv']),
+        ]
+        for url, types in pages:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            for type_fichier in types:
+                self.assertContains(response, self.fichiers[type_fichier])
+
+
+class BulkPresenceTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Entrepôt", code="ENT")
+        autre = Departement.objects.create(nom="Siège", code="SIE")
+        poste = Poste.objects.create(titre="Cariste", departement=dept)
+        self.user = User.objects.create_user(username='chef', password='password')
+        Employe.objects.create(
+            user=self.user, nom="Lemoine", prenom="Paul", email="paul.lemoine@example.com",
+            date_embauche=date.today(), poste=poste, salaire=2600, role='MANAGER'
+        )
+        self.equipe = [
+            Employe.objects.create(
+                nom=f"Cariste{i}", prenom="X", email=f"cariste{i}@example.com",
+                date_embauche=date.today(), poste=poste, salaire=2000
+            ).pk
+            for i in range(30)
+        ]
+        self.externe = Employe.objects.create(
+            nom="Dumas", prenom="Eva", email="eva.dumas@example.com", date_embauche=date.today(),
+            poste=Poste.objects.create(titre="Comptable", departement=autre), salaire=2400
+        )
+        self.client.login(username='chef', password='password')
+
+    def saisir(self, ids):
+        return self.client.post(reverse('employees:presence_create'), {
+            'date': '2025-03-10', 'heure_arrivee': '08:30', 'heure_depart': '17:00', 'employees': ids,
+        }, follow=True)
+
+    def test_bulk_entry_uses_constant_queries_and_skips_existing(self):
+        scope = self.client.get(reverse('employees:presence_list')).wsgi_request.access_scope
+        with CaptureQueriesContext(connection) as requetes:
+            bilan = saisir_presences(scope, self.equipe[:10], date(2025, 3, 10), '08:30')
+        self.assertEqual(bilan.inseres, 10)
+        self.assertLessEqual(len(requetes), 5)
+
+        response = self.saisir(self.equipe + [self.externe.pk, 'x'])
+        self.assertContains(response, "20 ajoutée(s), 10 déjà saisie(s)")
+        self.assertContains(response, "2 employé(s) hors de votre périmètre")
+        self.assertEqual(Presence.objects.filter(date=date(2025, 3, 10)).count(), 30)
+        self.assertFalse(Presence.objects.filter(employe=self.externe).exists())
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.post(reverse('employees:presence_create'), {'date': '2025-02-30', 'employees': self.equipe})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Presence.objects.exists())
+
+
+@override_settings(POINTAGE_TOKEN='terminal-secret', POINTAGE_ANTI_REBOND=120)
+class PunchApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ouvrier', password='password')
+        self.employe = Employe.objects.create(
+            user=self.user, matricule="B042", nom="Fabre", prenom="Noé", email="noe.fabre@example.com",
+            date_embauche=date.today(), salaire=2000,
+        )
+
+    def badger(self, corps, token='terminal-secret'):
+        return self.client.post(
+            reverse('employees:pointage_api'), json.dumps(corps), content_type='application/json',
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+    def test_single_round_trip_upsert_ignores_double_punch(self):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.badger({'matricule': 'B042', 'horodatage': '2025-03-10T08:01:00'})
+        self.assertEqual(len(requetes), 1)
+        self.assertEqual(response.json()['pointages'][0]['heure_arrivee'], '08:01:00')
+
+        # Double passage au portique : toujours une seule présence, sans départ
+        journee = self.badger({'matricule': 'B042', 'horodatage': '2025-03-10T08:01:40'}).json()['pointages'][0]
+        self.assertIsNone(journee['heure_depart'])
+        journee = self.badger({'matricule': 'B042', 'horodatage': '2025-03-10T17:05:00'}).json()['pointages'][0]
+        self.assertEqual((journee['heure_arrivee'], journee['heure_depart']), ('08:01:00', '17:05:00'))
+        self.assertEqual(Presence.objects.count(), 1)
+
+    def test_offline_batch_is_merged_and_reports_rejects(self):
+        response = self.badger({'pointages': [
+            {'matricule': 'B042', 'horodatage': '2025-03-11T17:30:00'},
+            {'matricule': 'INCONNU', 'horodatage': '2025-03-11T08:00:00'},
+            {'matricule': 'B042', 'horodatage': '2025-03-11T07:58:00'},
+            {'matricule': 'B042', 'horodatage': 'hier'},
+        ]})
+        self.assertEqual([r['index'] for r in response.json()['rejetes']], [3, 1])
+        presence = Presence.objects.get(employe=self.employe, date=date(2025, 3, 11))
+        self.assertEqual((presence.heure_arrivee.isoformat(), presence.heure_depart.isoformat()), ('07:58:00', '17:30:00'))
+
+        # Rejeu du même lot (accusé de réception perdu) : aucun changement
+        self.badger({'pointages': [{'matricule': 'B042', 'horodatage': '2025-03-11T07:58:00'}]})
+        presence.refresh_from_db()
+        self.assertEqual(presence.heure_depart.isoformat(), '17:30:00')
+
+    def test_requires_terminal_token(self):
+        self.assertEqual(self.badger({'matricule': 'B042', 'horodatage': '2025-03-10T08:00:00'}, token='x').status_code, 403)
+
+    def test_web_check_in_twice_keeps_one_row(self):
+        self.client.login(username='ouvrier', password='password')
+        self.client.get(reverse('employees:presence_check'))
+        self.client.get(reverse('employees:presence_check'))
+        self.assertEqual(Presence.objects.filter(employe=self.employe).count(), 1)
+
+
+@override_settings(POINTAGE_TOKEN='terminal-secret', POINTAGE_ANTI_REBOND=120)
+class PunchLogImportTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Employe.objects.create(
+                matricule=f"T{i}", nom=f"Tech{i}", prenom="X", email=f"tech{i}@example.com",
+                date_embauche=date.today(), salaire=2000,
+            )
+
+    def test_csv_upload_pairs_and_reports_rejects(self):
+        journal = (
+            "matricule;horodatage\n"
+            "T0;2025-03-10T17:02:00\n"
+            "T0;2025-03-10T08:00:00\n"
+            "T0;2025-03-10T08:00:30\n"
+            "T1;2025-03-10T08:10:00\n"
+            "X9;2025-03-10T08:11:00\n"
+            "T2;pas une date\n"
+        )
+        response = self.client.post(
+            reverse('employees:pointage_import'), journal, content_type='text/csv',
+            HTTP_AUTHORIZATION="Bearer terminal-secret",
+        )
+        bilan = response.json()
+        self.assertEqual((bilan['lignes'], bilan['journees'], bilan['rejets']), (6, 2, 2))
+        self.assertEqual(sorted(r['ligne'] for r in bilan['detail_rejets']), [6, 7])
+        t0 = Presence.objects.get(employe__matricule='T0')
+        self.assertEqual((t0.heure_arrivee.isoformat(), t0.heure_depart.isoformat()), ('08:00:00', '17:02:00'))
+        self.assertIsNone(Presence.objects.get(employe__matricule='T1').heure_depart)
+
+    def test_command_streams_jsonl_in_small_batches(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as journal:
+            for jour in (10, 11):
+                for heure in ('07:59', '12:00', '16:30', '16:30'):
+                    for i in range(3):
+                        journal.write(json.dumps({'matricule': f"T{i}", 'horodatage': f"2025-03-{jour}T{heure}:00"}) + "\n")
+        self.addCleanup(os.remove, journal.name)
+        # Lots de 2 journées : une même journée est écrite en plusieurs fois
+        call_command('import_pointages', journal.name, batch=2, stdout=StringIO())
+        self.assertEqual(Presence.objects.count(), 6)
+        self.assertEqual(
+            set(Presence.objects.values_list('heure_arrivee', 'heure_depart')),
+            {(time(7, 59), time(16, 30))},
+        )
+
+
+class LeaveBalanceTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Ventes", code="VEN")
+        poste = Poste.objects.create(titre="Commercial", departement=dept)
+        User.objects.create_user(username='rh', password='password')
+        Employe.objects.create(
+            user=User.objects.get(username='rh'), role='RH', nom="Henry", prenom="Lise", email="lise.henry@example.com",
+            date_embauche=date(2020, 1, 1), poste=poste, salaire=3500,
+        )
+        self.employe = Employe.objects.create(
+            nom="Perrin", prenom="Marc", email="marc.perrin@example.com",
+            date_embauche=date(2025, 2, 10), poste=poste, salaire=2500,
+        )
+        self.client.login(username='rh', password='password')
+
+    def test_approval_and_rejection_update_ledger_once(self):
+        # Du lundi 29/12/2025 au vendredi 02/01/2026 : 3 jours ouvrés en 2025, 2 en 2026
+        conge = Conge.objects.create(
+            employe=self.employe, type_conge='ANNUEL', date_debut=date(2025, 12, 29), date_fin=date(2026, 1, 2)
+        )
+        approuver = reverse('employees:conge_approve', args=[conge.pk])
+        self.client.get(approuver)
+        self.client.get(approuver)
+        self.assertEqual(solde(self.employe.pk, annee=2025).pris, 3)
+        self.assertEqual(solde(self.employe.pk, annee=2026).pris, 2)
+
+        self.client.get(reverse('employees:conge_reject', args=[conge.pk]))
+        self.assertEqual(solde(self.employe.pk, annee=2025).pris, 0)
+        conge.refresh_from_db()
+        self.assertEqual(conge.statut, 'REJETE')
+
+    def test_status_change_invalidates_dashboard_cache(self):
+        cache.clear()
+        conge = Conge.objects.create(
+            employe=self.employe, type_conge='ANNUEL', date_debut=date(2025, 6, 2), date_fin=date(2025, 6, 3)
+        )
+        self.assertEqual(get_dashboard_stats(DashboardScope(GLOBAL)).total_pending_conges, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            changer_statut(conge, 'APPROUVE')
+        self.assertEqual(get_dashboard_stats(DashboardScope(GLOBAL)).total_pending_conges, 0)
+
+    def test_monthly_accrual_is_idempotent_and_verifiable(self):
+        for mois in (1, 2, 3, 3):
+            acquerir_mois(2025, mois)
+        # Embauché en février : janvier n'est pas acquis
+        compteur = solde(self.employe.pk, annee=2025)
+        self.assertEqual((compteur.acquis, compteur.mois_acquis), (Decimal('4.16'), 3))
+        call_command('leave_balances', annee=2025, stdout=StringIO())
+
+        SoldeConge.objects.filter(pk=compteur.pk).update(pris=7)
+        with self.assertRaises(CommandError):
+            call_command('leave_balances', annee=2025, stdout=StringIO())
+        call_command('leave_balances', annee=2025, corriger=True, stdout=StringIO())
+        self.assertEqual(solde(self.employe.pk, annee=2025).pris, 0)
+
+    def test_skipped_months_are_credited_by_a_later_run(self):
+        acquerir_mois(2025, 2)
+        # Mars et avril oubliés : mai les rattrape (février à mai, embauché en février)
+        acquerir_mois(2025, 5)
+        compteur = solde(self.employe.pk, annee=2025)
+        self.assertEqual((compteur.acquis, compteur.mois_acquis), (Decimal('8.32'), 5))
+        # Compteur conforme à l'historique recalculé
+        call_command('leave_balances', annee=2025, stdout=StringIO())
+
+
+class LeaveCalendarTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Support", code="SUP", absents_max=1)
+        poste = Poste.objects.create(titre="Technicien", departement=self.dept)
+        self.user = User.objects.create_user(username='tech', password='password')
+        self.employe = Employe.objects.create(
+            user=self.user, nom="Giraud", prenom="Léo", email="leo.giraud@example.com",
+            date_embauche=date(2024, 1, 1), poste=poste, salaire=2300,
+        )
+        self.collegue = Employe.objects.create(
+            nom="Renaud", prenom="Ana", email="ana.renaud@example.com",
+            date_embauche=date(2024, 1, 1), poste=poste, salaire=2300,
+        )
+        self.chef = Employe.objects.create(
+            nom="Barre", prenom="Inès", email="ines.barre@example.com", role='MANAGER',
+            date_embauche=date(2020, 1, 1), poste=poste, salaire=3800,
+        )
+        self.client.login(username='tech', password='password')
+
+    def demander(self, debut, fin):
+        return self.client.post(reverse('employees:conge_request'), {
+            'type_conge': 'ANNUEL', 'date_debut': debut, 'date_fin': fin, 'motif': "Vacances",
+            'validateur': self.chef.pk, 'employe': self.employe.pk,
+        })
+
+    def test_overlapping_request_is_refused(self):
+        Conge.objects.create(employe=self.employe, type_conge='ANNUEL', date_debut=date(2025, 7, 1), date_fin=date(2025, 7, 10))
+        response = self.demander('2025-07-10', '2025-07-15')
+        self.assertContains(response, "chevauche une autre demande")
+        self.assertEqual(Conge.objects.filter(employe=self.employe).count(), 1)
+        self.demander('2025-07-11', '2025-07-15')
+        self.assertEqual(Conge.objects.filter(employe=self.employe).count(), 2)
+
+    def test_departement_capacity(self):
+        Conge.objects.create(
+            employe=self.collegue, type_conge='ANNUEL', statut='APPROUVE',
+            date_debut=date(2025, 8, 4), date_fin=date(2025, 8, 8),
+        )
+        self.assertEqual([c.employe for c in absents(self.dept.pk, date(2025, 8, 1), date(2025, 8, 31))], [self.collegue])
+        erreurs = verifier_demande(self.employe.pk, self.dept.pk, date(2025, 8, 8), date(2025, 8, 12))
+        self.assertIn("Effectif insuffisant le 08/08/2025", erreurs[0])
+        self.assertEqual(verifier_demande(self.employe.pk, self.dept.pk, date(2025, 8, 9), date(2025, 8, 12)), [])
+
+        periodes = [(date(2025, 1, 1), date(2025, 1, 5)), (date(2025, 1, 5), date(2025, 1, 6)), (date(2025, 1, 6), date(2025, 1, 9))]
+        self.assertEqual(pic_absences(periodes, date(2025, 1, 1), date(2025, 1, 31)), (2, date(2025, 1, 5)))
+
+class BulkLeaveDecisionTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Logistique", code="LOG", absents_max=2)
+        poste = Poste.objects.create(titre="Cariste", departement=self.dept)
+        autre = Poste.objects.create(titre="Acheteur", departement=Departement.objects.create(nom="Achats", code="ACH"))
+        self.user = User.objects.create_user(username='chef', password='password')
+        self.chef = Employe.objects.create(
+            user=self.user, role='MANAGER', nom="Roux", prenom="Paul", email="paul.roux@example.com",
+            date_embauche=date(2020, 1, 1), poste=poste, salaire=3800,
+        )
+        self.equipe = [
+            Employe.objects.create(
+                nom=nom, prenom="Sam", email=f"{nom.lower()}@example.com",
+                date_embauche=date(2024, 1, 1), poste=poste, salaire=2200,
+            )
+            for nom in ("Vidal", "Masson", "Brun")
+        ]
+        self.externe = Employe.objects.create(
+            nom="Colin", prenom="Eva", email="eva.colin@example.com",
+            date_embauche=date(2024, 1, 1), poste=autre, salaire=2400,
+        )
+        self.client.login(username='chef', password='password')
+
+    def demande(self, employe, debut, fin):
+        return Conge.objects.create(employe=employe, type_conge='ANNUEL', date_debut=debut, date_fin=fin)
+
+    def test_bulk_approval_checks_scope_and_capacity(self):
+        conges = [self.demande(e, date(2025, 9, 1), date(2025, 9, 5)) for e in self.equipe]
+        hors_perimetre = self.demande(self.externe, date(2025, 9, 1), date(2025, 9, 5))
+        collegue_chef = self.demande(self.chef, date(2025, 10, 6), date(2025, 10, 7))
+        ids = [c.pk for c in conges] + [hors_perimetre.pk, collegue_chef.pk, 999999]
+        cache.clear()
+        self.assertEqual(get_dashboard_stats(DashboardScope(GLOBAL)).total_pending_conges, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('employees:conge_decision'), {
+                'conges': ids, 'decision': 'approuver', 'commentaire': "Bon été",
+            })
+        self.assertRedirects(response, reverse('employees:conge_list'))
+        statuts = dict(Conge.objects.values_list('pk', 'statut'))
+        # absents_max=2 : la troisième demande du lot dépasserait l'effectif
+        self.assertEqual([statuts[c.pk] for c in conges], ['APPROUVE', 'APPROUVE', 'EN_ATTENTE'])
+        self.assertEqual(statuts[hors_perimetre.pk], 'EN_ATTENTE')
+        self.assertEqual(statuts[collegue_chef.pk], 'EN_ATTENTE')
+        self.assertEqual(get_dashboard_stats(DashboardScope(GLOBAL)).total_pending_conges, 3)
+        self.assertEqual(Conge.objects.get(pk=conges[0].pk).commentaire_manager, "Bon été")
+        self.assertEqual(
+            SoldeConge.objects.get(employe=self.equipe[0], annee=2025, type_conge='ANNUEL').pris, 5
+        )
+        self.assertEqual(
+            sorted(Notification.objects.values_list('destinataire', flat=True)),
+            ['masson@example.com', 'vidal@example.com'],
+        )
+
+    def test_bulk_decision_query_count_does_not_grow(self):
+        scope = resolve_access_scope(self.user)
+        petit = [self.demande(self.equipe[0], date(2025, 3, d), date(2025, 3, d)) for d in (3, 4)]
+        grand = [self.demande(self.equipe[1], date(2025, 3, d), date(2025, 3, d)) for d in range(3, 8)]
+        grand += [self.demande(self.equipe[2], date(2025, 4, d), date(2025, 4, d)) for d in range(7, 12)]
+
+        with CaptureQueriesContext(connection) as petit_lot:
+            decider(scope, [c.pk for c in petit], 'REJETE')
+        with CaptureQueriesContext(connection) as grand_lot:
+            bilan = decider(scope, [c.pk for c in grand], 'REJETE')
+        self.assertEqual(len(bilan.traites), 10)
+        self.assertEqual(len(grand_lot.captured_queries), len(petit_lot.captured_queries))
+
+        # Rejeter un congé approuvé le recrédite
+        decider(scope, [c.pk for c in grand], 'APPROUVE')
+        bilan = decider(scope, [grand[0].pk, grand[0].pk], 'REJETE')
+        self.assertEqual([c.pk for c in bilan.traites], [grand[0].pk])
+        self.assertEqual(solde(self.equipe[1].pk, annee=2025).pris, 4)
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Qualité", code="QUA")
+        poste = Poste.objects.create(titre="Contrôleur", departement=dept)
+        self.user = User.objects.create_user(username='qualite', password='password')
+        self.employe = Employe.objects.create(
+            user=self.user, nom="Lemoine", prenom="Zoé", email="zoe.lemoine@example.com",
+            date_embauche=date(2024, 1, 1), poste=poste, salaire=2500,
+        )
+        self.chef = Employe.objects.create(
+            nom="Garnier", prenom="Luc", email="luc.garnier@example.com", role='MANAGER',
+            date_embauche=date(2020, 1, 1), poste=poste, salaire=3600,
+        )
+        self.client.login(username='qualite', password='password')
+
+    def test_leave_request_queues_notification_without_sending(self):
+        self.client.post(reverse('employees:conge_request'), {
+            'type_conge': 'ANNUEL', 'date_debut': '2025-05-05', 'date_fin': '2025-05-09', 'motif': "Pont",
+            'validateur': self.chef.pk, 'employe': self.employe.pk,
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.destinataire, "luc.garnier@example.com")
+
+        for _ in range(3):
+            Notification.objects.create(destinataire="x@example.com", sujet="Test", corps="...")
+        bilan = envoyer_notifications(taille=2)
+        self.assertEqual(bilan.envoyees, 4)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(mail.outbox[0].subject, notification.sujet)
+        self.assertFalse(Notification.objects.exclude(statut='ENVOYE').exists())
+        self.assertEqual(envoyer_notifications().envoyees, 0)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        notification = Notification.objects.create(destinataire="x@example.com", sujet="Test", corps="...")
+        with self.settings(NOTIFICATION_MAX_TENTATIVES=2, NOTIFICATION_BACKOFF=60), \
+                mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError("SMTP indisponible")):
+            bilan = envoyer_notifications()
+            self.assertEqual((bilan.envoyees, bilan.reportees), (0, 1))
+            notification.refresh_from_db()
+            self.assertEqual(notification.tentatives, 1)
+            self.assertIn("SMTP indisponible", notification.derniere_erreur)
+            self.assertGreater(notification.prochain_essai, timezone.now() + timedelta(seconds=50))
+            # Pas encore dû
+            self.assertEqual(envoyer_notifications().reportees, 0)
+
+            Notification.objects.filter(pk=notification.pk).update(prochain_essai=timezone.now())
+            self.assertEqual(envoyer_notifications().abandonnees, 1)
+        notification.refresh_from_db()
+        self.assertEqual(notification.statut, 'ECHEC')
+        self.assertEqual(statistiques_notifications()['ECHEC'], 1)
+
+    def test_messages_are_sent_in_flight_outside_any_transaction(self):
+        notification = Notification.objects.create(destinataire="x@example.com", sujet="Test", corps="...")
+        profondeur = len(connection.atomic_blocks)
+        pendant_envoi = []
+
+        def envoyer(*args, **kwargs):
+            # Aucune transaction ouverte par l'envoi, et le message n'est plus dû pour un autre worker
+            pendant_envoi.append((
+                len(connection.atomic_blocks) - profondeur,
+                Notification.objects.filter(statut='EN_ATTENTE', prochain_essai__lte=timezone.now()).count(),
+            ))
+            raise KeyboardInterrupt
+
+        # Worker tué pendant l'envoi : le message reste en vol jusqu'à la fin du bail
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=envoyer), self.assertRaises(KeyboardInterrupt):
+            envoyer_notifications()
+        self.assertEqual(pendant_envoi, [(0, 0)])
+        notification.refresh_from_db()
+        self.assertEqual((notification.statut, notification.tentatives), ('EN_ATTENTE', 0))
+        self.assertGreater(notification.prochain_essai, timezone.now() + timedelta(minutes=9))
+
+class NotificationDigestTests(TestCase):
+    def setUp(self):
+        self.dept = Departement.objects.create(nom="Atelier", code="ATE")
+        poste = Poste.objects.create(titre="Monteur", departement=self.dept)
+        self.user = User.objects.create_user(username='monteur', password='password')
+        self.employe = Employe.objects.create(
+            user=self.user, nom="Fabre", prenom="Noé", email="noe.fabre@example.com",
+            date_embauche=date(2024, 1, 1), poste=poste, salaire=2300,
+        )
+        self.chef = Employe.objects.create(
+            nom="Michel", prenom="Rose", email="rose.michel@example.com", role='MANAGER',
+            date_embauche=date(2020, 1, 1), poste=poste, salaire=3600, mode_notification='QUOTIDIEN',
+        )
+        self.rh = Employe.objects.create(
+            nom="Aubert", prenom="Yves", email="yves.aubert@example.com", role='RH',
+            date_embauche=date(2019, 1, 1), poste=poste, salaire=3900, mode_notification='HEBDOMADAIRE',
+        )
+        formation = Formation.objects.create(
+            titre="Sécurité", description="...", departement=self.dept,
+            date_debut=date(2025, 6, 2), date_fin=date(2025, 6, 3),
+        )
+        InscriptionFormation.objects.create(employe=self.employe, formation=formation)
+        offre = OffreEmploi.objects.create(titre="Monteur", description="...", departement=self.dept)
+        Candidature.objects.create(offre=offre, nom="Roy", prenom="Ali", email="ali.roy@example.com", cv='cvs/cv.pdf')
+        self.client.login(username='monteur', password='password')
+
+    def test_digest_replaces_per_request_emails(self):
+        for debut, fin in (('2025-05-05', '2025-05-06'), ('2025-05-12', '2025-05-13')):
+            self.client.post(reverse('employees:conge_request'), {
+                'type_conge': 'ANNUEL', 'date_debut': debut, 'date_fin': fin, 'motif': "",
+                'validateur': self.chef.pk, 'employe': self.employe.pk,
+            })
+        self.assertEqual(Conge.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+
+        # Destinataires, éléments groupés, puis INSERT + UPDATE dans un savepoint
+        with self.assertNumQueries(6):
+            self.assertEqual(envoyer_recapitulatifs('QUOTIDIEN'), 1)
+        recapitulatif = Notification.objects.get()
+        self.assertEqual(recapitulatif.destinataire, "rose.michel@example.com")
+        self.assertIn("2 demande(s) de congé (la première débute le 05/05/2025)", recapitulatif.corps)
+        self.assertIn("1 inscription(s)", recapitulatif.corps)
+        self.assertNotIn("candidature", recapitulatif.corps)
+        # Déjà servi aujourd'hui
+        self.assertEqual(envoyer_recapitulatifs('QUOTIDIEN'), 0)
+
+        envoyer_recapitulatifs('HEBDOMADAIRE')
+        corps_rh = Notification.objects.get(destinataire="yves.aubert@example.com").corps
+        self.assertIn("1 nouvelle(s) candidature(s)", corps_rh)
+        self.assertNotIn("congé", corps_rh)
+
+class EmailOrUsernameBackendTests(TestCase):
+    def setUp(self):
+        dept = Departement.objects.create(nom="Maintenance", code="MAI")
+        poste = Poste.objects.create(titre="Électricien", departement=dept)
+        self.user = User.objects.create_user(username='tnoel', email='Theo.Noel@example.com', password='secret')
+        Employe.objects.create(
+            user=self.user, matricule="MAI-042", nom="Noël", prenom="Théo", email="theo.noel@example.com",
+            date_embauche=date(2024, 1, 1), poste=poste, salaire=2400,
+        )
+
+    def test_username_email_or_matricule_in_one_query(self):
+        backend = EmailOrUsernameBackend()
+        for identifiant in ('tnoel', 'theo.noel@EXAMPLE.com', 'MAI-042'):
+            with self.assertNumQueries(1):
+                self.assertEqual(backend.authenticate(None, username=identifiant, password='secret'), self.user)
+        self.assertIsNone(backend.authenticate(None, username='MAI-042', password='faux'))
+        self.assertIsNone(backend.authenticate(None, username='inconnu', password='secret'))
+
+    @skipUnless(connection.vendor == 'sqlite', "index vérifié dans sqlite_master")
+    def test_lower_email_index_is_installed(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = %s", [EMAIL_LOWER_INDEX])
+            self.assertIn("LOWER(email)", cursor.fetchone()[0])
+
+    def test_negative_cache_is_cleared_when_account_is_created(self):
+        cache.clear()
+        backend = EmailOrUsernameBackend()
+        with self.settings(AUTH_NEGATIVE_CACHE_TIMEOUT=60):
+            self.assertIsNone(backend.authenticate(None, username='nouveau@example.com', password='secret'))
+            with self.assertNumQueries(0):
+                self.assertIsNone(backend.authenticate(None, username='nouveau@example.com', password='secret'))
+            nouveau = User.objects.create_user(username='nouveau', email='Nouveau@example.com', password='secret')
+            self.assertEqual(backend.authenticate(None, username='nouveau@example.com', password='secret'), nouveau)
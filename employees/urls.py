@@ -5,6 +5,7 @@ app_name = 'employees'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('metrics/dashboard-cache/', views.dashboard_cache_metrics, name='dashboard_cache_metrics'),
     
     # Employés
     path('employees/', views.employee_list, name='employee_list'),
@@ -31,6 +32,7 @@ urlpatterns = [
     # Congés
     path('conges/', views.conge_list, name='conge_list'),
     path('conges/request/', views.conge_request, name='conge_request'),
+    path('conges/decision/', views.conge_decision, name='conge_decision'),
     path('conges/<int:pk>/approve/', views.conge_approve, name='conge_approve'),
     path('conges/<int:pk>/reject/', views.conge_reject, name='conge_reject'),
     
@@ -38,10 +40,15 @@ urlpatterns = [
     path('presences/', views.presence_list, name='presence_list'),
     path('presences/add/', views.presence_create, name='presence_create'),
     path('presences/check/', views.presence_check, name='presence_check'),
+    path('api/pointage/', views.pointage_api, name='pointage_api'),
+    path('api/pointage/import/', views.pointage_import, name='pointage_import'),
     
     # Paie
     path('paie/', views.paie_list, name='paie_list'),
     path('paie/add/', views.paie_create, name='paie_create'),
+    path('paie/pdf/', views.paie_departement_pdf, name='paie_departement_pdf'),
+    path('paie/cycles/', views.paie_cycle_list, name='paie_cycle_list'),
+    path('paie/cycles/<int:pk>/reprendre/', views.paie_cycle_reprendre, name='paie_cycle_reprendre'),
     
     # Formations
     path('formations/', views.formation_list, name='formation_list'),
@@ -61,6 +68,8 @@ urlpatterns = [
     
     # Export
     path('employees/export/csv/', views.export_employees_csv, name='export_employees_csv'),
+    path('fichiers/<slug:type_fichier>/<int:pk>/', views.telecharger_fichier, name='telecharger_fichier'),
+    path('exports/<slug:modele>/', views.export_data, name='export_data'),
     
     # Politiques
     path('politiques/', views.politique_list, name='politique_list'),
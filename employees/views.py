@@ -1,159 +1,120 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.conf import settings
-import csv
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date, parse_time
+from django.utils.text import slugify
+import hmac
+import json
+import os
 
 from .models import (
     Employe, Departement, Poste, Conge, Absence, Presence, 
-    FichePaie, Prime, Evaluation, Objectif, Formation, 
-    InscriptionFormation, OffreEmploi, Candidature, DocumentRH, TypeContrat
+    FichePaie, CyclePaie, Prime, Evaluation, Objectif, Formation, 
+    InscriptionFormation, OffreEmploi, Candidature, DocumentRH, TypeContrat, Contrat
 )
 from .forms import (
     EmployeForm, DepartementForm, PosteForm, CongeForm, AbsenceForm,
-    PresenceForm, FichePaieForm, EvaluationForm, FormationForm,
+    PresenceForm, FichePaieForm, CyclePaieForm, EvaluationForm, FormationForm,
     OffreEmploiForm, CandidatureForm, DocumentRHForm,
     InscriptionFormationUpdateForm
 )
 
 from .decorators import rh_required, manager_required, superadmin_required, dept_admin_required
+from .dashboard import get_dashboard_stats, dashboard_scope_for, dashboard_cache_counters
+from .scope import get_access_scope
+from .pagination import KeysetPaginator
+from .search import search_employees
+from .conges import changer_statut, decider, solde
+from .calendrier import verifier_demande
+from .pdf import fiche_paie_donnees, render_fiches_paie, render_timings
+from .exports import streaming_csv_response, export_response, parse_export_date, scoped_queryset, ExportError, employee_csv_columns
+from .downloads import serve_file
+from .notifications import notifier, statistiques_notifications
+from .pointage import (
+    badger, enregistrer_pointages, importer_journal, lire_horodatage, regrouper_badgeages, saisir_presences
+)
 
 @login_required
 def dashboard(request):
-    today = timezone.now().date()
-    if not hasattr(request.user, 'profil') or request.user.is_superuser or request.user.profil.is_superadmin:
-        # Cas du superuser ou profil ADMIN (voit tout au niveau global)
-        total_employees = Employe.objects.count()
-        departements = Departement.objects.annotate(num_employees=Count('postes__employes'))
-        recent_conges = Conge.objects.filter(statut='EN_ATTENTE').order_by('-date_debut')[:5]
-        total_pending_conges = Conge.objects.filter(statut='EN_ATTENTE').count()
-        anniversaires = Employe.objects.filter(date_naissance__month=today.month).order_by('date_naissance__day')
-    else:
-        profil = request.user.profil
-        if profil.is_rh:
-            total_employees = Employe.objects.count()
-            departements = Departement.objects.annotate(num_employees=Count('postes__employes'))
-            recent_conges = Conge.objects.filter(statut='EN_ATTENTE').order_by('-date_debut')[:5]
-            total_pending_conges = Conge.objects.filter(statut='EN_ATTENTE').count()
-            anniversaires = Employe.objects.filter(date_naissance__month=today.month).order_by('date_naissance__day')
-        elif profil.is_dept_admin or profil.role == 'EMPLOYE':
-            if profil.poste:
-                dept = profil.poste.departement
-                total_employees = Employe.objects.filter(poste__departement=dept).count()
-                departements = Departement.objects.filter(id=dept.id).annotate(num_employees=Count('postes__employes'))
-                
-                if profil.is_dept_admin:
-                    recent_conges = Conge.objects.filter(employe__poste__departement=dept, statut='EN_ATTENTE').order_by('-date_debut')[:5]
-                    total_pending_conges = Conge.objects.filter(employe__poste__departement=dept, statut='EN_ATTENTE').count()
-                else:
-                    recent_conges = Conge.objects.filter(employe=profil).order_by('-date_debut')[:5]
-                    total_pending_conges = Conge.objects.filter(employe=profil, statut='EN_ATTENTE').count()
-                
-                anniversaires = Employe.objects.filter(poste__departement=dept, date_naissance__month=today.month).order_by('date_naissance__day')
-            else:
-                total_employees = 0
-                departements = Departement.objects.none()
-                recent_conges = []
-                total_pending_conges = 0
-                anniversaires = []
-
-    # Logique commune pour les formations
-    if request.user.is_superuser or (hasattr(request.user, 'profil') and request.user.profil.is_rh):
-        total_formations = Formation.objects.count()
-    else:
-        profil = request.user.profil
-        if profil.poste:
-            total_formations = Formation.objects.filter(Q(departement=profil.poste.departement) | Q(departement__isnull=True)).count()
-        else:
-            total_formations = Formation.objects.filter(departement__isnull=True).count()
-
-    last_7_days = [(today - timezone.timedelta(days=i)) for i in range(6, -1, -1)]
-    arrivals_per_day = []
-    
-    # Filtrer les arrivées si manager
-    base_employees = Employe.objects.all()
-    if hasattr(request.user, 'profil') and request.user.profil.is_manager and not request.user.profil.is_rh:
-        if request.user.profil.poste:
-            base_employees = base_employees.filter(poste__departement=request.user.profil.poste.departement)
-        else:
-            base_employees = base_employees.none()
-
-    for day in last_7_days:
-        count = base_employees.filter(date_embauche=day).count()
-        arrivals_per_day.append({
-            'day': day.strftime('%a'),
-            'count': count
-        })
-
-    context = {
-        'total_employees': total_employees,
-        'departements': departements,
-        'total_formations': total_formations,
-        'recent_conges': recent_conges,
-        'total_pending_conges': total_pending_conges,
-        'anniversaires': anniversaires if 'anniversaires' in locals() else [],
-        'arrivals_per_day': arrivals_per_day,
-    }
-    return render(request, 'employees/dashboard.html', context)
+    stats = get_dashboard_stats(dashboard_scope_for(request.access_scope))
+    # Hors cache : propre à l'utilisateur, lu directement dans le compteur
+    solde_conges = solde(request.access_scope.employe_id) if request.access_scope.has_profil else None
+    return render(request, 'employees/dashboard.html', {'stats': stats, 'solde_conges': solde_conges})
+
+def dashboard_cache_metrics(request):
+    # Accessible au superadmin connecté ou à un collecteur muni du jeton METRICS_TOKEN
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorized = token and request.headers.get('Authorization') == f"Bearer {token}"
+    if not authorized and not get_access_scope(request).is_superadmin:
+        raise PermissionDenied
+
+    counters = dashboard_cache_counters()
+    lines = [
+        "# TYPE rh_dashboard_cache_hits_total counter",
+        f"rh_dashboard_cache_hits_total {counters['hits']}",
+        "# TYPE rh_dashboard_cache_misses_total counter",
+        f"rh_dashboard_cache_misses_total {counters['misses']}",
+    ]
+    # Rendus effectués par ce processus (mode sync, documents par département)
+    timings = render_timings()
+    lines += [
+        "# TYPE rh_payslip_render_slips_total counter",
+        f"rh_payslip_render_slips_total {timings['fiches']}",
+        "# TYPE rh_payslip_render_seconds_total counter",
+        f"rh_payslip_render_seconds_total {timings['secondes']:.6f}",
+    ]
+    # Boîte d'envoi : lue en base, partagée par tous les workers
+    notifications = statistiques_notifications()
+    lines += [
+        "# TYPE rh_notifications_pending gauge",
+        f"rh_notifications_pending {notifications['EN_ATTENTE']}",
+        "# TYPE rh_notifications_sent_total counter",
+        f"rh_notifications_sent_total {notifications['ENVOYE']}",
+        "# TYPE rh_notifications_failed_total counter",
+        f"rh_notifications_failed_total {notifications['ECHEC']}",
+        "# TYPE rh_notifications_oldest_pending_seconds gauge",
+        f"rh_notifications_oldest_pending_seconds {notifications['retard']:.0f}",
+    ]
+    return HttpResponse("\n".join(lines) + "\n", content_type='text/plain; version=0.0.4')
 
 # Gestion des Employés
 @login_required
 def employee_list(request):
     query = request.GET.get('q')
     
-    employees = Employe.objects.all().select_related('poste', 'poste__departement')
+    employees = Employe.objects.select_related('poste', 'poste__departement')
     
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if profil.is_dept_admin:
-            # Chef de service : restreint à son département
-            if profil.poste:
-                employees = employees.filter(poste__departement=profil.poste.departement)
-            else:
-                employees = employees.none()
-        elif not profil.is_superadmin and not profil.is_rh:
-            # Simple employé ne voit que les talents de son département (nouveau critère)
-            if profil.poste:
-                employees = employees.filter(poste__departement=profil.poste.departement)
-            else:
-                employees = employees.none()
+    # Chef de service et simple employé : restreints aux talents de leur département
+    employees = employees.visible_to(request.access_scope)
 
+    ordering = ('nom', 'id')
     if query:
-        employees = employees.filter(
-            Q(nom__icontains=query) | 
-            Q(prenom__icontains=query) | 
-            Q(matricule__icontains=query) |
-            Q(poste__titre__icontains=query)
-        )
+        # Résultats classés par pertinence, insensibles aux accents
+        employees = search_employees(employees, query)
+        ordering = ('-search_rank', 'nom', 'id')
     
-    return render(request, 'employees/employee_list.html', {'employees': employees})
+    page = KeysetPaginator(employees, ordering=ordering).get_page(request.GET.get('cursor'))
+    return render(request, 'employees/employee_list.html', {'employees': page})
 
 @login_required
 def employee_detail(request, pk):
     employee = get_object_or_404(Employe.objects.select_related('poste', 'poste__departement'), pk=pk)
     
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        # Restriction : 
-        # SuperAdmin voit tout
-        # DeptAdmin voit son département
-        # Employé ne voit que lui-même
-        if not profil.is_superadmin and not profil.is_rh:
-            if profil.is_dept_admin:
-                if not profil.poste or not employee.poste or employee.poste.departement != profil.poste.departement:
-                    from django.core.exceptions import PermissionDenied
-                    raise PermissionDenied
-            else:
-                if employee != profil:
-                    # Un employé peut voir les talents de son département
-                    if not profil.poste or not employee.poste or employee.poste.departement != profil.poste.departement:
-                        from django.core.exceptions import PermissionDenied
-                        raise PermissionDenied
+    # Restriction : 
+    # SuperAdmin et RH voient tout
+    # DeptAdmin et employé voient les talents de leur département (et l'employé lui-même)
+    scope = request.access_scope
+    if employee.pk != scope.employe_id:
+        if not scope.covers_departement(employee.departement_id):
+            raise PermissionDenied
 
     documents = DocumentRH.objects.filter(employe=employee)
     evaluations = Evaluation.objects.filter(employe=employee)
@@ -189,13 +150,13 @@ def employee_create(request):
             pass
 
     if request.method == 'POST':
-        form = EmployeForm(request.POST, user=request.user)
+        form = EmployeForm(request.POST, scope=request.access_scope)
         if form.is_valid():
             form.save()
             messages.success(request, "Employé ajouté avec succès.")
             return redirect('employees:employee_list')
     else:
-        form = EmployeForm(user=request.user, initial=initial_data)
+        form = EmployeForm(scope=request.access_scope, initial=initial_data)
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Ajouter un employé"})
 
 @login_required
@@ -204,21 +165,17 @@ def employee_update(request, pk):
     employee = get_object_or_404(Employe, pk=pk)
     
     # Vérification des permissions pour les Dept Admins
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_superadmin:
-            if employee.poste.departement != profil.poste.departement:
-                from django.core.exceptions import PermissionDenied
-                raise PermissionDenied
+    if not request.access_scope.covers_departement(employee.departement_id):
+        raise PermissionDenied
                 
     if request.method == 'POST':
-        form = EmployeForm(request.POST, instance=employee, user=request.user)
+        form = EmployeForm(request.POST, instance=employee, scope=request.access_scope)
         if form.is_valid():
             form.save()
             messages.success(request, "Informations de l'employé mises à jour.")
             return redirect('employees:employee_detail', pk=pk)
     else:
-        form = EmployeForm(instance=employee, user=request.user)
+        form = EmployeForm(instance=employee, scope=request.access_scope)
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Modifier l'employé"})
 
 @login_required
@@ -227,12 +184,8 @@ def employee_delete(request, pk):
     employee = get_object_or_404(Employe, pk=pk)
     
     # Vérification des permissions pour les managers
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_superadmin:
-            if employee.poste.departement != profil.poste.departement:
-                from django.core.exceptions import PermissionDenied
-                raise PermissionDenied
+    if not request.access_scope.covers_departement(employee.departement_id):
+        raise PermissionDenied
                 
     if request.method == 'POST':
         employee.delete()
@@ -245,16 +198,15 @@ def document_create(request, employee_pk):
     employee = get_object_or_404(Employe, pk=employee_pk)
     
     # Vérification des permissions : RH, Manager du dept, ou l'employé lui-même
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh:
-            if profil.is_manager:
-                if employee.poste.departement != profil.poste.departement:
-                    raise PermissionDenied
-            else:
-                # Simple employé : ne peut uploader que pour lui-même
-                if employee != profil:
-                    raise PermissionDenied
+    scope = request.access_scope
+    if not scope.is_superuser and not scope.is_rh:
+        if scope.is_manager:
+            if not employee.departement_id or employee.departement_id != scope.departement_id:
+                raise PermissionDenied
+        else:
+            # Simple employé : ne peut uploader que pour lui-même
+            if employee.pk != scope.employe_id:
+                raise PermissionDenied
 
     if request.method == 'POST':
         form = DocumentRHForm(request.POST, request.FILES)
@@ -271,45 +223,32 @@ def document_create(request, employee_pk):
 # Gestion des Départements
 @login_required
 def departement_list(request):
-    departements = Departement.objects.annotate(num_employees=Count('postes__employes'))
-    
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            # Employé et Manager de département : ne voient que leur département
-            if hasattr(profil, 'leads_departement') and profil.leads_departement:
-                departements = departements.filter(id=profil.leads_departement.id)
-            elif profil.poste:
-                departements = departements.filter(id=profil.poste.departement.id)
-            else:
-                departements = departements.none()
+    departements = Departement.objects.annotate(num_employees=Count('employes'))
+    
+    scope = request.access_scope
+    if not scope.sees_all:
+        # Employé et Manager de département : ne voient que leur département
+        if scope.led_departement_id:
+            departements = departements.filter(id=scope.led_departement_id)
+        elif scope.departement_id:
+            departements = departements.filter(id=scope.departement_id)
+        else:
+            departements = departements.none()
 
     return render(request, 'employees/departement_list.html', {'departements': departements})
 
 @login_required
 def departement_detail(request, pk):
-    departement = get_object_or_404(Departement.objects.annotate(num_employees=Count('postes__employes')), pk=pk)
+    departement = get_object_or_404(Departement.objects.annotate(num_employees=Count('employes')), pk=pk)
     
     # Restriction
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if hasattr(profil, 'leads_departement') and profil.leads_departement and departement != profil.leads_departement:
-                # Si c'est un manager, il doit être le manager de CE département
-                # Mais attendez, un employé peut voir les détails de son propre département aussi ?
-                # "verra l'effectif selon son departement tout les informations concernat son departement"
-                # Donc on autorise si c'est son département.
-                pass 
-            
-            # Vérification finale : est-ce son département ?
-            user_dept = None
-            if profil.poste:
-                user_dept = profil.poste.departement
-            elif hasattr(profil, 'leads_departement') and profil.leads_departement:
-                user_dept = profil.leads_departement
-                
-            if departement != user_dept:
-                raise PermissionDenied
+    # "verra l'effectif selon son departement tout les informations concernat son departement"
+    scope = request.access_scope
+    if not scope.sees_all:
+        # Vérification finale : est-ce son département ?
+        user_dept_id = scope.departement_id or scope.led_departement_id
+        if departement.id != user_dept_id:
+            raise PermissionDenied
 
     postes = departement.postes.annotate(num_employees=Count('employes'))
     return render(request, 'employees/departement_detail.html', {
@@ -336,13 +275,12 @@ def departement_update(request, pk):
     departement = get_object_or_404(Departement, pk=pk)
     
     # Restriction
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if profil.leads_departement and departement != profil.leads_departement:
-                raise PermissionDenied
-            elif profil.poste and departement != profil.poste.departement:
-                raise PermissionDenied
+    scope = request.access_scope
+    if not scope.is_rh and not scope.is_superadmin:
+        if scope.led_departement_id and departement.id != scope.led_departement_id:
+            raise PermissionDenied
+        elif scope.departement_id and departement.id != scope.departement_id:
+            raise PermissionDenied
 
     if request.method == 'POST':
         form = DepartementForm(request.POST, instance=departement)
@@ -419,166 +357,160 @@ def poste_delete(request, pk):
 # Gestion des Congés
 @login_required
 def conge_list(request):
-    if not hasattr(request.user, 'profil'):
-        # Cas du superuser sans profil
-        return render(request, 'employees/conge_list.html', {'conges': []})
-        
-    profil = request.user.profil
-    if profil.is_superadmin:
-        # Super admin ne gère pas les congés
-        conges = []
-    elif profil.is_rh:
-        conges = Conge.objects.all().select_related('employe')
-    elif profil.is_dept_admin:
-        if profil.poste:
-            conges = Conge.objects.filter(employe__poste__departement=profil.poste.departement).select_related('employe')
-        else:
-            conges = []
+    scope = request.access_scope
+    if not scope.has_profil or scope.is_superadmin:
+        # Superuser sans profil / Super admin : ne gère pas les congés
+        conges = Conge.objects.none()
     else:
-        conges = Conge.objects.filter(employe=profil).select_related('employe')
+        conges = Conge.objects.visible_to(scope).select_related('employe')
         
-    return render(request, 'employees/conge_list.html', {'conges': conges})
-
-from django.core.mail import send_mail
-from django.conf import settings
+    page = KeysetPaginator(conges, ordering=('-date_debut', '-id')).get_page(request.GET.get('cursor'))
+    return render(request, 'employees/conge_list.html', {'conges': page})
 
 @login_required
 def conge_request(request):
+    scope = request.access_scope
     # Le superadmin n'a pas de profil pour demander un congé pour lui-même
-    if request.user.is_superuser:
+    if scope.is_superuser:
         messages.error(request, "Le superadmin ne peut pas soumettre de demande de congé pour lui-même.")
         return redirect('employees:conge_list')
+    if not scope.has_profil:
+        messages.error(request, "Vous devez avoir un profil employé pour demander un congé.")
+        return redirect('employees:conge_list')
         
-    profil = request.user.profil
     if request.method == 'POST':
-        form = CongeForm(request.POST, user=request.user)
+        form = CongeForm(request.POST, scope=scope)
         if form.is_valid():
             conge = form.save(commit=False)
-            conge.employe = profil
-            conge.save()
-            # Notification au manager
-            if conge.validateur and conge.validateur.email:
-                subject = f"Nouvelle demande de congé : {conge.employe}"
-                message = f"Bonjour {conge.validateur.prenom},\n\nUne nouvelle demande de congé a été soumise par {conge.employe}.\nDu : {conge.date_debut}\nAu : {conge.date_fin}\nMotif : {conge.motif}\n\nMerci de vous connecter pour valider ou rejeter cette demande."
-                send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [conge.validateur.email])
+            conge.employe_id = scope.employe_id
+            with transaction.atomic():
+                conge.save()
+                # Notification au manager, mise en file avec la demande (sauf s'il a choisi un récapitulatif)
+                if conge.validateur and conge.validateur.email and conge.validateur.mode_notification == 'IMMEDIAT':
+                    subject = f"Nouvelle demande de congé : {conge.employe}"
+                    message = f"Bonjour {conge.validateur.prenom},\n\nUne nouvelle demande de congé a été soumise par {conge.employe}.\nDu : {conge.date_debut}\nAu : {conge.date_fin}\nMotif : {conge.motif}\n\nMerci de vous connecter pour valider ou rejeter cette demande."
+                    notifier(conge.validateur.email, subject, message)
             messages.success(request, "Demande de congé soumise.")
             return redirect('employees:conge_list')
     else:
-        initial = {'employe': profil}
-        form = CongeForm(initial=initial, user=request.user)
+        initial = {'employe': scope.employe_id}
+        form = CongeForm(initial=initial, scope=scope)
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Demande de congé"})
 
 @login_required
 @manager_required
 def conge_approve(request, pk):
-    conge = get_object_or_404(Conge, pk=pk)
-    
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh:
-            if conge.employe.poste.departement != profil.poste.departement:
-                from django.core.exceptions import PermissionDenied
-                raise PermissionDenied
-            # Un manager ne peut pas approuver la demande d'un autre manager
-            if conge.employe.role == 'MANAGER':
-                messages.error(request, "Seul un responsable RH peut approuver la demande d'un chef de service.")
-                return redirect('employees:conge_list')
-
-    conge.statut = 'APPROUVE'
-    conge.save()
-    # Notification à l'employé
-    if conge.employe.email:
-        subject = "Votre demande de congé a été APPROUVÉE"
-        message = f"Bonjour {conge.employe.prenom},\n\nVotre demande de congé du {conge.date_debut} au {conge.date_fin} a été approuvée."
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [conge.employe.email])
+    conge = get_object_or_404(Conge.objects.select_related('employe'), pk=pk)
+    
+    scope = request.access_scope
+    if not scope.is_superuser and not scope.is_rh:
+        employe_dept_id = conge.employe.departement_id
+        if employe_dept_id is None or employe_dept_id != scope.departement_id:
+            raise PermissionDenied
+        # Un manager ne peut pas approuver la demande d'un autre manager
+        if conge.employe.role == 'MANAGER':
+            messages.error(request, "Seul un responsable RH peut approuver la demande d'un chef de service.")
+            return redirect('employees:conge_list')
+
+    # Revérifié à l'approbation : d'autres congés ont pu être approuvés depuis la demande
+    erreurs = verifier_demande(
+        conge.employe_id, conge.employe.departement_id, conge.date_debut, conge.date_fin, exclure=conge.pk,
+    )
+    if erreurs:
+        for erreur in erreurs:
+            messages.error(request, erreur)
+        return redirect('employees:conge_list')
+    if not changer_statut(conge, 'APPROUVE'):
+        messages.info(request, "Cette demande est déjà approuvée.")
+        return redirect('employees:conge_list')
     messages.success(request, "Demande approuvée.")
     return redirect('employees:conge_list')
 
 @login_required
 @manager_required
 def conge_reject(request, pk):
-    conge = get_object_or_404(Conge, pk=pk)
-    
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh:
-            if conge.employe.poste.departement != profil.poste.departement:
-                from django.core.exceptions import PermissionDenied
-                raise PermissionDenied
-            # Un manager ne peut pas rejeter la demande d'un autre manager
-            if conge.employe.role == 'MANAGER':
-                messages.error(request, "Seul un responsable RH peut rejeter la demande d'un chef de service.")
-                return redirect('employees:conge_list')
-
-    conge.statut = 'REJETE'
-    conge.save()
-    # Notification à l'employé
-    if conge.employe.email:
-        subject = "Votre demande de congé a été REJETÉE"
-        message = f"Bonjour {conge.employe.prenom},\n\nVotre demande de congé du {conge.date_debut} au {conge.date_fin} a été rejetée."
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [conge.employe.email])
+    conge = get_object_or_404(Conge.objects.select_related('employe'), pk=pk)
+    
+    scope = request.access_scope
+    if not scope.is_superuser and not scope.is_rh:
+        employe_dept_id = conge.employe.departement_id
+        if employe_dept_id is None or employe_dept_id != scope.departement_id:
+            raise PermissionDenied
+        # Un manager ne peut pas rejeter la demande d'un autre manager
+        if conge.employe.role == 'MANAGER':
+            messages.error(request, "Seul un responsable RH peut rejeter la demande d'un chef de service.")
+            return redirect('employees:conge_list')
+
+    if not changer_statut(conge, 'REJETE'):
+        messages.info(request, "Cette demande est déjà rejetée.")
+        return redirect('employees:conge_list')
     messages.warning(request, "Demande rejetée.")
     return redirect('employees:conge_list')
 
+@login_required
+@manager_required
+@require_POST
+def conge_decision(request):
+    """Approbation / rejet groupé des demandes cochées dans la liste des congés."""
+    statut = {'approuver': 'APPROUVE', 'rejeter': 'REJETE'}.get(request.POST.get('decision'))
+    if statut is None:
+        return HttpResponseBadRequest("Décision inconnue.")
+    ids = request.POST.getlist('conges')
+    if not ids:
+        messages.info(request, "Aucune demande sélectionnée.")
+        return redirect('employees:conge_list')
+
+    bilan = decider(request.access_scope, ids, statut, request.POST.get('commentaire', '').strip())
+    if bilan.traites:
+        verbe = "approuvée(s)" if statut == 'APPROUVE' else "rejetée(s)"
+        messages.success(request, f"{len(bilan.traites)} demande(s) {verbe}.")
+    for conge_id, raison in bilan.refus:
+        messages.warning(request, f"Demande n°{conge_id} ignorée : {raison}.")
+    return redirect('employees:conge_list')
+
 # Gestion des Présences
 @login_required
 def presence_list(request):
-    if request.user.is_superuser:
-        presences = Presence.objects.all().select_related('employe').order_by('-date')
-    else:
-        profil = request.user.profil
-        if profil.is_rh:
-            presences = Presence.objects.all().select_related('employe').order_by('-date')
-        elif profil.is_manager:
-            presences = Presence.objects.filter(employe__poste__departement=profil.poste.departement).select_related('employe').order_by('-date')
-        else:
-            presences = Presence.objects.filter(employe=profil).select_related('employe').order_by('-date')
-    return render(request, 'employees/presence_list.html', {'presences': presences})
+    presences = Presence.objects.visible_to(request.access_scope).select_related('employe')
+    page = KeysetPaginator(presences, ordering=('-date', '-id')).get_page(request.GET.get('cursor'))
+    return render(request, 'employees/presence_list.html', {'presences': page})
 
 @login_required
 @manager_required
 def presence_create(request):
-    if request.user.is_superuser:
+    scope = request.access_scope
+    if scope.is_superuser or scope.is_rh:
         departements = Departement.objects.all()
     else:
-        profil = request.user.profil
-        if profil.is_rh:
-            departements = Departement.objects.all()
-        else:
-            departements = Departement.objects.filter(id=profil.poste.departement.id)
+        departements = Departement.objects.filter(id=scope.departement_id)
     
     selected_dept = request.GET.get('departement')
     
     employees = []
     if selected_dept:
         # Vérification sécurité pour le manager
-        if not request.user.is_superuser:
-            profil = request.user.profil
-            if not profil.is_rh and int(selected_dept) != profil.poste.departement.id:
-                raise PermissionDenied
-        employees = Employe.objects.filter(poste__departement_id=selected_dept)
+        if not scope.is_superuser and not scope.is_rh and int(selected_dept) != scope.departement_id:
+            raise PermissionDenied
+        employees = Employe.objects.in_departement(selected_dept)
 
     if request.method == 'POST':
-        date = request.POST.get('date')
-        emp_ids = request.POST.getlist('employees')
-        h_arrivee = request.POST.get('heure_arrivee', '08:00')
-        h_depart = request.POST.get('heure_depart', '17:00')
-        
-        for emp_id in emp_ids:
-            # Vérifier que l'employé appartient au département si manager
-            emp = get_object_or_404(Employe, id=emp_id)
-            if not request.user.is_superuser:
-                profil = request.user.profil
-                if not profil.is_rh and emp.poste.departement != profil.poste.departement:
-                    continue
-
-            Presence.objects.create(
-                employe_id=emp_id,
-                date=date,
-                heure_arrivee=h_arrivee,
-                heure_depart=h_depart
-            )
-        messages.success(request, f"Présences enregistrées.")
+        try:
+            date = parse_date(request.POST.get('date') or '')
+            h_arrivee = parse_time(request.POST.get('heure_arrivee') or '08:00')
+            h_depart = parse_time(request.POST.get('heure_depart') or '17:00')
+        except ValueError:
+            date = h_arrivee = None
+        if not date or not h_arrivee:
+            messages.error(request, "Date ou heure invalide.")
+            return redirect(request.get_full_path())
+
+        bilan = saisir_presences(scope, request.POST.getlist('employees'), date, h_arrivee, h_depart)
+        messages.success(
+            request,
+            f"Présences enregistrées : {bilan.inseres} ajoutée(s), {bilan.deja_saisis} déjà saisie(s)."
+        )
+        if bilan.refuses:
+            messages.warning(request, f"{len(bilan.refuses)} employé(s) hors de votre périmètre ignoré(s).")
         return redirect('employees:presence_list')
 
     return render(request, 'employees/presence_form.html', {
@@ -589,40 +521,108 @@ def presence_create(request):
 
 @login_required
 def presence_check(request):
-    if request.user.is_superuser:
+    scope = request.access_scope
+    if scope.is_superuser or not scope.has_profil:
         messages.error(request, "Le superadmin ne peut pas pointer (pas de profil employé).")
         return redirect('employees:presence_list')
         
-    profil = request.user.profil
-    today = timezone.now().date()
-    now = timezone.now().time()
-    
-    presence = Presence.objects.filter(employe=profil, date=today).first()
-    
-    if not presence:
-        # Arrivée
-        Presence.objects.create(
-            employe=profil,
-            date=today,
-            heure_arrivee=now
-        )
-        messages.success(request, f"Arrivée enregistrée à {now.strftime('%H:%M')}.")
-    elif not presence.heure_depart:
-        # Départ
-        presence.heure_depart = now
-        presence.save()
-        messages.success(request, f"Départ enregistré à {now.strftime('%H:%M')}.")
+    # Upsert atomique sur (employé, jour) : un double clic ne crée plus de doublon
+    journee = badger(scope.employe_id)
+    if journee.heure_depart:
+        messages.success(request, f"Départ enregistré à {journee.heure_depart.strftime('%H:%M')}.")
     else:
-        messages.warning(request, "Vous avez déjà enregistré votre arrivée et votre départ pour aujourd'hui.")
-        
+        messages.success(request, f"Arrivée enregistrée à {journee.heure_arrivee.strftime('%H:%M')}.")
+
     return redirect('employees:presence_list')
 
+def _verifier_terminal(request):
+    token = getattr(settings, 'POINTAGE_TOKEN', None)
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        raise PermissionDenied
+
+@csrf_exempt
+@require_POST
+def pointage_api(request):
+    """
+    Badgeages des terminaux, seuls ou par lot (terminal resté hors ligne) :
+    {"matricule": "M001", "horodatage": "2025-03-10T08:01:12+01:00"}
+    ou {"pointages": [{...}, ...]}. Authentification par le jeton POINTAGE_TOKEN.
+    """
+    _verifier_terminal(request)
+    try:
+        donnees = json.loads(request.body)
+        lignes = donnees['pointages'] if 'pointages' in donnees else [donnees]
+        if not isinstance(lignes, list):
+            raise TypeError
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'erreur': "Corps JSON invalide."}, status=400)
+
+    badgeages, index_badgeages, rejetes = [], [], []
+    for index, ligne in enumerate(lignes):
+        matricule = ligne.get('matricule') if isinstance(ligne, dict) else None
+        moment = lire_horodatage(ligne.get('horodatage')) if matricule else None
+        if moment is None:
+            rejetes.append({'index': index, 'erreur': "matricule ou horodatage invalide"})
+            continue
+        badgeages.append((str(matricule), moment))
+        index_badgeages.append(index)
+
+    journees = enregistrer_pointages(regrouper_badgeages(badgeages))
+    connus = {journee.employe for journee in journees}
+    rejetes += [
+        {'index': index, 'erreur': "matricule inconnu"}
+        for index, (matricule, _) in zip(index_badgeages, badgeages) if matricule not in connus
+    ]
+    return JsonResponse({
+        'pointages': [
+            {
+                'matricule': journee.employe,
+                'date': journee.date.isoformat(),
+                'heure_arrivee': journee.heure_arrivee.isoformat(),
+                'heure_depart': journee.heure_depart.isoformat() if journee.heure_depart else None,
+            }
+            for journee in journees
+        ],
+        'rejetes': rejetes,
+    })
+
+@csrf_exempt
+@require_POST
+def pointage_import(request):
+    """
+    Journal de badgeages d'un terminal (CSV ou JSON Lines), envoyé brut
+    (Content-Type text/csv ou application/x-ndjson) ou en multipart (champ
+    "fichier"). Lu en flux, rejouable sans doublon.
+    """
+    _verifier_terminal(request)
+    if request.content_type == 'multipart/form-data':
+        fichier = request.FILES.get('fichier')
+        if not fichier:
+            return JsonResponse({'erreur': "Champ fichier manquant."}, status=400)
+        flux, nom = fichier, fichier.name.lower()
+    else:
+        flux, nom = request, ''
+    format = request.GET.get('format')
+    if not format:
+        format = 'csv' if nom.endswith('.csv') or request.content_type == 'text/csv' else 'jsonl'
+    if format not in ('csv', 'jsonl'):
+        return JsonResponse({'erreur': "Format attendu : csv ou jsonl."}, status=400)
+
+    bilan = importer_journal(flux, format)
+    return JsonResponse({
+        'lignes': bilan.lus,
+        'journees': bilan.journees,
+        'rejets': bilan.nb_rejets,
+        'detail_rejets': [{'ligne': ligne, 'erreur': erreur} for ligne, erreur in bilan.rejets],
+    })
+
 # Gestion de la Paie
 @login_required
 @rh_required
 def paie_list(request):
-    fiches = FichePaie.objects.all().select_related('employe').order_by('-annee', '-mois')
-    return render(request, 'employees/paie_list.html', {'fiches': fiches})
+    fiches = FichePaie.objects.select_related('employe')
+    page = KeysetPaginator(fiches, ordering=('-annee', '-mois', '-id')).get_page(request.GET.get('cursor'))
+    return render(request, 'employees/paie_list.html', {'fiches': page})
 
 @login_required
 @rh_required
@@ -636,23 +636,72 @@ def paie_create(request):
         form = FichePaieForm()
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Générer une fiche de paie"})
 
+@login_required
+@rh_required
+def paie_departement_pdf(request):
+    """Toutes les fiches d'un mois (d'un département ou de l'entreprise) dans un seul PDF."""
+    try:
+        mois = int(request.GET.get('mois', ''))
+        annee = int(request.GET.get('annee', ''))
+    except ValueError:
+        return HttpResponseBadRequest("Paramètres mois et annee requis.")
+    fiches = FichePaie.objects.filter(mois=mois, annee=annee).select_related('employe').order_by('employe__nom', 'employe_id')
+    nom = f"fiches_paie_{annee}_{mois:02d}"
+    if request.GET.get('departement'):
+        departement = get_object_or_404(Departement, pk=request.GET['departement'])
+        fiches = fiches.filter(employe__departement=departement)
+        nom += f"_{departement.code or departement.pk}"
+    if not fiches.exists():
+        messages.warning(request, "Aucune fiche de paie pour cette période.")
+        return redirect('employees:paie_cycle_list')
+    contenu = render_fiches_paie(
+        (fiche_paie_donnees(fiche) for fiche in fiches.iterator(chunk_size=500)),
+        titre=f"Fiches de paie {mois:02d}/{annee}",
+    )
+    response = HttpResponse(contenu, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{nom}.pdf"'
+    return response
+
+@login_required
+@rh_required
+def paie_cycle_list(request):
+    """Lance un cycle de paie (toutes les fiches d'un mois) et suit les cycles récents."""
+    if request.method == 'POST':
+        form = CyclePaieForm(request.POST)
+        if form.is_valid():
+            cycle = form.save(commit=False)
+            cycle.cree_par = request.user
+            # Exécuté hors requête par `run_payroll --file`
+            cycle.en_file = True
+            cycle.save()
+            messages.success(request, f"Cycle {cycle} mis en file : son avancement s'affiche ci-dessous.")
+            return redirect('employees:paie_cycle_list')
+    else:
+        today = timezone.now().date()
+        form = CyclePaieForm(initial={'mois': today.month, 'annee': today.year})
+    cycles = CyclePaie.objects.select_related('departement').order_by('-date_creation')[:20]
+    return render(request, 'employees/paie_cycle_list.html', {'form': form, 'cycles': cycles})
+
+@login_required
+@rh_required
+def paie_cycle_reprendre(request, pk):
+    cycle = get_object_or_404(CyclePaie, pk=pk)
+    if request.method == 'POST' and cycle.statut != 'TERMINE':
+        CyclePaie.objects.filter(pk=cycle.pk).update(en_file=True)
+        messages.success(request, f"Reprise du cycle {cycle} mise en file.")
+    return redirect('employees:paie_cycle_list')
+
 # Gestion des Formations
 @login_required
 def formation_list(request):
-    formations = Formation.objects.all()
+    scope = request.access_scope
+    # Employé et DeptAdmin ne voient que les formations de leur département ou générales
+    formations = Formation.objects.visible_to(scope)
     user_registrations = []
     
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh:
-            # Employé et DeptAdmin ne voient que les formations de leur département ou générales
-            if profil.poste:
-                formations = formations.filter(Q(departement=profil.poste.departement) | Q(departement__isnull=True))
-            else:
-                formations = formations.filter(departement__isnull=True)
-                
+    if not scope.is_superuser and scope.has_profil:
         user_registrations = InscriptionFormation.objects.filter(
-            employe=profil
+            employe_id=scope.employe_id
         ).values_list('formation_id', flat=True)
     
     return render(request, 'employees/formation_list.html', {
@@ -668,20 +717,17 @@ def formation_create(request):
         if form.is_valid():
             formation = form.save(commit=False)
             # Isolation par département pour les managers
-            if not request.user.is_superuser:
-                profil = request.user.profil
-                if not profil.is_rh and not profil.is_superadmin:
-                    if profil.poste:
-                        formation.departement = profil.poste.departement
+            scope = request.access_scope
+            if not scope.sees_all and scope.departement_id:
+                formation.departement_id = scope.departement_id
             formation.save()
             messages.success(request, "Formation créée avec succès.")
             return redirect('employees:formation_list')
     else:
         form = FormationForm()
-        if not request.user.is_superuser:
-            profil = request.user.profil
-            if not profil.is_rh and not profil.is_superadmin and profil.poste:
-                form.initial['departement'] = profil.poste.departement
+        scope = request.access_scope
+        if not scope.sees_all and scope.departement_id:
+            form.initial['departement'] = scope.departement_id
 
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Créer une formation"})
 
@@ -690,18 +736,16 @@ def formation_detail(request, pk):
     formation = get_object_or_404(Formation, pk=pk)
     
     # Restriction par département
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if formation.departement and (not profil.poste or formation.departement != profil.poste.departement):
-                raise PermissionDenied
+    scope = request.access_scope
+    if formation.departement_id and not scope.covers_departement(formation.departement_id):
+        raise PermissionDenied
 
     inscriptions = InscriptionFormation.objects.filter(formation=formation).select_related('employe')
     
     is_registered = False
     user_inscription = None
-    if not request.user.is_superuser and hasattr(request.user, 'profil'):
-        user_inscription = inscriptions.filter(employe=request.user.profil).first()
+    if not scope.is_superuser and scope.has_profil:
+        user_inscription = inscriptions.filter(employe_id=scope.employe_id).first()
         is_registered = user_inscription is not None
         
     return render(request, 'employees/formation_detail.html', {
@@ -717,11 +761,8 @@ def formation_update(request, pk):
     formation = get_object_or_404(Formation, pk=pk)
     
     # Restriction pour les managers
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if formation.departement and (not profil.poste or formation.departement != profil.poste.departement):
-                raise PermissionDenied
+    if formation.departement_id and not request.access_scope.covers_departement(formation.departement_id):
+        raise PermissionDenied
 
     if request.method == 'POST':
         form = FormationForm(request.POST, instance=formation)
@@ -739,11 +780,8 @@ def formation_delete(request, pk):
     formation = get_object_or_404(Formation, pk=pk)
     
     # Restriction pour les managers
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if formation.departement and (not profil.poste or formation.departement != profil.poste.departement):
-                raise PermissionDenied
+    if formation.departement_id and not request.access_scope.covers_departement(formation.departement_id):
+        raise PermissionDenied
     if request.method == 'POST':
         formation.delete()
         messages.success(request, "Formation supprimée.")
@@ -753,17 +791,16 @@ def formation_delete(request, pk):
 @login_required
 def formation_register(request, pk):
     formation = get_object_or_404(Formation, pk=pk)
-    if not hasattr(request.user, 'profil'):
+    scope = request.access_scope
+    if not scope.has_profil:
         messages.error(request, "Vous devez avoir un profil employé pour vous inscrire.")
         return redirect('employees:formation_list')
     
-    employe = request.user.profil
-    
     # Vérifier si déjà inscrit
-    if InscriptionFormation.objects.filter(employe=employe, formation=formation).exists():
+    if InscriptionFormation.objects.filter(employe_id=scope.employe_id, formation=formation).exists():
         messages.warning(request, "Vous êtes déjà inscrit à cette formation.")
     else:
-        InscriptionFormation.objects.create(employe=employe, formation=formation)
+        InscriptionFormation.objects.create(employe_id=scope.employe_id, formation=formation)
         messages.success(request, f"Votre inscription à la formation '{formation.titre}' a été enregistrée.")
     
     # Rediriger vers la page d'origine ou vers la liste des formations
@@ -781,11 +818,9 @@ def formation_inscription_update(request, pk, inscription_pk):
         formation_id=pk
     )
 
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if inscription.formation.departement and (not profil.poste or inscription.formation.departement != profil.poste.departement):
-                raise PermissionDenied
+    formation_dept_id = inscription.formation.departement_id
+    if formation_dept_id and not request.access_scope.covers_departement(formation_dept_id):
+        raise PermissionDenied
 
     if request.method != 'POST':
         return redirect('employees:formation_detail', pk=pk)
@@ -801,16 +836,8 @@ def formation_inscription_update(request, pk, inscription_pk):
 # Recrutements
 @login_required
 def recrutement_list(request):
-    offres = OffreEmploi.objects.all().annotate(num_candidatures=Count('candidatures'))
-    
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_superadmin and not profil.is_rh:
-            # Employé et DeptAdmin ne voient que leur département
-            if profil.poste:
-                offres = offres.filter(departement=profil.poste.departement)
-            else:
-                offres = offres.none()
+    # Employé et DeptAdmin ne voient que leur département
+    offres = OffreEmploi.objects.visible_to(request.access_scope).annotate(num_candidatures=Count('candidatures'))
             
     return render(request, 'employees/recrutement_list.html', {'offres': offres})
 
@@ -821,20 +848,17 @@ def recrutement_create(request):
         form = OffreEmploiForm(request.POST)
         if form.is_valid():
             offre = form.save(commit=False)
-            if not request.user.is_superuser:
-                profil = request.user.profil
-                if not profil.is_rh and not profil.is_superadmin:
-                    if profil.poste:
-                        offre.departement = profil.poste.departement
+            scope = request.access_scope
+            if not scope.sees_all and scope.departement_id:
+                offre.departement_id = scope.departement_id
             offre.save()
             messages.success(request, "Offre d'emploi publiée.")
             return redirect('employees:recrutement_list')
     else:
         form = OffreEmploiForm()
-        if not request.user.is_superuser:
-            profil = request.user.profil
-            if not profil.is_rh and not profil.is_superadmin and profil.poste:
-                form.initial['departement'] = profil.poste.departement
+        scope = request.access_scope
+        if not scope.sees_all and scope.departement_id:
+            form.initial['departement'] = scope.departement_id
     return render(request, 'employees/employee_form.html', {'form': form, 'title': "Publier une offre"})
 
 @login_required
@@ -842,19 +866,14 @@ def recrutement_detail(request, pk):
     offre = get_object_or_404(OffreEmploi.objects.annotate(num_candidatures=Count('candidatures')), pk=pk)
     
     # Permission de voir
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_superadmin and not profil.is_rh:
-            if not profil.poste or offre.departement != profil.poste.departement:
-                from django.core.exceptions import PermissionDenied
-                raise PermissionDenied
+    scope = request.access_scope
+    if not scope.covers_departement(offre.departement_id):
+        raise PermissionDenied
                 
     candidatures = offre.candidatures.all()
     # Seuls RH/SuperAdmin voient les candidatures détaillées
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_superadmin and not profil.is_rh:
-            candidatures = []
+    if not scope.is_superadmin and not scope.is_rh:
+        candidatures = []
             
     return render(request, 'employees/recrutement_detail.html', {'offre': offre, 'candidatures': candidatures})
 
@@ -864,11 +883,8 @@ def recrutement_update(request, pk):
     offre = get_object_or_404(OffreEmploi, pk=pk)
     
     # Restriction pour les managers
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if offre.departement and (not profil.poste or offre.departement != profil.poste.departement):
-                raise PermissionDenied
+    if not request.access_scope.covers_departement(offre.departement_id):
+        raise PermissionDenied
 
     if request.method == 'POST':
         form = OffreEmploiForm(request.POST, instance=offre)
@@ -886,11 +902,8 @@ def recrutement_delete(request, pk):
     offre = get_object_or_404(OffreEmploi, pk=pk)
     
     # Restriction pour les managers
-    if not request.user.is_superuser:
-        profil = request.user.profil
-        if not profil.is_rh and not profil.is_superadmin:
-            if offre.departement and (not profil.poste or offre.departement != profil.poste.departement):
-                raise PermissionDenied
+    if not request.access_scope.covers_departement(offre.departement_id):
+        raise PermissionDenied
 
     if request.method == 'POST':
         offre.delete()
@@ -899,22 +912,65 @@ def recrutement_delete(request, pk):
     return render(request, 'employees/confirm_delete.html', {'object': offre})
 
 # Intégrations / Export
-import csv
-from django.http import HttpResponse
-
 @login_required
 def export_employees_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="employees.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Matricule', 'Nom', 'Prénom', 'Email', 'Poste', 'Département', 'Date Embauche', 'Salaire'])
-    
-    employees = Employe.objects.all().select_related('poste', 'poste__departement')
-    for e in employees:
-        writer.writerow([e.matricule, e.nom, e.prenom, e.email, e.poste.titre, e.poste.departement.nom, e.date_embauche, e.salaire])
-        
-    return response
+    employees = Employe.objects.visible_to(request.access_scope).order_by('nom', 'id')
+    return streaming_csv_response(employees, employee_csv_columns(request.access_scope), 'employees.csv')
+
+@login_required
+@manager_required
+def export_data(request, modele):
+    """Extrait d'un modèle : ?format=csv|jsonl|xlsx|parquet&fields=a,b&du=AAAA-MM-JJ&au=AAAA-MM-JJ"""
+    fields = [f for f in request.GET.get('fields', '').split(',') if f]
+    try:
+        return export_response(
+            modele,
+            request.access_scope,
+            format=request.GET.get('format', 'csv'),
+            fields=fields or None,
+            du=parse_export_date(request.GET.get('du')),
+            au=parse_export_date(request.GET.get('au')),
+        )
+    except ExportError as exc:
+        return HttpResponseBadRequest(str(exc))
+    except RuntimeError as exc:
+        # Dépendance optionnelle absente (openpyxl, pyarrow)
+        return HttpResponse(str(exc), status=501, content_type='text/plain')
+
+# Téléchargement des fichiers RH : (modèle, champ, relations utiles au nom du fichier)
+FICHIERS_TELECHARGEABLES = {
+    'fiche-paie': (FichePaie, 'fichier_pdf', ['employe']),
+    'contrat': (Contrat, 'fichier', ['employe']),
+    'document': (DocumentRH, 'fichier', ['employe']),
+    'cv': (Candidature, 'cv', []),
+    'attestation': (InscriptionFormation, 'attestation', ['employe', 'formation']),
+}
+
+def _nom_telechargement(type_fichier, obj, fichier):
+    extension = os.path.splitext(fichier.name)[1]
+    if type_fichier == 'fiche-paie':
+        base = f"fiche_paie_{obj.employe.matricule or obj.employe_id}_{obj.annee}_{obj.mois:02d}"
+    elif type_fichier == 'contrat':
+        base = f"contrat_{obj.employe.nom}_{obj.employe.prenom}"
+    elif type_fichier == 'document':
+        base = f"{obj.titre}_{obj.employe.nom}"
+    elif type_fichier == 'cv':
+        base = f"cv_{obj.nom}_{obj.prenom}"
+    else:
+        base = f"attestation_{obj.formation.titre}_{obj.employe.nom}"
+    return slugify(base).replace('-', '_') + extension
+
+@login_required
+def telecharger_fichier(request, type_fichier, pk):
+    if type_fichier not in FICHIERS_TELECHARGEABLES:
+        raise Http404
+    model, champ, relations = FICHIERS_TELECHARGEABLES[type_fichier]
+    # Même périmètre que les exports : hors périmètre, le fichier "n'existe pas"
+    obj = get_object_or_404(scoped_queryset(model, request.access_scope).select_related(*relations), pk=pk)
+    fichier = getattr(obj, champ)
+    if not fichier or not fichier.storage.exists(fichier.name):
+        raise Http404
+    return serve_file(request, fichier, _nom_telechargement(type_fichier, obj, fichier))
 
 # Politiques RH
 @login_required
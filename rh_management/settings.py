@@ -46,6 +46,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "employees.middleware.AccessScopeMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -62,6 +63,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "employees.context_processors.access_scope",
             ],
         },
     },
@@ -125,6 +127,13 @@ STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Les fichiers RH ne sont jamais servis directement depuis MEDIA_URL : ils passent par
+# la vue telecharger_fichier (contrôle d'accès). En production, déléguer l'envoi au
+# serveur web : 'x-accel-redirect' (nginx, location internal sur DOWNLOAD_ACCEL_PREFIX
+# pointant vers MEDIA_ROOT) ou 'x-sendfile' (Apache mod_xsendfile, lighttpd).
+DOWNLOAD_OFFLOAD = None
+DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'
@@ -134,6 +143,46 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Durée (secondes) pendant laquelle un identifiant de connexion inconnu est mémorisé
+# par EmailOrUsernameBackend (0 = désactivé). Utile avec un cache partagé (Redis,
+# Memcached) pour amortir les rafales de tentatives sur des comptes inexistants.
+AUTH_NEGATIVE_CACHE_TIMEOUT = 0
+
 # Configuration Email (Console pour le développement)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'rh-noreply@entreprise.com'
+
+# Les courriels passent par la boîte d'envoi (modèle Notification) vidée par la
+# commande send_notifications : nombre maximal d'essais et délai (secondes) avant le
+# premier nouvel essai, doublé à chaque échec
+NOTIFICATION_MAX_TENTATIVES = 5
+NOTIFICATION_BACKOFF = 60
+
+# Cache des indicateurs du tableau de bord (secondes). Les signaux invalident
+# les instantanés à chaque modification ; ce délai n'est qu'un filet de sécurité.
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Jeton optionnel permettant à un collecteur de métriques d'interroger /metrics/
+METRICS_TOKEN = None
+
+# Paie par cycle : part du brut retenue en déductions (0.22 = 22 %) et nombre de
+# processus de rendu PDF (None = un par cœur, 1 = rendu dans le processus courant).
+# Les cycles lancés depuis l'interface sont exécutés par `run_payroll --file` (cron)
+PAIE_TAUX_DEDUCTIONS = '0'
+PAIE_PDF_WORKERS = None
+
+# Rendu des fiches de paie : 'sync' pendant l'enregistrement (tests, démo), 'async'
+# pour laisser la commande render_payslips traiter la file en arrière-plan
+PAIE_PDF_MODE = 'async'
+
+# Stockage des fichiers par contenu : âge minimal (heures) d'un fichier non
+# référencé avant que gc_media ne le supprime
+CAS_GC_GRACE_HOURS = 24
+
+# Terminaux de badgeage : jeton attendu sur /api/pointage/ (désactivée si None) et
+# écart (secondes) en deçà duquel deux badgeages successifs ne comptent qu'une fois
+POINTAGE_TOKEN = None
+POINTAGE_ANTI_REBOND = 120
+
+# Jours de congé acquis par mois travaillé (accrue_leave), par type de congé
+CONGES_ACQUISITION_MENSUELLE = {'ANNUEL': '2.08'}